@@ -0,0 +1,104 @@
+"""Size and matching recall of SURF descriptors stored as float32, float16 and uint8 with a scale per tile.
+
+    python benchmarks/descriptors_matching.py --img tile.png
+
+Descriptors of the image and of a warped copy with a known homography go through the stored bytes of each
+mode, query descriptors stay float32. Recall is the share of matches that pass the ratio test and land
+within the reprojection threshold, relative to float32 storage. SURF needs an opencv contrib build,
+--detector sift measures the same storage on float descriptors of the main build.
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from map_storage.features.shared.custom_db_types import encode_descriptors, decode_descriptors
+from map_storage.features.shared.descriptors import DESCRIPTORS_DTYPES, compact_descriptors, float32_descriptors
+
+
+def synthetic_img(size: int) -> np.ndarray:
+    # blurred noise of several scales, textured enough for a few thousand SURF keypoints
+    rng = np.random.default_rng(0)
+    img = np.zeros((size, size), np.float32)
+    for cell in (4, 16, 64):
+        noise = rng.random((size // cell + 1, size // cell + 1), dtype=np.float32)
+        img += cv2.resize(noise, (size, size), interpolation=cv2.INTER_CUBIC)[:size, :size]
+    return cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+
+
+def warped(img: np.ndarray, angle: float, scale: float) -> tuple:
+    center = (img.shape[1] / 2, img.shape[0] / 2)
+    homography = np.vstack((cv2.getRotationMatrix2D(center, angle, scale), (0, 0, 1)))
+    rng = np.random.default_rng(1)
+    frame = cv2.warpPerspective(img, homography, img.shape[1::-1], borderMode=cv2.BORDER_REFLECT)
+    frame = np.clip(frame + rng.normal(0, 4, frame.shape), 0, 255).astype(np.uint8)
+    return frame, homography
+
+
+def correct_matches(matches, tile_points: np.ndarray, frame_points: np.ndarray,
+                    homography: np.ndarray, threshold_px: float) -> set:
+    if not matches:
+        return set()
+    query_idx = np.array([m.queryIdx for m in matches])
+    train_idx = np.array([m.trainIdx for m in matches])
+    projected = cv2.perspectiveTransform(tile_points[train_idx].reshape(-1, 1, 2), homography).reshape(-1, 2)
+    errors = np.linalg.norm(projected - frame_points[query_idx], axis=1)
+    return {(q, t) for q, t, e in zip(query_idx.tolist(), train_idx.tolist(), errors) if e <= threshold_px}
+
+
+def main(args):
+    img = cv2.imread(args.img, cv2.IMREAD_GRAYSCALE) if args.img else synthetic_img(args.img_size)
+    if img is None:
+        raise SystemExit(f'{args.img} could not be read')
+    frame, homography = warped(img, args.angle, args.scale)
+
+    if args.detector == 'surf':
+        detector = cv2.xfeatures2d.SURF_create(hessianThreshold=args.hessian_threshold, extended=args.extended)
+    else:
+        detector = cv2.SIFT_create()
+    tile_keypoints, tile_descriptors = detector.detectAndCompute(img, None)
+    frame_keypoints, frame_descriptors = detector.detectAndCompute(frame, None)
+    tile_points = np.float32([kp.pt for kp in tile_keypoints])
+    frame_points = np.float32([kp.pt for kp in frame_keypoints])
+
+    print(f'{len(tile_keypoints)} tile and {len(frame_keypoints)} frame keypoints, '
+          f'{tile_descriptors.shape[1]} floats per descriptor')
+
+    matcher = cv2.BFMatcher(cv2.NORM_L2)
+    reference = None
+    for dtype in DESCRIPTORS_DTYPES:
+        stored = encode_descriptors(compact_descriptors(tile_descriptors, dtype))
+
+        started_at = time.perf_counter()
+        descriptors = float32_descriptors(decode_descriptors(stored))
+        decode_ms = (time.perf_counter() - started_at) * 1000
+
+        matches = [m for m, n in matcher.knnMatch(frame_descriptors, descriptors, k=2)
+                   if m.distance < args.ratio * n.distance]
+        correct = correct_matches(matches, tile_points, frame_points, homography, args.threshold_px)
+        if reference is None:
+            reference = correct
+
+        error = np.abs(descriptors - tile_descriptors).max()
+        print(f'{dtype:>8}: {len(stored) / len(tile_keypoints):6.1f} B/keypoint {len(stored) / 1024:8.1f} kB '
+              f'max error {error:.5f} decode {decode_ms:6.2f}ms matches {len(matches):5d} '
+              f'correct {len(correct):5d} recall {len(correct & reference) / max(len(reference), 1):.4f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--img', help='tile image, a synthetic texture by default')
+    parser.add_argument('--img-size', type=int, default=512)
+    parser.add_argument('--detector', choices=('surf', 'sift'), default='surf')
+    parser.add_argument('--hessian-threshold', type=int, default=400)
+    parser.add_argument('--extended', action='store_true', help='128 floats SURF descriptors')
+    parser.add_argument('--angle', type=float, default=12)
+    parser.add_argument('--scale', type=float, default=0.9)
+    parser.add_argument('--ratio', type=float, default=0.75)
+    parser.add_argument('--threshold-px', type=float, default=3)
+    main(parser.parse_args())
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -11,6 +12,16 @@ class MapStorageHubConfig(BaseSettings):
     db_port: str
     db_url: str
     googlemaps_api_key: str
+    import_jobs_max_concurrency: int = 2
+    import_processing_workers: Optional[int] = None
+    local_tiles_dir: Optional[str] = None
+    local_tiles_path_template: str = '{z}/{x}/{y}.png'
+    local_tiles_tms: bool = False
+    map_provider_initial_concurrency: int = 4
+    map_provider_max_concurrency: int = 32
+    map_provider_max_retries: int = 5
+    tiles_cache_dir: Optional[str] = None
+    tiles_cache_max_size_mb: int = 2048
 
     model_config = SettingsConfigDict(env_file='hub_api/.env')
 
@@ -1,13 +1,32 @@
+from functools import lru_cache
+from typing import Any, Callable, Awaitable, Optional
+
 from fastapi import Request
 
 from hub_api import map_storage_hub_config
 from map_storage.features.map_layers.application.commands.delete_map_layer import *
+from map_storage.features.map_layers.application.commands.delete_map_layer_tiles import DeleteMapLayerTilesHandler
 from map_storage.features.map_layers.application.commands.import_map_layer import *
+from map_storage.features.map_layers.application.commands.import_map_layer.response import ImportMapLayerResponse
+from map_storage.features.map_layers.application.commands.import_raster_layer import *
+from map_storage.features.map_layers.application.commands.extend_map_layer import *
+from map_storage.features.map_layers.application.commands.export_map_layer_pack import ExportMapLayerPackHandler
+from map_storage.features.map_layers.application.commands.export_map_layer_bundle import ExportMapLayerBundleHandler
+from map_storage.features.map_layers.application.commands.import_map_layer_bundle import ImportMapLayerBundleHandler
 from map_storage.features.map_layers.application.queries.list_map_layer_tiles import MapLayerDetailsQueryHandler
 from map_storage.features.map_layers.application.queries.list_map_layers import ListMapLayersQueryHandler
+from map_storage.features.map_layers.application.queries.estimate_map_layer_import import \
+    EstimateMapLayerImportQueryHandler
+from map_storage.features.map_layers.application.queries.tiles_queries import ListOverviewTilesInRectangleQueryHandler
 from map_storage.infra.db.repository import SqlAlchemyRepository
+from map_storage.infra.map_providers.adaptive_map_provider import AdaptiveConcurrencyMapProvider, \
+    AdaptiveLimiterMetrics
+from map_storage.infra.map_providers.cached_map_provider import CachedMapProvider, DiskTilesCache, TilesCacheStats
 from map_storage.infra.map_providers.google_maps_provider import GoogleMapsProvider
+from map_storage.infra.map_providers.local_tiles_provider import LocalTilesProvider
+from map_storage.features.shared.contracts.map_provider import MapProvider
 from map_storage.features.import_profiles.models.import_profile import ImportProfile
+from hub_api.infra.jobs_scheduler import JobsScheduler
 
 
 def map_layer_details(request: Request) -> MapLayerDetailsQueryHandler:
@@ -24,10 +43,149 @@ def delete_map_layer_handler(request: Request) -> DeleteMapLayerCommandHandler:
     )
 
 
-def import_map_layer_handler(request: Request) -> ImportMapLayerHandler:
-    return ImportMapLayerHandler(
-        request.state.db,
-        SqlAlchemyRepository(request.state.db, ImportProfile),
-        SqlAlchemyRepository(request.state.db, MapLayer),
-        GoogleMapsProvider(map_storage_hub_config('hub_api/.env').googlemaps_api_key)
+def list_overview_tiles_handler(request: Request) -> ListOverviewTilesInRectangleQueryHandler:
+    return ListOverviewTilesInRectangleQueryHandler(request.state.db)
+
+
+def delete_map_layer_tiles_handler(request: Request) -> DeleteMapLayerTilesHandler:
+    return DeleteMapLayerTilesHandler(request.state.db)
+
+
+def export_map_layer_pack_handler(request: Request) -> ExportMapLayerPackHandler:
+    return ExportMapLayerPackHandler(request.state.db)
+
+
+def export_map_layer_bundle_handler(request: Request) -> ExportMapLayerBundleHandler:
+    return ExportMapLayerBundleHandler(request.state.db)
+
+
+def import_map_layer_bundle_handler(request: Request) -> ImportMapLayerBundleHandler:
+    return ImportMapLayerBundleHandler(request.state.db)
+
+
+@lru_cache
+def adaptive_map_provider() -> Optional[AdaptiveConcurrencyMapProvider]:
+    config = map_storage_hub_config('hub_api/.env')
+    if config.local_tiles_dir:
+        return None
+
+    return AdaptiveConcurrencyMapProvider(
+        GoogleMapsProvider(config.googlemaps_api_key),
+        initial_limit=config.map_provider_initial_concurrency,
+        max_limit=config.map_provider_max_concurrency,
+        max_retries=config.map_provider_max_retries
     )
+
+
+@lru_cache
+def map_provider() -> MapProvider:
+    config = map_storage_hub_config('hub_api/.env')
+    if config.local_tiles_dir:
+        provider = LocalTilesProvider(
+            config.local_tiles_dir,
+            config.local_tiles_path_template,
+            tms=config.local_tiles_tms
+        )
+    else:
+        # cache hits shouldn't take limiter slots, so the cache wraps the limiter
+        provider = adaptive_map_provider()
+
+    if config.tiles_cache_dir:
+        provider = CachedMapProvider(
+            provider,
+            DiskTilesCache(config.tiles_cache_dir, config.tiles_cache_max_size_mb * 2 ** 20)
+        )
+
+    return provider
+
+
+def tiles_cache_stats() -> Optional[TilesCacheStats]:
+    provider = map_provider()
+    return provider.stats if isinstance(provider, CachedMapProvider) else None
+
+
+def map_provider_metrics() -> Optional[AdaptiveLimiterMetrics]:
+    provider = adaptive_map_provider()
+    return provider.metrics if provider else None
+
+
+def estimate_map_layer_import_handler(request: Request) -> EstimateMapLayerImportQueryHandler:
+    # duration is projected from the latency the limiter currently observes
+    metrics = map_provider_metrics()
+    latency_s = metrics.latency_ms / 1000 if metrics and metrics.requests else None
+    return EstimateMapLayerImportQueryHandler(request.state.db, map_provider(), latency_s)
+
+
+def import_jobs_scheduler(request: Request) -> JobsScheduler:
+    return request.app.state.import_jobs_scheduler
+
+
+def begin_map_layer_import(request: Request) -> Callable[[ImportMapLayerCommand], Awaitable[Any]]:
+    db = request.state.db
+    return ImportMapLayerHandler(
+        db,
+        SqlAlchemyRepository(db, ImportProfile),
+        SqlAlchemyRepository(db, MapLayer),
+        map_provider()
+    ).begin_import
+
+
+def import_map_layer_job(
+        request: Request
+) -> Callable[[ImportMapLayerCommand, ImportProgress], Awaitable[ImportMapLayerResponse]]:
+    # import jobs outlive the request, so they open their own db session
+    db_sessionmaker = request.app.state.db_sessionmaker
+    processing_pool = request.app.state.import_processing_pool
+
+    async def run(command: ImportMapLayerCommand, progress: ImportProgress) -> ImportMapLayerResponse:
+        async with db_sessionmaker() as db:
+            handler = ImportMapLayerHandler(
+                db,
+                SqlAlchemyRepository(db, ImportProfile),
+                SqlAlchemyRepository(db, MapLayer),
+                map_provider(),
+                executor=processing_pool,
+                progress=progress
+            )
+            return await handler(command)
+
+    return run
+
+
+def import_raster_layer_job(
+        request: Request
+) -> Callable[[ImportRasterLayerCommand, ImportProgress], Awaitable[ImportMapLayerResponse]]:
+    db_sessionmaker = request.app.state.db_sessionmaker
+    processing_pool = request.app.state.import_processing_pool
+
+    async def run(command: ImportRasterLayerCommand, progress: ImportProgress) -> ImportMapLayerResponse:
+        async with db_sessionmaker() as db:
+            handler = ImportRasterLayerHandler(
+                db,
+                SqlAlchemyRepository(db, MapLayer),
+                executor=processing_pool,
+                progress=progress
+            )
+            return await handler(command)
+
+    return run
+
+
+def extend_map_layer_job(
+        request: Request
+) -> Callable[[ExtendMapLayerCommand, ImportProgress], Awaitable[ImportMapLayerResponse]]:
+    db_sessionmaker = request.app.state.db_sessionmaker
+    processing_pool = request.app.state.import_processing_pool
+
+    async def run(command: ExtendMapLayerCommand, progress: ImportProgress) -> ImportMapLayerResponse:
+        async with db_sessionmaker() as db:
+            handler = ExtendMapLayerHandler(
+                db,
+                SqlAlchemyRepository(db, MapLayer),
+                map_provider(),
+                executor=processing_pool,
+                progress=progress
+            )
+            return await handler(command)
+
+    return run
@@ -0,0 +1,37 @@
+from typing import Optional, List
+
+from pydantic import BaseModel
+
+from hub_api.infra.jobs_scheduler import Job, JobStatus
+from map_storage.features.map_layers.application.commands.import_map_layer import ImportProgress
+from map_storage.features.map_layers.application.commands.import_map_layer.response import ImportMapLayerResponse
+
+
+class ImportJobResponse(BaseModel):
+    id: str
+    status: JobStatus
+    map_layer_id: Optional[int] = None
+    tiles_total: int
+    tiles_done: int
+    bytes_downloaded: int
+    eta_seconds: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[ImportMapLayerResponse] = None
+
+    @staticmethod
+    def from_job(job: Job) -> 'ImportJobResponse':
+        progress: ImportProgress = job.progress
+        return ImportJobResponse(
+            id=job.id,
+            status=job.status,
+            map_layer_id=progress.map_layer_id,
+            tiles_total=progress.tiles_total,
+            tiles_done=progress.tiles_done,
+            bytes_downloaded=progress.bytes_downloaded,
+            eta_seconds=progress.eta_seconds if job.status == JobStatus.running else None,
+            error=job.error,
+            result=job.result
+        )
+
+
+ListImportJobsResponse = List[ImportJobResponse]
@@ -0,0 +1,40 @@
+import base64
+from typing import List, Tuple
+
+from pydantic import BaseModel
+
+from map_storage.features.map_layers.application.queries.tiles_queries import TileResponse
+from map_storage.features.shared.images import encode_image
+
+
+class OverviewTileResponse(BaseModel):
+    latitude: float
+    longitude: float
+    vertices: List[Tuple[float, float]]
+    azimuth: float
+    overview_factor: int
+    img_width: int
+    img_height: int
+    img_codec: str
+    # base64 of the encoded image
+    img: str
+
+    @staticmethod
+    def from_tile(tile: TileResponse) -> 'OverviewTileResponse':
+        encoded_img = tile.img_encoded
+        # full resolution fallback of raw layers is sent as png
+        data = encoded_img.data if encoded_img.data is not None else encode_image(encoded_img.pixels, 'png')
+        return OverviewTileResponse(
+            latitude=tile.latitude,
+            longitude=tile.longitude,
+            vertices=tile.vertices,
+            azimuth=tile.azimuth,
+            overview_factor=tile.overview_factor,
+            img_width=tile.img_shape[1],
+            img_height=tile.img_shape[0],
+            img_codec=encoded_img.codec if encoded_img.data is not None else 'png',
+            img=base64.b64encode(data).decode('ascii')
+        )
+
+
+ListOverviewTilesResponse = List[OverviewTileResponse]
@@ -1,15 +1,40 @@
-from typing import Callable, Any
+import os
+import tempfile
+from typing import Callable, Any, Optional, List
 
-from fastapi import FastAPI, APIRouter, Depends
+from fastapi import FastAPI, APIRouter, Depends, Request, Query, status
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
 
 import hub_api.features.map_layers.dependencies as dep
+from hub_api.features.map_layers.import_jobs import ImportJobResponse, ListImportJobsResponse
+from hub_api.features.map_layers.overview_tiles import OverviewTileResponse, ListOverviewTilesResponse
+from hub_api.infra.jobs_scheduler import JobsScheduler
+from map_storage.features.shared.exceptions import NotFoundException
+from map_storage.infra.map_providers.adaptive_map_provider import AdaptiveLimiterMetrics
+from map_storage.infra.map_providers.cached_map_provider import TilesCacheStats
 from map_storage.features.map_layers.application.commands.delete_map_layer import DeleteMapLayerCommand
-from map_storage.features.map_layers.application.commands.import_map_layer import ImportMapLayerCommand
-from map_storage.features.map_layers.application.commands.import_map_layer.response import ImportMapLayerResponse
+from map_storage.features.map_layers.application.commands.delete_map_layer_tiles import \
+    DeleteMapLayerTilesCommand, DeleteMapLayerTilesResponse
+from map_storage.features.map_layers.application.commands.import_map_layer import ImportMapLayerCommand, \
+    ImportProgress
+from map_storage.features.map_layers.application.commands.import_raster_layer import ImportRasterLayerCommand
+from map_storage.features.map_layers.application.commands.extend_map_layer import ExtendMapLayerCommand
+from map_storage.features.map_layers.application.commands.export_map_layer_pack import \
+    ExportMapLayerPackCommand, ExportMapLayerPackResponse
+from map_storage.features.map_layers.application.commands.export_map_layer_bundle import \
+    ExportMapLayerBundleCommand, ExportMapLayerBundleResponse
+from map_storage.features.map_layers.application.commands.import_map_layer_bundle import \
+    ImportMapLayerBundleCommand, ImportMapLayerBundleResponse
 from map_storage.features.map_layers.application.queries.list_map_layer_tiles import MapLayerDetailsQuery, \
     MapLayerDetailsResponse
 from map_storage.features.map_layers.application.queries.list_map_layers import ListMapLayersResponse, \
     ListMapLayersQuery
+from map_storage.features.map_layers.application.queries.estimate_map_layer_import import \
+    EstimateMapLayerImportQuery, EstimateMapLayerImportResponse
+from map_storage.features.map_layers.application.queries.tiles_queries import ListOverviewTilesInRectangleQuery, \
+    TileResponse
+from map_storage.features.shared.models.coordinates import Coordinates
 
 
 def add_map_layers_router(app: FastAPI):
@@ -42,11 +67,184 @@ def add_map_layers_router(app: FastAPI):
         request = DeleteMapLayerCommand(id=map_layer_id)
         return await handler(request)
 
-    @router.post("/import", response_model=ImportMapLayerResponse)
+    @router.delete(
+        "/{map_layer_id}/tiles",
+        response_model=DeleteMapLayerTilesResponse)
+    async def delete_map_layer_tiles(
+            map_layer_id: int,
+            tiles_ids: List[int] = Query(),
+            handler: Callable[[DeleteMapLayerTilesCommand], DeleteMapLayerTilesResponse]
+            = Depends(dep.delete_map_layer_tiles_handler)):
+        request = DeleteMapLayerTilesCommand(map_layer_id=map_layer_id, tiles_ids=tiles_ids)
+        return await handler(request)
+
+    @router.get(
+        "/{map_layer_id}/overview",
+        response_model=ListOverviewTilesResponse)
+    async def map_layer_overview(
+            map_layer_id: int,
+            start_lat: float, start_long: float,
+            end_lat: float, end_long: float,
+            meters_per_px: float,
+            offset: int = 0,
+            limit: int = 100,
+            handler: Callable[[ListOverviewTilesInRectangleQuery], List[TileResponse]]
+            = Depends(dep.list_overview_tiles_handler)):
+        request = ListOverviewTilesInRectangleQuery(
+            layers_ids=[map_layer_id],
+            start=Coordinates(start_lat, start_long),
+            end=Coordinates(end_lat, end_long),
+            meters_per_px=meters_per_px,
+            offset=offset, limit=limit)
+        tiles = await handler(request)
+        return [OverviewTileResponse.from_tile(t) for t in tiles if t.img_encoded is not None]
+
+    @router.get("/{map_layer_id}/pack")
+    async def export_map_layer_pack(
+            map_layer_id: int,
+            handler: Callable[[ExportMapLayerPackCommand], ExportMapLayerPackResponse]
+            = Depends(dep.export_map_layer_pack_handler)):
+        path = _temp_file_path('.mspk')
+        try:
+            await handler(ExportMapLayerPackCommand(id=map_layer_id, path=path))
+        except BaseException:
+            os.remove(path)
+            raise
+        return FileResponse(path, filename=f'map_layer_{map_layer_id}.mspk',
+                            background=BackgroundTask(os.remove, path))
+
+    @router.get("/{map_layer_id}/bundle")
+    async def export_map_layer_bundle(
+            map_layer_id: int,
+            handler: Callable[[ExportMapLayerBundleCommand], ExportMapLayerBundleResponse]
+            = Depends(dep.export_map_layer_bundle_handler)):
+        path = _temp_file_path('.mslb.gz')
+        try:
+            await handler(ExportMapLayerBundleCommand(id=map_layer_id, path=path))
+        except BaseException:
+            os.remove(path)
+            raise
+        return FileResponse(path, filename=f'map_layer_{map_layer_id}.mslb.gz',
+                            background=BackgroundTask(os.remove, path))
+
+    @router.post(
+        "/bundle",
+        response_model=ImportMapLayerBundleResponse)
+    async def import_map_layer_bundle(
+            request: Request,
+            layer_name: Optional[str] = None,
+            handler: Callable[[ImportMapLayerBundleCommand], ImportMapLayerBundleResponse]
+            = Depends(dep.import_map_layer_bundle_handler)):
+        # the bundle is the raw request body, streamed to disk before it's imported
+        path = _temp_file_path('.mslb.gz')
+        try:
+            with open(path, 'wb') as f:
+                async for chunk in request.stream():
+                    f.write(chunk)
+            return await handler(ImportMapLayerBundleCommand(path=path, layer_name=layer_name))
+        finally:
+            os.remove(path)
+
+    @router.post(
+        "/import",
+        response_model=ImportJobResponse,
+        status_code=status.HTTP_202_ACCEPTED)
     async def import_map_layer(
             request: ImportMapLayerCommand,
-            handler: Callable[[ImportMapLayerCommand], ImportMapLayerResponse]
-            = Depends(dep.import_map_layer_handler)):
+            begin_import: Callable[[ImportMapLayerCommand], Any]
+            = Depends(dep.begin_map_layer_import),
+            run_import: Callable[[ImportMapLayerCommand, ImportProgress], Any]
+            = Depends(dep.import_map_layer_job),
+            scheduler: JobsScheduler = Depends(dep.import_jobs_scheduler)):
+        # a rejected import, like one of a taken layer name, fails the request instead of its job
+        await begin_import(request)
+        job = scheduler.submit(lambda j: run_import(request, j.progress), ImportProgress())
+        return ImportJobResponse.from_job(job)
+
+    @router.post(
+        "/import/estimate",
+        response_model=EstimateMapLayerImportResponse)
+    async def estimate_map_layer_import(
+            request: EstimateMapLayerImportQuery,
+            handler: Callable[[EstimateMapLayerImportQuery], EstimateMapLayerImportResponse]
+            = Depends(dep.estimate_map_layer_import_handler)):
         return await handler(request)
 
+    @router.post(
+        "/importRaster",
+        response_model=ImportJobResponse,
+        status_code=status.HTTP_202_ACCEPTED)
+    async def import_raster_layer(
+            request: ImportRasterLayerCommand,
+            run_import: Callable[[ImportRasterLayerCommand, ImportProgress], Any]
+            = Depends(dep.import_raster_layer_job),
+            scheduler: JobsScheduler = Depends(dep.import_jobs_scheduler)):
+        job = scheduler.submit(lambda j: run_import(request, j.progress), ImportProgress())
+        return ImportJobResponse.from_job(job)
+
+    @router.post(
+        "/extend",
+        response_model=ImportJobResponse,
+        status_code=status.HTTP_202_ACCEPTED)
+    async def extend_map_layer(
+            request: ExtendMapLayerCommand,
+            run_extend: Callable[[ExtendMapLayerCommand, ImportProgress], Any]
+            = Depends(dep.extend_map_layer_job),
+            scheduler: JobsScheduler = Depends(dep.import_jobs_scheduler)):
+        job = scheduler.submit(lambda j: run_extend(request, j.progress), ImportProgress())
+        return ImportJobResponse.from_job(job)
+
+    @router.get(
+        "/import/jobs",
+        response_model=ListImportJobsResponse)
+    async def list_import_jobs(
+            scheduler: JobsScheduler = Depends(dep.import_jobs_scheduler)):
+        return [ImportJobResponse.from_job(job) for job in scheduler.list()]
+
+    @router.get(
+        "/import/jobs/{job_id}",
+        response_model=ImportJobResponse)
+    async def import_job_status(
+            job_id: str,
+            scheduler: JobsScheduler = Depends(dep.import_jobs_scheduler)):
+        job = scheduler.get(job_id)
+        if job is None:
+            raise NotFoundException()
+        return ImportJobResponse.from_job(job)
+
+    @router.delete(
+        "/import/jobs/{job_id}",
+        response_model=ImportJobResponse)
+    async def cancel_import_job(
+            job_id: str,
+            scheduler: JobsScheduler = Depends(dep.import_jobs_scheduler)):
+        job = scheduler.cancel(job_id)
+        if job is None:
+            raise NotFoundException()
+        return ImportJobResponse.from_job(job)
+
+    @router.get(
+        "/import/tilesCache",
+        response_model=TilesCacheStats)
+    async def tiles_cache_stats(
+            stats: Optional[TilesCacheStats] = Depends(dep.tiles_cache_stats)):
+        if stats is None:
+            raise NotFoundException()
+        return stats
+
+    @router.get(
+        "/import/providerMetrics",
+        response_model=AdaptiveLimiterMetrics)
+    async def map_provider_metrics(
+            metrics: Optional[AdaptiveLimiterMetrics] = Depends(dep.map_provider_metrics)):
+        if metrics is None:
+            raise NotFoundException()
+        return metrics
+
     app.include_router(router)
+
+
+def _temp_file_path(suffix: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    return path
@@ -0,0 +1,89 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Optional, List
+
+
+class JobStatus(str, Enum):
+    queued = 'queued'
+    running = 'running'
+    completed = 'completed'
+    failed = 'failed'
+    cancelled = 'cancelled'
+
+
+@dataclass
+class Job:
+    progress: Any = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: JobStatus = JobStatus.queued
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    _task: Optional[asyncio.Task] = None
+
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.completed, JobStatus.failed, JobStatus.cancelled)
+
+
+class JobsScheduler:
+    def __init__(self, max_concurrent_jobs: int, max_finished_jobs: int = 100):
+        self._semaphore = asyncio.Semaphore(max_concurrent_jobs)
+        self._max_finished_jobs = max_finished_jobs
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+
+    def submit(self, run: Callable[[Job], Awaitable[Any]], progress: Any = None) -> Job:
+        job = Job(progress=progress)
+        job._task = asyncio.create_task(self._run(job, run))
+        job._task.add_done_callback(lambda task: self._on_task_done(job, task))
+        self._jobs[job.id] = job
+        self._forget_finished_jobs()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is not None and not job.is_finished():
+            job._task.cancel()
+        return job
+
+    async def shutdown(self):
+        tasks = [job._task for job in self._jobs.values() if not job.is_finished()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job: Job, run: Callable[[Job], Awaitable[Any]]):
+        try:
+            async with self._semaphore:
+                job.status = JobStatus.running
+                job.result = await run(job)
+                job.status = JobStatus.completed
+        except asyncio.CancelledError:
+            job.status = JobStatus.cancelled
+        except Exception as e:
+            job.status = JobStatus.failed
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+
+    @staticmethod
+    def _on_task_done(job: Job, task: asyncio.Task):
+        # a job cancelled before its coroutine started never runs the handlers of _run
+        if task.cancelled() and not job.is_finished():
+            job.status = JobStatus.cancelled
+            job.finished_at = time.time()
+
+    def _forget_finished_jobs(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.is_finished()]
+        for job_id in finished[:max(0, len(finished) - self._max_finished_jobs)]:
+            del self._jobs[job_id]
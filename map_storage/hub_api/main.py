@@ -9,10 +9,13 @@ from hub_api.features.import_profiles.routers import add_import_profiles_router
 from hub_api.features.map_layers.routers import add_map_layers_router
 from hub_api import map_storage_hub_config
 from hub_api.features.optimize_route.routers import add_optimize_route_router
+from hub_api.infra.jobs_scheduler import JobsScheduler
 
 from map_storage import configure_map_layers_orm, configure_import_profiles_orm, NotFoundException
 import map_storage.infra as infra
 from map_storage.features.shared.exceptions import MapStorageException
+from map_storage.features.map_layers.application.commands.import_map_layer.import_pipeline import \
+    create_processing_pool
 
 app = FastAPI()
 
@@ -38,6 +41,11 @@ sqlalchemy_registry = registry()
 configure_import_profiles_orm(sqlalchemy_registry)
 configure_map_layers_orm(sqlalchemy_registry)
 
+# background import jobs share the concurrency cap and the features extraction pool
+app.state.db_sessionmaker = async_session
+app.state.import_processing_pool = create_processing_pool(config.import_processing_workers)
+app.state.import_jobs_scheduler = JobsScheduler(config.import_jobs_max_concurrency)
+
 # add http endpoints and dependencies
 add_import_profiles_router(app)
 add_map_layers_router(app)
@@ -75,5 +83,7 @@ async def db_session_middleware(request: Request, call_next):
 
 @app.on_event("shutdown")
 async def on_server_shutdown():
+    await app.state.import_jobs_scheduler.shutdown()
+    app.state.import_processing_pool.shutdown(cancel_futures=True)
     await db_engine.dispose()
-    await infra.http_session.close()
\ No newline at end of file
+    await infra.close_http_session()
\ No newline at end of file
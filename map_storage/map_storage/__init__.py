@@ -1,4 +1,4 @@
 from map_storage.features.import_profiles.data.sqlalchemy_config import configure_import_profiles_orm
 from map_storage.features.map_layers.data.sqlalchemy_config import configure_map_layers_orm
 from map_storage.features.shared.exceptions import *
-from map_storage.sdk import MapStorageSDK
+from map_storage.sdk import MapStorageSDK, MapLayerPacksSDK
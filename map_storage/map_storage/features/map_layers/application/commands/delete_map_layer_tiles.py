@@ -0,0 +1,33 @@
+from typing import List
+
+from pydantic import BaseModel, conint, conlist
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from map_storage.features.map_layers.data.tiles_store import next_layer_version, delete_tiles
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.map_layers.models.map_tile import MapTile
+from map_storage.features.shared.exceptions import NotFoundException
+
+
+class DeleteMapLayerTilesCommand(BaseModel):
+    map_layer_id: conint(ge=1)
+    tiles_ids: conlist(int, min_length=1)
+
+
+class DeleteMapLayerTilesResponse(BaseModel):
+    deleted_tiles: int
+
+
+class DeleteMapLayerTilesHandler:
+    def __init__(self, db: AsyncSession):
+        self._db = db
+
+    async def __call__(self, command: DeleteMapLayerTilesCommand) -> DeleteMapLayerTilesResponse:
+        if await self._db.get(MapLayer, command.map_layer_id) is None:
+            raise NotFoundException()
+
+        version = await next_layer_version(self._db, command.map_layer_id)
+        deleted = await delete_tiles(self._db, command.map_layer_id, version, MapTile.id.in_(command.tiles_ids))
+        await self._db.commit()
+
+        return DeleteMapLayerTilesResponse(deleted_tiles=deleted)
@@ -0,0 +1,57 @@
+from pydantic import BaseModel, conint
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from map_storage.features.map_layers.data.layer_bundle import LayerBundleWriter
+from map_storage.features.map_layers.data.tiles_store import raw_tiles_select, select_overviews
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.map_layers.models.map_tile import MapTile
+from map_storage.features.shared.exceptions import NotFoundException
+
+
+class ExportMapLayerBundleCommand(BaseModel):
+    id: conint(ge=1)
+    path: str
+    compress_level: conint(ge=0, le=9) = 1
+
+
+class ExportMapLayerBundleResponse(BaseModel):
+    id: int
+    tiles: int
+
+
+class ExportMapLayerBundleHandler:
+    def __init__(self, db: AsyncSession, batch_size: int = 500):
+        self._db = db
+        self._batch_size = batch_size
+
+    async def __call__(self, command: ExportMapLayerBundleCommand) -> ExportMapLayerBundleResponse:
+        map_layer = await self._db.get(MapLayer, command.id)
+        if map_layer is None:
+            raise NotFoundException()
+
+        # tiles written while the bundle is exported are newer than its version and come with the next sync
+        layer = {**map_layer.settings(), 'id': map_layer.id, 'version': map_layer.version}
+        writer = LayerBundleWriter(command.path, layer, command.compress_level)
+        try:
+            await self._write_tiles(writer, map_layer.id)
+        except BaseException:
+            writer.abort()
+            raise
+
+        return ExportMapLayerBundleResponse(id=map_layer.id, tiles=writer.close())
+
+    async def _write_tiles(self, writer: LayerBundleWriter, map_layer_id: int):
+        # tiles are read in id ordered batches, so only one batch of blobs is held in memory
+        last_id = 0
+        while True:
+            rows = (await self._db.execute(
+                raw_tiles_select(MapTile.map_layer_id == map_layer_id, MapTile.id > last_id)
+                .order_by(MapTile.id.asc())
+                .limit(self._batch_size))).all()
+
+            if not rows:
+                return
+
+            overviews = await select_overviews(self._db, [row.id for row in rows])
+            writer.write_batch(rows, [overviews.get(row.id, []) for row in rows])
+            last_id = rows[-1].id
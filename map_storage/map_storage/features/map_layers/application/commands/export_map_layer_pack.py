@@ -0,0 +1,86 @@
+from pydantic import BaseModel, conint
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from map_storage.features.map_layers.data.tile_pack import TilePackWriter
+from map_storage.features.map_layers.data.tiles_store import select_overviews
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.map_layers.models.map_tile import MapTile, MapTilePayload
+from map_storage.features.shared.exceptions import NotFoundException
+
+
+class ExportMapLayerPackCommand(BaseModel):
+    id: conint(ge=1)
+    path: str
+
+
+class ExportMapLayerPackResponse(BaseModel):
+    id: int
+    tiles: int
+    size_bytes: int
+
+
+class ExportMapLayerPackHandler:
+    def __init__(self, db: AsyncSession, batch_size: int = 500):
+        self._db = db
+        self._batch_size = batch_size
+
+    async def __call__(self, command: ExportMapLayerPackCommand) -> ExportMapLayerPackResponse:
+        map_layer = await self._db.get(MapLayer, command.id)
+        if map_layer is None:
+            raise NotFoundException()
+
+        writer = TilePackWriter(command.path, {'id': map_layer.id, **map_layer.settings()})
+        try:
+            tiles = await self._write_tiles(writer, map_layer.id)
+        except BaseException:
+            writer.abort()
+            raise
+
+        return ExportMapLayerPackResponse(id=map_layer.id, tiles=tiles, size_bytes=writer.close())
+
+    async def _write_tiles(self, writer: TilePackWriter, map_layer_id: int) -> int:
+        # tiles are read in id ordered batches, so only one batch of blobs is held in memory
+        tiles, last_id = 0, 0
+        while True:
+            rows = (await self._db.execute(
+                select(MapTile.id,
+                       MapTile.center_lat, MapTile.center_long,
+                       MapTile.nw_lat, MapTile.nw_long,
+                       MapTile.ne_lat, MapTile.ne_long,
+                       MapTile.se_lat, MapTile.se_long,
+                       MapTile.sw_lat, MapTile.sw_long,
+                       MapTile.azimuth, MapTile.img_height, MapTile.img_width,
+                       MapTile.tile_z, MapTile.tile_x, MapTile.tile_y,
+                       MapTilePayload.img, MapTilePayload.img_encoded,
+                       MapTilePayload.surf_keypoints, MapTilePayload.surf_descriptors,
+                       MapTilePayload.fast_keypoints)
+                .outerjoin(MapTilePayload, MapTilePayload.tile_id == MapTile.id)
+                .where(MapTile.map_layer_id == map_layer_id)
+                .where(MapTile.id > last_id)
+                .order_by(MapTile.id.asc())
+                .limit(self._batch_size))).all()
+
+            if not rows:
+                return tiles
+
+            overviews = await select_overviews(self._db, [row.id for row in rows])
+            for row in rows:
+                writer.add_tile(
+                    coordinates=(row.center_lat, row.center_long,
+                                 row.nw_lat, row.nw_long, row.ne_lat, row.ne_long,
+                                 row.se_lat, row.se_long, row.sw_lat, row.sw_long),
+                    azimuth=row.azimuth,
+                    img_shape=(row.img_height, row.img_width),
+                    key=(row.tile_z, row.tile_x, row.tile_y) if row.tile_z is not None else None,
+                    img=row.img,
+                    img_encoded=row.img_encoded,
+                    surf_keypoints=row.surf_keypoints,
+                    surf_descriptors=row.surf_descriptors,
+                    fast_keypoints=row.fast_keypoints,
+                    overviews=overviews.get(row.id)
+                )
+
+            tiles += len(rows)
+            last_id = rows[-1].id
+
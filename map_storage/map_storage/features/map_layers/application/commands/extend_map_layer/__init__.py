@@ -0,0 +1,2 @@
+from .command import ExtendMapLayerCommand
+from .command_handler import ExtendMapLayerHandler
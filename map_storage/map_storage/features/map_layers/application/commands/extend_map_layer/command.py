@@ -0,0 +1,15 @@
+from pydantic import BaseModel, conint
+
+from map_storage.features.map_layers.application.commands.import_map_layer import (
+    ImportProfileType, RectangleProfileArgs, PolylineProfileArgs,
+    FetchOptions, ProcessingOptions, PersistenceOptions
+)
+
+
+class ExtendMapLayerCommand(BaseModel):
+    map_layer_id: conint(ge=1)
+    import_profile_type: ImportProfileType
+    import_profile_args: PolylineProfileArgs|RectangleProfileArgs
+    fetch: FetchOptions = FetchOptions()
+    processing: ProcessingOptions = ProcessingOptions()
+    persistence: PersistenceOptions = PersistenceOptions()
@@ -0,0 +1,160 @@
+from concurrent.futures import Executor
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.map_layers.models.map_layer_import import MapLayerImport, MapLayerImportStatus
+from map_storage.features.map_layers.models.map_tile import MapTile
+from map_storage.features.shared.contracts.map_provider import MapProvider
+from map_storage.features.shared.contracts.repository import Repository
+from map_storage.features.shared.exceptions import NotFoundException, MapStorageException
+
+from ..import_map_layer import ImportActions, SURFAction, FASTAction, ImportProgress, TilingScheme
+from ..import_map_layer.import_pipeline import TilesMemoryBudget, create_processing_pool, process_tiles
+from ..import_map_layer.layer_import import store_processed_tiles, complete_layer_import
+from ..import_map_layer.map_tiles_grids import build_tiles_grid
+from ..import_map_layer.response import ImportMapLayerResponse, ImportStats
+from ..import_map_layer.tiles_fetching import fetch_tiles
+from ..import_map_layer.tiles_processing import TileProcessingSettings
+from ..import_map_layer.tiles_writer import TilesBatchWriter
+from .command import ExtendMapLayerCommand
+from .tiles_coverage import TilesCoverage
+
+
+class ExtendMapLayerHandler:
+    def __init__(self,
+                 db: AsyncSession,
+                 map_layer_repo: Repository[MapLayer],
+                 map_provider: MapProvider,
+                 executor: Optional[Executor] = None,
+                 progress: Optional[ImportProgress] = None):
+        self._db = db
+        self.map_layer_repo = map_layer_repo
+        self.map_provider = map_provider
+        self._executor = executor
+        self._progress = progress
+
+    async def __call__(self, command: ExtendMapLayerCommand):
+        map_layer = await self.map_layer_repo.get(command.map_layer_id)
+        if map_layer is None:
+            raise NotFoundException()
+        if map_layer.tiling != TilingScheme.WEB_MERCATOR:
+            # profile grids are stretched to their area, cells of another area don't line up with the stored tiles
+            raise MapStorageException("only layers of web mercator tiles can be extended")
+
+        import_profile_args = command.import_profile_args.model_dump(mode='json')
+        unfinished_imports = list(await self._db.scalars(
+            select(MapLayerImport)
+            .where(MapLayerImport.map_layer_id == map_layer.id)
+            .where(MapLayerImport.status == MapLayerImportStatus.in_progress)))
+
+        # an interrupted extension with the same profile is resumed
+        layer_import = next((i for i in unfinished_imports
+                             if i.is_same_import(command.import_profile_type, import_profile_args)), None)
+
+        if layer_import is None:
+            if unfinished_imports:
+                raise MapStorageException("map layer has unfinished import")
+
+            layer_import = MapLayerImport(
+                map_layer_id=map_layer.id,
+                import_profile_type=command.import_profile_type,
+                import_profile_args=import_profile_args
+            )
+            self._db.add(layer_import)
+            await self._db.commit()
+
+        await self._db.refresh(map_layer)
+        await self._db.refresh(layer_import)
+        self._db.expunge(map_layer)
+
+        stored_grid_indices = set(await self._db.scalars(
+            select(MapTile.grid_index).where(MapTile.import_id == layer_import.id)))
+        coverage = await self._layer_coverage(map_layer.id)
+
+        tiles_grid = build_tiles_grid(
+            self.map_provider.zoom_lvl_to_meters_per_px(map_layer.zoom),
+            self.map_provider.max_tile_size_px(),
+            command.import_profile_type,
+            command.import_profile_args,
+            map_layer.tiling,
+            map_layer.zoom
+        )
+        skip_indices = set(stored_grid_indices)
+        for chunk in tiles_grid.chunks(skip_indices=stored_grid_indices):
+            skip_indices.update(chunk.indices[coverage.covers_tiles(chunk)].tolist())
+
+        tiles_total = len(tiles_grid)
+        covered_tiles = len(skip_indices) - len(stored_grid_indices)
+
+        progress = self._progress or ImportProgress()
+        progress.start(map_layer.id, tiles_total, len(skip_indices))
+        stats = progress.stats
+        memory_budget = TilesMemoryBudget.for_tile_size(
+            command.persistence.max_memory_mb, tiles_grid.tiles_width_px, tiles_grid.tiles_height_px)
+        tiles_writer = TilesBatchWriter(
+            self._db, command.persistence.batch_size, memory_budget, stats.store)
+        executor = self._executor or create_processing_pool(command.processing.workers)
+
+        fetched_tiles = fetch_tiles(
+            self.map_provider,
+            tiles_grid.grid_tiles(skip_indices=skip_indices),
+            map_layer.zoom,
+            tiles_grid.tiles_width_px, tiles_grid.tiles_height_px,
+            command.fetch,
+            stats.fetch,
+            memory_budget
+        )
+        processed_tiles = process_tiles(
+            fetched_tiles,
+            executor,
+            TileProcessingSettings.from_actions(self._layer_actions(map_layer)),
+            command.processing.queue_size,
+            stats.process,
+            (tiles_grid.tiles_width_px, tiles_grid.tiles_height_px)
+        )
+
+        try:
+            await store_processed_tiles(map_layer, layer_import, processed_tiles, tiles_writer)
+        finally:
+            if executor is not self._executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        await complete_layer_import(
+            self._db, layer_import, len(stored_grid_indices) + stats.store.tiles)
+
+        return ImportMapLayerResponse(
+            id=map_layer.id,
+            resumed_tiles=len(stored_grid_indices),
+            skipped_tiles=covered_tiles,
+            stats=ImportStats.from_pipeline_stats(stats)
+        )
+
+    async def _layer_coverage(self, map_layer_id: int) -> TilesCoverage:
+        corners = (await self._db.execute(
+            select(MapTile.nw_lat, MapTile.nw_long, MapTile.ne_lat, MapTile.ne_long,
+                   MapTile.se_lat, MapTile.se_long, MapTile.sw_lat, MapTile.sw_long)
+            .where(MapTile.map_layer_id == map_layer_id))).all()
+
+        return TilesCoverage.from_corners(np.array(corners, dtype=np.float64).reshape(-1, 4, 2))
+
+    @staticmethod
+    def _layer_actions(map_layer: MapLayer) -> ImportActions:
+        # the layer keeps the settings of its first import so that all of its tiles stay consistent
+        return ImportActions(
+            save_img=map_layer.has_images,
+            img_codec=map_layer.img_codec,
+            img_quality=map_layer.img_quality or 90,
+            overview_factors=map_layer.overview_factors,
+            compute_surf=SURFAction(hessianThreshold=map_layer.surf_min_hessian)
+            if map_layer.has_surf_features else None,
+            surf_descriptors_dtype=map_layer.descriptors_dtype,
+            compute_fast=FASTAction(
+                threshold=int(map_layer.fast_threshold or 0),
+                nonmaxSuppression=bool(map_layer.fast_nonmax_suppression),
+                type=map_layer.fast_type
+            ) if map_layer.has_fast_features else None
+        )
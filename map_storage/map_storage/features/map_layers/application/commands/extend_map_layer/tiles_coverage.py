@@ -0,0 +1,88 @@
+import math
+from collections import defaultdict
+from typing import Dict, List, Tuple, Optional
+
+import numpy as np
+
+from ..import_map_layer.map_tiles_grids import GridTilesChunk
+
+# relative inset of the tested cell corners, so that cells sharing an edge with stored tiles are not lost
+_corner_inset = 0.01
+
+
+class TilesCoverage:
+    def __init__(self, tiles_bounds: np.ndarray, tiles_corners: Optional[np.ndarray] = None):
+        # (n, 4) array of south, west, north, east bounds of the stored tiles,
+        # corners of rotated tiles narrow the bounds down to the tiles themselves
+        self._bounds = tiles_bounds
+        self._corners = tiles_corners
+        self._buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        self._bucket_lat = self._bucket_long = 1.0
+
+        if len(tiles_bounds):
+            self._bucket_lat = float(np.max(tiles_bounds[:, 2] - tiles_bounds[:, 0])) or 1.0
+            self._bucket_long = float(np.max(tiles_bounds[:, 3] - tiles_bounds[:, 1])) or 1.0
+
+        # every tile spans at most 2x2 buckets, so a point is tested only against its bucket's tiles
+        for i, (south, west, north, east) in enumerate(tiles_bounds):
+            for lat_bucket in range(self._lat_bucket(south), self._lat_bucket(north) + 1):
+                for long_bucket in range(self._long_bucket(west), self._long_bucket(east) + 1):
+                    self._buckets[(lat_bucket, long_bucket)].append(i)
+
+        self._buckets = {key: np.array(tiles) for key, tiles in self._buckets.items()}
+
+    @staticmethod
+    def from_corners(corners: np.ndarray) -> 'TilesCoverage':
+        # (n, 4, 2) array of latitude, longitude of the tiles corners
+        if not len(corners):
+            return TilesCoverage(np.empty((0, 4)))
+        bounds = np.column_stack((
+            corners[:, :, 0].min(axis=1), corners[:, :, 1].min(axis=1),
+            corners[:, :, 0].max(axis=1), corners[:, :, 1].max(axis=1)
+        ))
+        north_up = np.all((corners[:, 0, 0] == corners[:, 1, 0]) & (corners[:, 0, 1] == corners[:, 3, 1]))
+        return TilesCoverage(bounds, None if north_up else corners)
+
+    def covers_points(self, points: np.ndarray) -> np.ndarray:
+        # (n, 2) latitude, longitude, points are tested in groups that fall into the same bucket
+        covered = np.zeros(len(points), bool)
+        if not self._buckets or not len(points):
+            return covered
+
+        keys = np.floor(points / (self._bucket_lat, self._bucket_long)).astype(np.int64)
+        bucket_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        groups = np.split(np.argsort(inverse, kind='stable'), np.cumsum(np.bincount(inverse))[:-1])
+
+        for key, group in zip(map(tuple, bucket_keys.tolist()), groups):
+            tiles = self._buckets.get(key)
+            if tiles is None:
+                continue
+
+            bounds, lats, longs = self._bounds[tiles], points[group, 0:1], points[group, 1:2]
+            inside = ((bounds[:, 0] <= lats) & (lats <= bounds[:, 2])
+                      & (bounds[:, 1] <= longs) & (longs <= bounds[:, 3]))
+            if self._corners is not None:
+                inside &= _inside_quads(self._corners[tiles], points[group])
+            covered[group] = np.any(inside, axis=1)
+        return covered
+
+    def covers_tiles(self, chunk: GridTilesChunk) -> np.ndarray:
+        corners = chunk.corners
+        centers = corners.mean(axis=1, keepdims=True)
+        points = np.concatenate([centers, corners + (centers - corners) * _corner_inset], axis=1)
+        return self.covers_points(points.reshape(-1, 2)).reshape(-1, 5).all(axis=1)
+
+    def _lat_bucket(self, latitude: float) -> int:
+        return math.floor(latitude / self._bucket_lat)
+
+    def _long_bucket(self, longitude: float) -> int:
+        return math.floor(longitude / self._bucket_long)
+
+
+def _inside_quads(corners: np.ndarray, points: np.ndarray) -> np.ndarray:
+    # (k, 4, 2) convex tiles and (g, 2) points, a point is inside when it lies on the same side of all edges
+    edges = np.roll(corners, -1, axis=1) - corners
+    offsets = points[:, None, None, :] - corners[None]
+    cross = edges[None, :, :, 0] * offsets[..., 1] - edges[None, :, :, 1] * offsets[..., 0]
+    return np.all(cross >= 0, axis=2) | np.all(cross <= 0, axis=2)
@@ -1,6 +1,8 @@
 from .command import (
-    ImportProfileType, RectangleProfileArgs, PolylineProfileArgs,
-    ImportActions, SURFAction, FASTAction,
+    ImportProfileType, TilingScheme, ImageCodec, RectangleProfileArgs, PolylineProfileArgs,
+    ImportActions, SURFAction, FASTAction, FetchOptions, ProcessingOptions,
+    PersistenceOptions,
     ImportMapLayerCommand
 )
 from .command_handler import ImportMapLayerHandler
+from .progress import ImportProgress
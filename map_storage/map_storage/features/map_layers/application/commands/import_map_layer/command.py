@@ -10,6 +10,28 @@ class ImportProfileType(str, Enum):
     RECTANGLE = 'rectangle'
 
 
+class TilingScheme(str, Enum):
+    # cells are fitted to the import profile area
+    PROFILE = 'profile'
+    # cells are web mercator tiles of the import zoom, shared by all layers and imports
+    WEB_MERCATOR = 'web_mercator'
+
+
+class ImageCodec(str, Enum):
+    # uncompressed BGR array
+    RAW = 'raw'
+    PNG = 'png'
+    JPEG = 'jpeg'
+    WEBP = 'webp'
+
+
+class DescriptorsDtype(str, Enum):
+    FLOAT32 = 'float32'
+    FLOAT16 = 'float16'
+    # quantized with a scale per tile
+    UINT8 = 'uint8'
+
+
 class RectangleProfileArgs(BaseModel):
     start: Coordinates
     end: Coordinates
@@ -18,6 +40,8 @@ class RectangleProfileArgs(BaseModel):
 class PolylineProfileArgs(BaseModel):
     waypoints: List[Coordinates]
     load_distance_m: confloat(ge=20) = 20
+    # tiles follow the route segments rotated by their azimuth instead of a north-up grid
+    route_aligned: bool = False
 
 
 class SURFAction(BaseModel):
@@ -32,14 +56,40 @@ class FASTAction(BaseModel):
 
 class ImportActions(BaseModel):
     save_img: bool = True
+    img_codec: ImageCodec = ImageCodec.RAW
+    # jpeg and webp quality
+    img_quality: conint(ge=1, le=100) = 90
+    # downsampling factors of overview images stored with every tile, e.g. [2, 4, 8] for coarse queries
+    overview_factors: List[conint(ge=2, le=64)] = []
     compute_surf: Optional[SURFAction] = None
+    # storage of the SURF descriptors, reduced precision makes them 2 or 4 times smaller
+    surf_descriptors_dtype: DescriptorsDtype = DescriptorsDtype.FLOAT32
     compute_fast: Optional[FASTAction] = None
 
 
+class FetchOptions(BaseModel):
+    max_concurrent_requests: conint(ge=1, le=64) = 4
+    max_requests_per_second: Optional[confloat(gt=0)] = None
+
+
+class ProcessingOptions(BaseModel):
+    workers: Optional[conint(ge=1, le=64)] = None
+    queue_size: conint(ge=1, le=1024) = 32
+
+
+class PersistenceOptions(BaseModel):
+    batch_size: conint(ge=1, le=5000) = 50
+    max_memory_mb: conint(ge=16) = 512
+
+
 class ImportMapLayerCommand(BaseModel):
     import_profile_type: ImportProfileType
     import_profile_args: PolylineProfileArgs|RectangleProfileArgs
     layer_name: constr(min_length=1, max_length=50)
     zoom_lvl: float
     actions: ImportActions
-    description: Optional[constr(max_length=200)] = None
\ No newline at end of file
+    tiling: TilingScheme = TilingScheme.PROFILE
+    fetch: FetchOptions = FetchOptions()
+    processing: ProcessingOptions = ProcessingOptions()
+    persistence: PersistenceOptions = PersistenceOptions()
+    description: Optional[constr(max_length=200)] = None
@@ -1,51 +1,53 @@
-import cv2
+from concurrent.futures import Executor
+from typing import Optional
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from map_storage.features.import_profiles.models.import_profile import ImportProfile
 from map_storage.features.map_layers.models.map_layer import MapLayer
-from map_storage.features.map_layers.models.map_tile import MapTile, TileSURFFeatures
 from map_storage.features.shared.contracts.map_provider import MapProvider
 from map_storage.features.shared.contracts.repository import Repository
-from map_storage.features.shared.exceptions import MapProviderException, MapStorageException
 
-from .features_detection import canny_hough_detect
 from .command import ImportMapLayerCommand
+from .import_pipeline import TilesMemoryBudget, create_processing_pool, process_tiles
+from .layer_import import create_map_layer, begin_layer_import, store_processed_tiles, complete_layer_import
 from .map_tiles_grids import build_tiles_grid
-from .response import ImportMapLayerResponse
+from .progress import ImportProgress
+from .response import ImportMapLayerResponse, ImportStats
+from .tiles_fetching import fetch_tiles
+from .tiles_processing import TileProcessingSettings
+from .tiles_writer import TilesBatchWriter
 
 class ImportMapLayerHandler:
     def __init__(self,
                  db: AsyncSession,
                  import_profile_repo: Repository[ImportProfile],
                  map_layer_repo: Repository[MapLayer],
-                 map_provider: MapProvider):
+                 map_provider: MapProvider,
+                 executor: Optional[Executor] = None,
+                 progress: Optional[ImportProgress] = None):
         self._db = db
         self.import_profile_repo = import_profile_repo
         self.map_layer_repo = map_layer_repo
         self.map_provider = map_provider
-
-    async def __call__(self, command: ImportMapLayerCommand):
-        is_layer_name_exist = await self.map_layer_repo.any([MapLayer.name == command.layer_name])
-        if is_layer_name_exist:
-            raise MapStorageException("map layer with same name already exist")
-
-        map_layer = MapLayer(
-            name=command.layer_name,
-            description=command.description,
-            import_type=command.import_profile_type,
-            zoom=command.zoom_lvl,
-            has_surf_features=command.actions.compute_surf is not None,
-            has_fast_features=command.actions.compute_fast is not None,
-            has_images=command.actions.save_img
+        self._executor = executor
+        self._progress = progress
+
+    async def begin_import(self, command: ImportMapLayerCommand):
+        # registers the layer import, so that a rejected import fails before any tile is fetched.
+        # Calling it again for the same command picks up the registered import
+        return await begin_layer_import(
+            self._db,
+            self.map_layer_repo,
+            create_map_layer(
+                command.layer_name, command.import_profile_type, command.zoom_lvl,
+                command.actions, command.description, command.tiling),
+            command.import_profile_type,
+            command.import_profile_args.model_dump(mode='json')
         )
 
-        if map_layer.has_surf_features:
-            map_layer._surf_min_hessian = command.actions.compute_surf.hessianThreshold
-
-        if map_layer.has_fast_features:
-            map_layer._fast_threshold = command.actions.compute_fast.threshold
-            map_layer._fast_nonmax_suppression = command.actions.compute_fast.nonmaxSuppression
-            map_layer._fast_type = command.actions.compute_fast.type
+    async def __call__(self, command: ImportMapLayerCommand):
+        map_layer, layer_import, stored_grid_indices = await self.begin_import(command)
 
         zoom_m_per_px = (self.map_provider
                          .zoom_lvl_to_meters_per_px(command.zoom_lvl))
@@ -54,59 +56,48 @@ class ImportMapLayerHandler:
             zoom_m_per_px,
             self.map_provider.max_tile_size_px(),
             command.import_profile_type,
-            command.import_profile_args
+            command.import_profile_args,
+            command.tiling,
+            command.zoom_lvl
         )
 
-        surf =cv2.xfeatures2d.SURF_create()
-        if command.actions.compute_surf:
-            surf = cv2.xfeatures2d.SURF_create(**dict(command.actions.compute_surf))
-
-        fast = cv2.FastFeatureDetector_create()
-        if command.actions.compute_fast:
-            fast = cv2.FastFeatureDetector_create(
-                threshold=command.actions.compute_fast.threshold,
-                nonmaxSuppression=command.actions.compute_fast.nonmaxSuppression
-            )
-
-        for tile_coords in tiles_grid.tiles_coordinates:
-            tile_res = await self.map_provider.load_tile(
-                tile_coords[0], command.zoom_lvl,
-                tiles_grid.tiles_width_px, tiles_grid.tiles_height_px
-            )
-
-            if tile_res.error:
-                raise MapProviderException(tile_res.error)
-
-            if tile_res.img is None:
-                raise MapProviderException('Map provider returned no img')
-
-            tile = MapTile(
-                map_layer_id=map_layer.id,
-                center_lat=tile_coords[0].latitude, center_long=tile_coords[0].longitude,
-                nw_lat=tile_coords[1].latitude, nw_long=tile_coords[1].longitude,
-                ne_lat=tile_coords[2].latitude, ne_long=tile_coords[2].longitude,
-                se_lat=tile_coords[3].latitude, se_long=tile_coords[3].longitude,
-                sw_lat=tile_coords[4].latitude, sw_long=tile_coords[4].longitude,
-                azimuth=0,
-            )
-            tile.img_shape = tile_res.img.shape[:2]
-
-            if command.actions.save_img:
-                tile.img = tile_res.img
-
-            img_gray = cv2.cvtColor(tile.img, cv2.COLOR_BGR2GRAY)
-
-            if command.actions.compute_surf:
-                keypoints, descriptors = surf.detectAndCompute(img_gray, None)
-                tile.surf_features = TileSURFFeatures(keypoints, descriptors)
+        progress = self._progress or ImportProgress()
+        progress.start(map_layer.id, len(tiles_grid), len(stored_grid_indices))
+        stats = progress.stats
+        memory_budget = TilesMemoryBudget.for_tile_size(
+            command.persistence.max_memory_mb, tiles_grid.tiles_width_px, tiles_grid.tiles_height_px)
+        tiles_writer = TilesBatchWriter(
+            self._db, command.persistence.batch_size, memory_budget, stats.store)
+        executor = self._executor or create_processing_pool(command.processing.workers)
+
+        fetched_tiles = fetch_tiles(
+            self.map_provider,
+            tiles_grid.grid_tiles(skip_indices=stored_grid_indices),
+            command.zoom_lvl,
+            tiles_grid.tiles_width_px, tiles_grid.tiles_height_px,
+            command.fetch,
+            stats.fetch,
+            memory_budget
+        )
+        processed_tiles = process_tiles(
+            fetched_tiles,
+            executor,
+            TileProcessingSettings.from_actions(command.actions),
+            command.processing.queue_size,
+            stats.process,
+            (tiles_grid.tiles_width_px, tiles_grid.tiles_height_px)
+        )
 
-            if command.actions.compute_fast:
-                kp_arr = canny_hough_detect(tile.img, 9, (300, 330), 30, 30, 5)
-                tile.fast_keypoints = kp_arr
+        try:
+            await store_processed_tiles(map_layer, layer_import, processed_tiles, tiles_writer)
+        finally:
+            if executor is not self._executor:
+                executor.shutdown(wait=False, cancel_futures=True)
 
-            map_layer.add_tile(tile)
+        await complete_layer_import(self._db, layer_import, len(tiles_grid))
 
-        self.map_layer_repo.add(map_layer)
-        await self._db.commit()
-        await self._db.refresh(map_layer)
-        return ImportMapLayerResponse(id=map_layer.id)
+        return ImportMapLayerResponse(
+            id=map_layer.id,
+            resumed_tiles=len(stored_grid_indices),
+            stats=ImportStats.from_pipeline_stats(stats)
+        )
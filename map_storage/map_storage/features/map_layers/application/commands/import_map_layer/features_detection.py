@@ -23,7 +23,8 @@ def canny_hough_detect(img: np.ndarray,
 
     lines = cv2.HoughLinesP(edges, rho, theta, hough_threshold, np.array([]),
                             min_line_length, max_line_gap)
-    for line in lines:
+    # None when no line is found
+    for line in lines if lines is not None else ():
         for x1, y1, x2, y2 in line:
             cv2.line(line_image, (x1, y1), (x2, y2), (255, 255, 255), 1)
 
@@ -0,0 +1,145 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import aclosing
+from dataclasses import dataclass
+from functools import partial
+from typing import AsyncIterator, Tuple, TypeVar, Optional, Callable
+
+from map_storage.features.shared.contracts.map_provider import GetTileResult
+from map_storage.features.shared.exceptions import MapProviderException
+
+from .map_tiles_grids import GridTile
+from .tiles_processing import TileProcessingSettings, ProcessedTile, process_tile
+
+T = TypeVar('T')
+
+
+@dataclass
+class StageStats:
+    tiles: int = 0
+    bytes: int = 0
+    busy_seconds: float = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def record(self, busy_seconds: float, tiles: int = 1, bytes: int = 0):
+        now = time.perf_counter()
+        if self.started_at is None:
+            self.started_at = now - busy_seconds
+        self.finished_at = now
+        self.tiles += tiles
+        self.bytes += bytes
+        self.busy_seconds += busy_seconds
+
+    @property
+    def tiles_per_second(self) -> float:
+        if not self.tiles or self.finished_at == self.started_at:
+            return 0
+        return self.tiles / (self.finished_at - self.started_at)
+
+
+@dataclass
+class ImportPipelineStats:
+    fetch: StageStats
+    process: StageStats
+    store: StageStats
+
+    @staticmethod
+    def empty() -> 'ImportPipelineStats':
+        return ImportPipelineStats(StageStats(), StageStats(), StageStats())
+
+
+class TilesMemoryBudget:
+    def __init__(self, max_memory_bytes: int, tile_bytes: int):
+        self.max_tiles = max(1, max_memory_bytes // tile_bytes)
+        self._semaphore = asyncio.Semaphore(self.max_tiles)
+
+    @staticmethod
+    def for_tile_size(max_memory_mb: int, width_px: int, height_px: int) -> 'TilesMemoryBudget':
+        # decoded BGR image plus roughly the same amount for features and inter-process copies
+        return TilesMemoryBudget(max_memory_mb * 2 ** 20, width_px * height_px * 3 * 2)
+
+    def exhausted(self) -> bool:
+        return self._semaphore.locked()
+
+    async def acquire(self):
+        await self._semaphore.acquire()
+
+    def release(self, tiles: int = 1):
+        for _ in range(tiles):
+            self._semaphore.release()
+
+
+def create_processing_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    # spawn keeps workers independent of the event loop and http session of the parent process
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+async def process_tiles(
+        fetched_tiles: AsyncIterator[Tuple[GridTile, GetTileResult]],
+        executor: Executor,
+        settings: TileProcessingSettings,
+        queue_size: int,
+        stats: Optional[StageStats] = None,
+        tile_size_px: Optional[Tuple[int, int]] = None
+) -> AsyncIterator[Tuple[GridTile, ProcessedTile]]:
+    async def processing_jobs():
+        async with aclosing(fetched_tiles):
+            async for grid_tile, tile_res in fetched_tiles:
+                if tile_res.error:
+                    raise MapProviderException(tile_res.error)
+                yield grid_tile, partial(process_tile, tile_res.img, tile_res.img_bytes, settings,
+                                         grid_tile.azimuth, tile_size_px)
+
+    async with aclosing(run_processing_jobs(processing_jobs(), executor, queue_size, stats)) as processed_tiles:
+        async for item in processed_tiles:
+            yield item
+
+
+async def run_processing_jobs(
+        jobs: AsyncIterator[Tuple[T, Callable[[], ProcessedTile]]],
+        executor: Executor,
+        queue_size: int,
+        stats: Optional[StageStats] = None
+) -> AsyncIterator[Tuple[T, ProcessedTile]]:
+    # jobs are submitted to the executor ahead of the consumer, results are yielded in jobs order
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_size)
+
+    async def produce():
+        try:
+            async with aclosing(jobs):
+                async for grid_tile, job in jobs:
+                    await queue.put((grid_tile, loop.run_in_executor(executor, job)))
+        except asyncio.CancelledError:
+            # cancelled by a consumer that stopped reading, the queue may be full
+            raise
+        except Exception:
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (item := await queue.get()) is not None:
+            grid_tile, future = item
+            processed_tile = await future
+
+            if processed_tile.error:
+                raise MapProviderException(processed_tile.error)
+
+            if stats is not None:
+                stats.record(processed_tile.processing_seconds)
+
+            yield grid_tile, processed_tile
+
+        await producer
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                item[1].cancel()
@@ -0,0 +1,167 @@
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Set, Tuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.map_layers.models.map_layer_import import MapLayerImport, MapLayerImportStatus
+from map_storage.features.map_layers.models.map_tile import MapTile, TileSURFFeatures
+from map_storage.features.map_layers.models.map_tile_overview import MapTileOverview
+from map_storage.features.shared.contracts.repository import Repository
+from map_storage.features.shared.exceptions import MapStorageException, MapProviderException
+from map_storage.features.shared.images import overview_size
+
+from .command import ImportActions, TilingScheme, ImageCodec
+from .map_tiles_grids import GridTile
+from .tiles_processing import ProcessedTile
+from .tiles_writer import TilesBatchWriter
+
+
+def create_map_layer(name: str,
+                     import_type: str,
+                     zoom: float,
+                     actions: ImportActions,
+                     description: Optional[str] = None,
+                     tiling: TilingScheme = TilingScheme.PROFILE) -> MapLayer:
+    map_layer = MapLayer(
+        name=name,
+        description=description,
+        import_type=import_type,
+        zoom=zoom,
+        has_surf_features=actions.compute_surf is not None,
+        has_fast_features=actions.compute_fast is not None,
+        has_images=actions.save_img,
+        tiling=TilingScheme(tiling).value
+    )
+
+    if map_layer.has_images:
+        map_layer._img_codec = actions.img_codec.value
+        if actions.img_codec in (ImageCodec.JPEG, ImageCodec.WEBP):
+            map_layer._img_quality = actions.img_quality
+
+    if actions.overview_factors:
+        map_layer._overview_factors = sorted(set(actions.overview_factors))
+
+    if map_layer.has_surf_features:
+        map_layer._surf_min_hessian = actions.compute_surf.hessianThreshold
+        map_layer._descriptors_dtype = actions.surf_descriptors_dtype.value
+
+    if map_layer.has_fast_features:
+        map_layer._fast_threshold = actions.compute_fast.threshold
+        map_layer._fast_nonmax_suppression = actions.compute_fast.nonmaxSuppression
+        map_layer._fast_type = actions.compute_fast.type
+
+    return map_layer
+
+
+async def begin_layer_import(
+        db: AsyncSession,
+        map_layer_repo: Repository[MapLayer],
+        new_map_layer: MapLayer,
+        import_profile_type: str,
+        import_profile_args: Dict[str, Any]
+) -> Tuple[MapLayer, MapLayerImport, Set[int]]:
+    # creates the layer with its import or picks up the unfinished import of the same layer,
+    # returns grid indices of the tiles that are already stored by that import
+    map_layer = (await map_layer_repo.list_by(
+        criteria=[MapLayer.name == new_map_layer.name], limit=1) or [None])[0]
+
+    if map_layer is None:
+        map_layer = new_map_layer
+        map_layer_repo.add(map_layer)
+        await db.flush()
+
+        layer_import = MapLayerImport(
+            map_layer_id=map_layer.id,
+            import_profile_type=import_profile_type,
+            import_profile_args=import_profile_args
+        )
+        db.add(layer_import)
+        await db.commit()
+    else:
+        layer_import = await db.scalar(
+            select(MapLayerImport)
+            .where(MapLayerImport.map_layer_id == map_layer.id)
+            .where(MapLayerImport.status == MapLayerImportStatus.in_progress))
+
+        if (layer_import is None
+                or not layer_import.is_same_import(import_profile_type, import_profile_args)
+                or not map_layer.has_same_settings(new_map_layer)):
+            raise MapStorageException("map layer with same name already exist")
+
+    await db.refresh(map_layer)
+    await db.refresh(layer_import)
+    # tiles are committed in batches, keep the layer settings loaded after each commit
+    db.expunge(map_layer)
+
+    stored_grid_indices = set(await db.scalars(
+        select(MapTile.grid_index).where(MapTile.import_id == layer_import.id)))
+
+    return map_layer, layer_import, stored_grid_indices
+
+
+async def store_processed_tiles(
+        map_layer: MapLayer,
+        layer_import: MapLayerImport,
+        processed_tiles: AsyncIterator[Tuple[GridTile, ProcessedTile]],
+        tiles_writer: TilesBatchWriter
+):
+    # the import expires on every batch commit
+    import_id = layer_import.id
+    try:
+        async with aclosing(processed_tiles):
+            async for grid_tile, processed_tile in processed_tiles:
+                tile = _create_map_tile(map_layer, import_id, grid_tile, processed_tile)
+                map_layer.validate_tile(tile)
+                await tiles_writer.add(tile)
+
+        await tiles_writer.flush()
+    except MapProviderException:
+        # keep already processed tiles so that the import can be resumed from them
+        await tiles_writer.flush()
+        raise
+
+
+async def complete_layer_import(db: AsyncSession, layer_import: MapLayerImport, tiles_count: int):
+    await db.refresh(layer_import)
+    layer_import.tiles_count = tiles_count
+    layer_import.complete()
+    await db.commit()
+
+
+def _create_map_tile(map_layer: MapLayer,
+                     import_id: int,
+                     grid_tile: GridTile,
+                     processed_tile: ProcessedTile) -> MapTile:
+    tile_coords = grid_tile.coordinates
+    tile = MapTile(
+        map_layer_id=map_layer.id,
+        import_id=import_id,
+        grid_index=grid_tile.index,
+        center_lat=tile_coords[0].latitude, center_long=tile_coords[0].longitude,
+        nw_lat=tile_coords[1].latitude, nw_long=tile_coords[1].longitude,
+        ne_lat=tile_coords[2].latitude, ne_long=tile_coords[2].longitude,
+        se_lat=tile_coords[3].latitude, se_long=tile_coords[3].longitude,
+        sw_lat=tile_coords[4].latitude, sw_long=tile_coords[4].longitude,
+        azimuth=grid_tile.azimuth,
+    )
+    if grid_tile.key is not None:
+        tile.tile_z, tile.tile_x, tile.tile_y = grid_tile.key
+    tile.img_shape = processed_tile.img_shape
+    tile.img = processed_tile.img
+    tile.img_encoded = processed_tile.img_encoded
+
+    if map_layer.has_surf_features:
+        tile.surf_features = TileSURFFeatures(
+            processed_tile.surf_keypoints, processed_tile.surf_descriptors)
+
+    if map_layer.has_fast_features:
+        tile.fast_keypoints = processed_tile.fast_keypoints
+
+    if processed_tile.overviews:
+        tile.overviews = [
+            MapTileOverview(factor, *overview_size(tile.img_width, tile.img_height, factor), img_encoded)
+            for factor, img_encoded in processed_tile.overviews.items()]
+
+    return tile
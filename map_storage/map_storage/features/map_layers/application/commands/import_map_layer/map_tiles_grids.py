@@ -1,25 +1,298 @@
+import math
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import List, Tuple, NamedTuple, Iterator, Collection, Optional, Protocol
 from geopy.distance import geodesic
 from pydantic import BaseModel
 import numpy as np
 
+from map_storage.features.shared.exceptions import MapStorageException
 from map_storage.features.shared.models.coordinates import Coordinates
-from .command import RectangleProfileArgs, PolylineProfileArgs, ImportProfileType
+from map_storage.features.shared.web_mercator import TILE_SIZE_PX, meters_per_px, lat_long_to_world_px, \
+    world_px_to_lat_long
+from .command import RectangleProfileArgs, PolylineProfileArgs, ImportProfileType, TilingScheme
 
-@dataclass
-class MapTilesGrid:
+TileCoordinates = Tuple[Coordinates, Coordinates, Coordinates, Coordinates, Coordinates]
+# z, x, y of a web mercator tile
+TileKey = Tuple[int, int, int]
+
+_earth_radius_m = 6371008.8
+# route is measured in pieces of this many cells, so that the lattice window around each piece stays small
+_corridor_piece_cells = 8
+
+
+class GridTile(NamedTuple):
+    index: int
+    coordinates: TileCoordinates
+    key: Optional[TileKey] = None
+    # clockwise from north, direction the top of the tile image faces
+    azimuth: float = 0
+
+    @property
+    def center(self) -> Coordinates:
+        return self.coordinates[0]
+
+
+class GridLayout(Protocol):
+    lat_cells: int
+    long_cells: int
+    tiles_width_px: int
+    tiles_height_px: int
+
+    @property
+    def cells_count(self) -> int:
+        ...
+
+    def cell_coordinates(self, row: int, col: int) -> TileCoordinates:
+        ...
+
+    def cells_corners(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        ...
+
+    def cell_key(self, row: int, col: int) -> Optional[TileKey]:
+        ...
+
+    def cell_azimuth(self, row: int, col: int) -> float:
+        ...
+
+
+class LatticeGridLayout(GridLayout, Protocol):
+    # north-up cells whose corners form a regular lattice
+
+    def lattice_position(self, lats: np.ndarray, longs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        ...
+
+    def cell_size_m(self) -> Tuple[float, float]:
+        ...
+
+
+@dataclass(frozen=True)
+class RectangleGridLayout:
+    north: float
+    west: float
+    # negative, rows go from north to south
+    lat_step: float
+    long_step: float
+    lat_cells: int
+    long_cells: int
+    tiles_width_px: int
+    tiles_height_px: int
+
+    @property
+    def cells_count(self) -> int:
+        return self.lat_cells * self.long_cells
+
+    def cell_coordinates(self, row: int, col: int) -> TileCoordinates:
+        northern_lat = self.north + self.lat_step * row
+        western_long = self.west + self.long_step * col
+        return (Coordinates(northern_lat + self.lat_step / 2, western_long + self.long_step / 2),
+                Coordinates(northern_lat, western_long),
+                Coordinates(northern_lat, western_long + self.long_step),
+                Coordinates(northern_lat + self.lat_step, western_long + self.long_step),
+                Coordinates(northern_lat + self.lat_step, western_long))
+
+    def cells_corners(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        north = self.north + self.lat_step * rows
+        west = self.west + self.long_step * cols
+        return _corners(north, west, north + self.lat_step, west + self.long_step)
+
+    def cell_key(self, row: int, col: int) -> Optional[TileKey]:
+        return None
+
+    def cell_azimuth(self, row: int, col: int) -> float:
+        return 0
+
+    def lattice_position(self, lats: np.ndarray, longs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return (lats - self.north) / self.lat_step, (longs - self.west) / self.long_step
+
+    def cell_size_m(self) -> Tuple[float, float]:
+        # local equirectangular frame around the middle of the grid
+        m_per_lat = _earth_radius_m * np.pi / 180
+        lat0 = self.north + self.lat_step * self.lat_cells / 2
+        return abs(self.lat_step) * m_per_lat, abs(self.long_step) * m_per_lat * np.cos(np.radians(lat0))
+
+
+@dataclass(frozen=True)
+class WebMercatorGridLayout:
+    # web mercator tiles z/x0..x0+long_cells/y0..y0+lat_cells
+    zoom: int
+    x0: int
+    y0: int
+    lat_cells: int
+    long_cells: int
+    # tiles are rendered at a higher zoom than their key zoom when the provider allows bigger images
     tiles_width_px: int
     tiles_height_px: int
-    tiles_coordinates: List[Tuple[Coordinates, Coordinates, Coordinates, Coordinates, Coordinates]]
+
+    @property
+    def cells_count(self) -> int:
+        return self.lat_cells * self.long_cells
+
+    def cell_coordinates(self, row: int, col: int) -> TileCoordinates:
+        x, y = self.x0 + col, self.y0 + row
+        (north, south), (west, east) = self._world_to_lat_long((x, x + 1), (y, y + 1))
+        center_lat, center_long = self._world_to_lat_long(x + 0.5, y + 0.5)
+        return (Coordinates(float(center_lat), float(center_long)),
+                Coordinates(float(north), float(west)),
+                Coordinates(float(north), float(east)),
+                Coordinates(float(south), float(east)),
+                Coordinates(float(south), float(west)))
+
+    def cells_corners(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        north, west = self._world_to_lat_long(self.x0 + cols, self.y0 + rows)
+        south, east = self._world_to_lat_long(self.x0 + cols + 1, self.y0 + rows + 1)
+        return _corners(north, west, south, east)
+
+    def cell_key(self, row: int, col: int) -> Optional[TileKey]:
+        return self.zoom, self.x0 + col, self.y0 + row
+
+    def cell_azimuth(self, row: int, col: int) -> float:
+        return 0
+
+    def lattice_position(self, lats: np.ndarray, longs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        xs, ys = lat_long_to_world_px(lats, longs, self.zoom)
+        return ys / TILE_SIZE_PX - self.y0, xs / TILE_SIZE_PX - self.x0
+
+    def cell_size_m(self) -> Tuple[float, float]:
+        lat0, _ = self._world_to_lat_long(self.x0, self.y0 + self.lat_cells / 2)
+        size_m = meters_per_px(self.zoom) * TILE_SIZE_PX * np.cos(np.radians(lat0))
+        return size_m, size_m
+
+    def _world_to_lat_long(self, tile_x, tile_y):
+        return world_px_to_lat_long(np.multiply(tile_x, TILE_SIZE_PX), np.multiply(tile_y, TILE_SIZE_PX), self.zoom)
+
+
+@dataclass(frozen=True)
+class RouteGridLayout:
+    # rows of tiles follow the route segments one after another, columns go across the corridor,
+    # tile images are rotated so that their top faces the route direction
+    lat_cells: int
+    long_cells: int
+    tiles_width_px: int
+    tiles_height_px: int
+    tile_width_m: float
+    tile_height_m: float
+    # per segment: first row, start point, meters per degree of latitude and longitude around it,
+    # azimuth and distance of the first row from the start point along the segment
+    first_rows: np.ndarray
+    origins: np.ndarray
+    m_per_degree: np.ndarray
+    azimuths: np.ndarray
+    along_starts: np.ndarray
+
+    @property
+    def cells_count(self) -> int:
+        return self.lat_cells * self.long_cells
+
+    def cell_coordinates(self, row: int, col: int) -> TileCoordinates:
+        corners = self.cells_corners(np.array([row]), np.array([col]))[0]
+        center = corners.mean(axis=0)
+        return (Coordinates(float(center[0]), float(center[1])),
+                *(Coordinates(float(lat), float(long)) for lat, long in corners))
+
+    def cells_corners(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        # nw, ne, se, sw are the top left, top right, bottom right and bottom left corners of the tile image
+        segments = self._segments(rows)
+        back = self.along_starts[segments] + (rows - self.first_rows[segments]) * self.tile_height_m
+        left = (cols - self.long_cells / 2) * self.tile_width_m
+        azimuths = np.radians(self.azimuths[segments])
+        # forward and right unit vectors as north, east
+        forward = np.column_stack((np.cos(azimuths), np.sin(azimuths)))
+        right = np.column_stack((-np.sin(azimuths), np.cos(azimuths)))
+        origins, m_per_degree = self.origins[segments], self.m_per_degree[segments]
+
+        def point(along: np.ndarray, across: np.ndarray) -> np.ndarray:
+            return origins + (forward * along[:, None] + right * across[:, None]) / m_per_degree
+
+        front, right_side = back + self.tile_height_m, left + self.tile_width_m
+        return np.stack([point(front, left), point(front, right_side),
+                         point(back, right_side), point(back, left)], axis=1)
+
+    def cell_key(self, row: int, col: int) -> Optional[TileKey]:
+        return None
+
+    def cell_azimuth(self, row: int, col: int) -> float:
+        return float(self.azimuths[self._segments(np.array([row]))[0]])
+
+    def _segments(self, rows: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.first_rows, rows, side='right') - 1
+
+
+@dataclass
+class GridTilesChunk:
+    layout: GridLayout
+    # positions of the tiles in the grid and their layout rows and columns
+    indices: np.ndarray
+    rows: np.ndarray
+    cols: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    @property
+    def centers(self) -> np.ndarray:
+        # (n, 2) latitude, longitude
+        return self.corners.mean(axis=1)
+
+    @property
+    def corners(self) -> np.ndarray:
+        # (n, 4, 2) latitude, longitude of nw, ne, se, sw corners
+        return self.layout.cells_corners(self.rows, self.cols)
+
+    def grid_tiles(self) -> Iterator[GridTile]:
+        for index, row, col in zip(self.indices.tolist(), self.rows.tolist(), self.cols.tolist()):
+            yield GridTile(index, self.layout.cell_coordinates(row, col),
+                           self.layout.cell_key(row, col), self.layout.cell_azimuth(row, col))
+
+
+@dataclass
+class MapTilesGrid:
+    layout: GridLayout
+    # row-major layout cell ids of the grid tiles, every layout cell when not set
+    cells: Optional[np.ndarray] = None
+
+    @property
+    def tiles_width_px(self) -> int:
+        return self.layout.tiles_width_px
+
+    @property
+    def tiles_height_px(self) -> int:
+        return self.layout.tiles_height_px
+
+    def __len__(self) -> int:
+        return self.layout.cells_count if self.cells is None else len(self.cells)
+
+    def chunks(self, chunk_size: int = 4096, skip_indices: Collection[int] = ()) -> Iterator[GridTilesChunk]:
+        # tile arrays are built per chunk, so that wide grids are never materialized at once
+        skip = np.sort(np.fromiter(skip_indices, np.int64, len(skip_indices)))
+
+        for start in range(0, len(self), chunk_size):
+            end = min(start + chunk_size, len(self))
+            indices = np.arange(start, end)
+            chunk_skip = skip[np.searchsorted(skip, start):np.searchsorted(skip, end)]
+            if len(chunk_skip):
+                indices = indices[~np.isin(indices, chunk_skip)]
+                if not len(indices):
+                    continue
+
+            cells = indices if self.cells is None else self.cells[indices]
+            rows, cols = np.divmod(cells, self.layout.long_cells)
+            yield GridTilesChunk(self.layout, indices, rows, cols)
+
+    def grid_tiles(self, skip_indices: Collection[int] = ()) -> Iterator[GridTile]:
+        for chunk in self.chunks(skip_indices=skip_indices):
+            yield from chunk.grid_tiles()
 
 
 def build_tiles_grid(
         zoom_m_per_px: float,
         max_tile_size_px: float,
         import_profile_type: ImportProfileType,
-        import_profile_args: BaseModel
+        import_profile_args: BaseModel,
+        tiling: TilingScheme = TilingScheme.PROFILE,
+        zoom_lvl: Optional[float] = None
 ) -> MapTilesGrid:
+    if tiling == TilingScheme.WEB_MERCATOR:
+        return build_web_mercator_grid(zoom_lvl, max_tile_size_px, import_profile_type, import_profile_args)
     if import_profile_type == ImportProfileType.RECTANGLE:
         return build_rectangle_area_grid(
             RectangleProfileArgs(**import_profile_args.model_dump()),
@@ -32,10 +305,11 @@ def build_tiles_grid(
         )
     raise NotImplementedError()
 
-def build_rectangle_area_grid(
+
+def rectangle_grid_layout(
         rectangle_profile: RectangleProfileArgs,
         zoom_m_per_px: float,
-        max_tile_size_px: float) -> MapTilesGrid:
+        max_tile_size_px: float) -> RectangleGridLayout:
     start, end = rectangle_profile.start, rectangle_profile.end
 
     if start.latitude == end.latitude or start.longitude == end.longitude:
@@ -55,95 +329,234 @@ def build_rectangle_area_grid(
     lat_cells = int(lat_size_m // max_tile_size_m) + 1
     long_cells = int(long_size_m // max_tile_size_m) + 1
 
-    lat_step_degrees = (end.latitude - start.latitude) / lat_cells
-    long_step_degrees = (end.longitude - start.longitude) / long_cells
+    return RectangleGridLayout(
+        north=start.latitude,
+        west=start.longitude,
+        lat_step=(end.latitude - start.latitude) / lat_cells,
+        long_step=(end.longitude - start.longitude) / long_cells,
+        lat_cells=lat_cells,
+        long_cells=long_cells,
+        tiles_width_px=int(long_size_m / zoom_m_per_px / long_cells),
+        tiles_height_px=int(lat_size_m / zoom_m_per_px / lat_cells)
+    )
 
-    tile_size_pxs = (int(long_size_m / zoom_m_per_px / long_cells),
-                     int(lat_size_m / zoom_m_per_px / lat_cells))
 
-    tiles_coordinates = [
-        (Coordinates(northern_lat + lat_step_degrees / 2, western_long + long_step_degrees / 2),
-         Coordinates(northern_lat, western_long),
-         Coordinates(northern_lat, western_long + long_step_degrees),
-         Coordinates(northern_lat + lat_step_degrees, western_long + long_step_degrees),
-         Coordinates(northern_lat + lat_step_degrees, western_long))
-         for northern_lat in [start.latitude + lat_step_degrees * i for i in range(lat_cells)]
-         for western_long in [start.longitude + long_step_degrees * i for i in range(long_cells)]
-    ]
+def build_rectangle_area_grid(
+        rectangle_profile: RectangleProfileArgs,
+        zoom_m_per_px: float,
+        max_tile_size_px: float) -> MapTilesGrid:
+    return MapTilesGrid(rectangle_grid_layout(rectangle_profile, zoom_m_per_px, max_tile_size_px))
 
-    return MapTilesGrid(tile_size_pxs[0], tile_size_pxs[1], tiles_coordinates)
 
+def build_polyline_area_grid(
+        polyline_profile: PolylineProfileArgs,
+        zoom_m_per_px: float,
+        max_tile_size_px: float
+) -> MapTilesGrid:
+    if polyline_profile.route_aligned:
+        return MapTilesGrid(route_grid_layout(polyline_profile, zoom_m_per_px, max_tile_size_px))
 
-def distance_to_line_segment(
-        point_coordinates: Coordinates,
-        line: Tuple[Coordinates, Coordinates]
-) -> float:
-    # Calculate distances from the point to each endpoint
-    start, end = line[0].to_tuple(), line[1].to_tuple()
-    point = point_coordinates.to_tuple()
+    # get rectangle grid that covers entire area
+    start, end = _waypoints_bounds(polyline_profile.waypoints)
 
-    d_start = geodesic(point, start).meters
-    d_end = geodesic(point, end).meters
+    layout = rectangle_grid_layout(
+        RectangleProfileArgs(start=start, end=end),
+        zoom_m_per_px, max_tile_size_px
+    )
 
-    # Calculate vector representations of the segment and point
-    segment_vector = np.array([end[0] - start[0], end[1] - start[1]])
-    point_vector = np.array([point[0] - start[0], point[1] - start[1]])
+    tile_size_px = (layout.tiles_width_px, layout.tiles_height_px)
+    min_load_distance_m = max(tile_size_px) * zoom_m_per_px / 2
+    load_distance_m = max(min_load_distance_m, polyline_profile.load_distance_m)
 
-    # Calculate the projection of the point onto the line segment
-    projection = start + np.dot(point_vector, segment_vector) / np.dot(segment_vector, segment_vector) * segment_vector
+    return MapTilesGrid(layout, corridor_cells(layout, polyline_profile.waypoints, load_distance_m))
 
-    # Check if the projection falls within the bounds of the segment
-    if 0 <= np.dot(projection - start, segment_vector) <= np.dot(segment_vector, segment_vector):
-        # Calculate distance between the point and the projection
-        d_projection = geodesic(point, (projection[0], projection[1])).meters
-        return d_projection
 
-    # If the projection is outside the segment bounds, return the distance to the nearest endpoint
-    return min(d_start, d_end)
+def route_grid_layout(
+        polyline_profile: PolylineProfileArgs,
+        zoom_m_per_px: float,
+        max_tile_size_px: float
+) -> RouteGridLayout:
+    waypoints = polyline_profile.waypoints
+    lats = np.array([p.latitude for p in waypoints])
+    longs = np.array([p.longitude for p in waypoints])
 
+    # local equirectangular frame around the start of every segment
+    m_per_lat = _earth_radius_m * np.pi / 180
+    m_per_long = m_per_lat * np.cos(np.radians(lats[:-1]))
+    north_m, east_m = np.diff(lats) * m_per_lat, np.diff(longs) * m_per_long
+    lengths_m = np.hypot(north_m, east_m)
 
-def tile_line_distance(
-        tile_edges_coordinates: Tuple[Coordinates, Coordinates, Coordinates, Coordinates],
-        line: Tuple[Coordinates, Coordinates]
-) -> float:
-    return min(distance_to_line_segment(p, line) for p in tile_edges_coordinates)
+    segments = lengths_m > 0
+    if not segments.any():
+        raise MapStorageException('route must have at least two different waypoints')
 
+    azimuths = np.degrees(np.arctan2(east_m[segments], north_m[segments])) % 360
+    lengths_m = lengths_m[segments]
 
-def build_polyline_area_grid(
-        polyline_profile: PolylineProfileArgs,
-        zoom_m_per_px: float,
-        max_tile_size_px: float
-) -> MapTilesGrid:
-    # get rectangle grid that covers entire area
-    start = Coordinates(
-        latitude=min(polyline_profile.waypoints, key=lambda p: p.latitude).latitude,
-        longitude=min(polyline_profile.waypoints, key=lambda p: p.longitude).longitude
-    )
-    end = Coordinates(
-        latitude=max(polyline_profile.waypoints, key=lambda p: p.latitude).latitude,
-        longitude=max(polyline_profile.waypoints, key=lambda p: p.longitude).longitude
-    )
+    # north-up image the rotated tile is cut from must fit the provider limit on every segment
+    cos, sin = np.abs(np.cos(np.radians(azimuths))), np.abs(np.sin(np.radians(azimuths)))
+    steep, flat = np.maximum(cos, sin), np.minimum(cos, sin)
 
-    rectangle_grid = build_rectangle_area_grid(
-        RectangleProfileArgs(start=start, end=end),
-        zoom_m_per_px, max_tile_size_px
+    load_distance_m = polyline_profile.load_distance_m
+    corridor_px = 2 * load_distance_m / zoom_m_per_px
+    square_px = max_tile_size_px / np.max(steep + flat)
+    cols = max(1, math.ceil(corridor_px / square_px))
+    width_px = math.ceil(corridor_px / cols)
+    # tiles are as long along the route as the limit allows
+    height_px = int(np.min((max_tile_size_px - width_px * flat) / steep))
+    tile_height_m = height_px * zoom_m_per_px
+
+    # rows also cover load distance before and after every segment, so that bends leave no gaps
+    rows = np.ceil((lengths_m + 2 * load_distance_m) / tile_height_m).astype(np.int64)
+
+    return RouteGridLayout(
+        lat_cells=int(rows.sum()),
+        long_cells=cols,
+        tiles_width_px=width_px,
+        tiles_height_px=height_px,
+        tile_width_m=width_px * zoom_m_per_px,
+        tile_height_m=tile_height_m,
+        first_rows=np.concatenate(([0], np.cumsum(rows)[:-1])),
+        origins=np.column_stack((lats[:-1], longs[:-1]))[segments],
+        m_per_degree=np.column_stack((np.full(len(m_per_long), m_per_lat), m_per_long))[segments],
+        azimuths=azimuths,
+        along_starts=(lengths_m - rows * tile_height_m) / 2
     )
 
-    line_segments = [(polyline_profile.waypoints[i], polyline_profile.waypoints[i+1])
-             for i in range(len(polyline_profile.waypoints) - 1)]
 
-    tile_size_px = (rectangle_grid.tiles_width_px, rectangle_grid.tiles_height_px)
-    min_load_distance_m = max(tile_size_px) * zoom_m_per_px / 2
-    load_distance_m = max(min_load_distance_m, polyline_profile.load_distance_m)
+def rotated_bounds_px(width_px: int, height_px: int, azimuth: float) -> Tuple[int, int]:
+    # size of the north-up image that contains the tile rotated by azimuth
+    cos, sin = abs(math.cos(math.radians(azimuth))), abs(math.sin(math.radians(azimuth)))
+    return (math.ceil(width_px * cos + height_px * sin - 1e-6),
+            math.ceil(width_px * sin + height_px * cos - 1e-6))
+
+
+def web_mercator_grid_layout(
+        north_west: Coordinates,
+        south_east: Coordinates,
+        zoom_lvl: float,
+        max_tile_size_px: float) -> WebMercatorGridLayout:
+    if zoom_lvl is None or not float(zoom_lvl).is_integer():
+        raise MapStorageException('web mercator tiling requires an integer zoom level')
+    if max_tile_size_px < TILE_SIZE_PX:
+        raise MapStorageException(f'web mercator tiling requires tiles of at least {TILE_SIZE_PX}px')
 
-    result_coordinates = []
-    for coords in rectangle_grid.tiles_coordinates:
-        if any(tile_line_distance(coords[1:5], l) < load_distance_m
-                for l in line_segments):
-            result_coordinates.append(coords)
+    # each tile is the biggest power of two block of 256px tiles the provider can render at zoom_lvl
+    scale_levels = min(int(zoom_lvl), max(0, int(math.log2(max_tile_size_px / TILE_SIZE_PX))))
+    key_zoom = int(zoom_lvl) - scale_levels
+    last_tile = 2 ** key_zoom - 1
 
-    return MapTilesGrid(
-        tiles_width_px=rectangle_grid.tiles_width_px,
-        tiles_height_px=rectangle_grid.tiles_height_px,
-        tiles_coordinates=result_coordinates
+    xs, ys = lat_long_to_world_px(np.array([north_west.latitude, south_east.latitude]),
+                                  np.array([north_west.longitude, south_east.longitude]), key_zoom)
+    x0, x1 = sorted(min(last_tile, max(0, int(v // TILE_SIZE_PX))) for v in xs)
+    y0, y1 = sorted(min(last_tile, max(0, int(v // TILE_SIZE_PX))) for v in ys)
+
+    return WebMercatorGridLayout(
+        zoom=key_zoom,
+        x0=x0,
+        y0=y0,
+        lat_cells=y1 - y0 + 1,
+        long_cells=x1 - x0 + 1,
+        tiles_width_px=TILE_SIZE_PX * 2 ** scale_levels,
+        tiles_height_px=TILE_SIZE_PX * 2 ** scale_levels
     )
+
+
+def build_web_mercator_grid(
+        zoom_lvl: float,
+        max_tile_size_px: float,
+        import_profile_type: ImportProfileType,
+        import_profile_args: BaseModel
+) -> MapTilesGrid:
+    if import_profile_type == ImportProfileType.RECTANGLE:
+        args = RectangleProfileArgs(**import_profile_args.model_dump())
+        return MapTilesGrid(web_mercator_grid_layout(args.start, args.end, zoom_lvl, max_tile_size_px))
+
+    if import_profile_type == ImportProfileType.POLYLINE:
+        args = PolylineProfileArgs(**import_profile_args.model_dump())
+        if args.route_aligned:
+            raise MapStorageException('route aligned tiles can not be keyed by web mercator tiling')
+        south_west, north_east = _waypoints_bounds(args.waypoints)
+        layout = web_mercator_grid_layout(
+            Coordinates(north_east.latitude, south_west.longitude),
+            Coordinates(south_west.latitude, north_east.longitude),
+            zoom_lvl, max_tile_size_px
+        )
+
+        min_load_distance_m = layout.cell_size_m()[0] / 2
+        load_distance_m = max(min_load_distance_m, args.load_distance_m)
+        return MapTilesGrid(layout, corridor_cells(layout, args.waypoints, load_distance_m))
+
+    raise NotImplementedError()
+
+
+def corridor_cells(
+        layout: LatticeGridLayout,
+        waypoints: List[Coordinates],
+        load_distance_m: float
+) -> np.ndarray:
+    # a cell belongs to the corridor when any of its corners is closer than load_distance_m to the route,
+    # corners form a regular lattice in a local metric frame, so only lattice windows
+    # around short route pieces are measured
+    row_step_m, col_step_m = layout.cell_size_m()
+    piece_length_m = _corridor_piece_cells * max(row_step_m, col_step_m)
+
+    rows_pos, cols_pos = layout.lattice_position(np.array([p.latitude for p in waypoints]),
+                                                 np.array([p.longitude for p in waypoints]))
+    points = np.column_stack((cols_pos * col_step_m, rows_pos * row_step_m))
+
+    lattice_cols = layout.long_cells + 1
+    near_nodes = []
+    for a, b in zip(points[:-1], points[1:]):
+        pieces = max(1, int(np.ceil(np.hypot(*(b - a)) / piece_length_m)))
+        for piece in range(pieces):
+            pa, pb = a + (b - a) * piece / pieces, a + (b - a) * (piece + 1) / pieces
+
+            rows = _lattice_range(min(pa[1], pb[1]) - load_distance_m, max(pa[1], pb[1]) + load_distance_m,
+                                  row_step_m, layout.lat_cells)
+            cols = _lattice_range(min(pa[0], pb[0]) - load_distance_m, max(pa[0], pb[0]) + load_distance_m,
+                                  col_step_m, layout.long_cells)
+            if not len(rows) or not len(cols):
+                continue
+
+            distances = _segment_distances(cols[None, :] * col_step_m, rows[:, None] * row_step_m, pa, pb)
+            near_rows, near_cols = np.nonzero(distances < load_distance_m)
+            near_nodes.append(rows[near_rows] * lattice_cols + cols[near_cols])
+
+    if not near_nodes:
+        return np.empty(0, np.int64)
+
+    node_rows, node_cols = np.divmod(np.unique(np.concatenate(near_nodes)), lattice_cols)
+
+    # every lattice node is a corner of up to four cells
+    cell_rows = np.concatenate([node_rows - 1, node_rows - 1, node_rows, node_rows])
+    cell_cols = np.concatenate([node_cols - 1, node_cols, node_cols - 1, node_cols])
+    valid = ((0 <= cell_rows) & (cell_rows < layout.lat_cells)
+             & (0 <= cell_cols) & (cell_cols < layout.long_cells))
+
+    return np.unique(cell_rows[valid] * layout.long_cells + cell_cols[valid])
+
+
+def _waypoints_bounds(waypoints: List[Coordinates]) -> Tuple[Coordinates, Coordinates]:
+    # south-west and north-east corners
+    return (Coordinates(latitude=min(p.latitude for p in waypoints),
+                        longitude=min(p.longitude for p in waypoints)),
+            Coordinates(latitude=max(p.latitude for p in waypoints),
+                        longitude=max(p.longitude for p in waypoints)))
+
+
+def _corners(north: np.ndarray, west: np.ndarray, south: np.ndarray, east: np.ndarray) -> np.ndarray:
+    # (n, 4, 2) latitude, longitude of nw, ne, se, sw corners
+    return np.stack([np.stack([north, west], axis=-1), np.stack([north, east], axis=-1),
+                     np.stack([south, east], axis=-1), np.stack([south, west], axis=-1)], axis=1)
+
+
+def _lattice_range(min_m: float, max_m: float, step_m: float, cells: int) -> np.ndarray:
+    return np.arange(max(0, int(np.floor(min_m / step_m))), min(cells, int(np.ceil(max_m / step_m))) + 1)
+
+
+def _segment_distances(xs: np.ndarray, ys: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    d = b - a
+    length2 = d @ d
+    t = 0 if length2 == 0 else np.clip(((xs - a[0]) * d[0] + (ys - a[1]) * d[1]) / length2, 0, 1)
+    return np.hypot(xs - (a[0] + t * d[0]), ys - (a[1] + t * d[1]))
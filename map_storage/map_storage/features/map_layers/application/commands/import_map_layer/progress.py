@@ -0,0 +1,37 @@
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .import_pipeline import ImportPipelineStats
+
+
+@dataclass
+class ImportProgress:
+    tiles_total: int = 0
+    tiles_resumed: int = 0
+    map_layer_id: Optional[int] = None
+    started_at: Optional[float] = None
+    stats: ImportPipelineStats = field(default_factory=ImportPipelineStats.empty)
+
+    def start(self, map_layer_id: int, tiles_total: int, tiles_resumed: int):
+        self.map_layer_id = map_layer_id
+        self.tiles_total = tiles_total
+        self.tiles_resumed = tiles_resumed
+        self.started_at = time.perf_counter()
+
+    @property
+    def tiles_done(self) -> int:
+        return self.tiles_resumed + self.stats.store.tiles
+
+    @property
+    def bytes_downloaded(self) -> int:
+        return self.stats.fetch.bytes
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        stored_tiles = self.stats.store.tiles
+        if self.started_at is None or not stored_tiles:
+            return None
+
+        tiles_per_second = stored_tiles / (time.perf_counter() - self.started_at)
+        return (self.tiles_total - self.tiles_done) / tiles_per_second
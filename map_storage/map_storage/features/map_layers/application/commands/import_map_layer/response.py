@@ -1,5 +1,41 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
+from .import_pipeline import StageStats, ImportPipelineStats
+
+
+class ImportStageStats(BaseModel):
+    tiles: int
+    busy_seconds: float
+    tiles_per_second: float
+
+    @staticmethod
+    def from_stage_stats(stats: StageStats) -> 'ImportStageStats':
+        return ImportStageStats(
+            tiles=stats.tiles,
+            busy_seconds=stats.busy_seconds,
+            tiles_per_second=stats.tiles_per_second
+        )
+
+
+class ImportStats(BaseModel):
+    fetch: ImportStageStats
+    process: ImportStageStats
+    store: ImportStageStats
+
+    @staticmethod
+    def from_pipeline_stats(stats: ImportPipelineStats) -> 'ImportStats':
+        return ImportStats(
+            fetch=ImportStageStats.from_stage_stats(stats.fetch),
+            process=ImportStageStats.from_stage_stats(stats.process),
+            store=ImportStageStats.from_stage_stats(stats.store)
+        )
+
 
 class ImportMapLayerResponse(BaseModel):
     id: int
+    resumed_tiles: int = 0
+    # grid cells already covered by the layer tiles of other imports
+    skipped_tiles: int = 0
+    stats: Optional[ImportStats] = None
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from collections import deque
+from typing import AsyncIterator, Iterable, Optional, Tuple
+
+from map_storage.features.shared.contracts.map_provider import MapProvider, GetTileResult
+
+from .command import FetchOptions
+from .import_pipeline import StageStats, TilesMemoryBudget
+from .map_tiles_grids import GridTile, rotated_bounds_px
+
+
+class RequestsRateLimiter:
+    def __init__(self, max_requests_per_second: Optional[float] = None):
+        self._interval = 1 / max_requests_per_second if max_requests_per_second else 0
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        if not self._interval:
+            return
+
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self._interval
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def fetch_tiles(
+        map_provider: MapProvider,
+        grid_tiles: Iterable[GridTile],
+        zoom: float,
+        width_px: int, height_px: int,
+        options: FetchOptions,
+        stats: Optional[StageStats] = None,
+        memory_budget: Optional[TilesMemoryBudget] = None
+) -> AsyncIterator[Tuple[GridTile, GetTileResult]]:
+    rate_limiter = RequestsRateLimiter(options.max_requests_per_second)
+    limiter_metrics = getattr(map_provider, 'metrics', None)
+
+    def window_size() -> int:
+        if limiter_metrics is None:
+            return options.max_concurrent_requests
+        # an adaptive provider governs concurrency itself, the window only keeps its free slots supplied
+        return max(options.max_concurrent_requests, 2 * int(limiter_metrics.limit))
+
+    async def load_tile(grid_tile: GridTile) -> GetTileResult:
+        await rate_limiter.acquire()
+        started_at = time.perf_counter()
+        # rotated tiles are cut from a north-up image around them after processing
+        tile_res = await map_provider.load_tile(
+            grid_tile.center, zoom, *rotated_bounds_px(width_px, height_px, grid_tile.azimuth))
+
+        if stats is not None:
+            stats.record(time.perf_counter() - started_at, bytes=tile_res.size_bytes())
+
+        return tile_res
+
+    # sliding window of in-flight requests, results are yielded in grid order
+    pending = deque()
+    try:
+        for grid_tile in grid_tiles:
+            if memory_budget is not None:
+                # hand over loaded tiles so they can be persisted and release their memory
+                while memory_budget.exhausted() and pending:
+                    done_tile, task = pending.popleft()
+                    yield done_tile, await task
+
+                await memory_budget.acquire()
+
+            pending.append((grid_tile, asyncio.create_task(load_tile(grid_tile))))
+
+            while len(pending) >= window_size():
+                done_tile, task = pending.popleft()
+                yield done_tile, await task
+
+        while pending:
+            done_tile, task = pending.popleft()
+            yield done_tile, await task
+    finally:
+        for _, task in pending:
+            task.cancel()
+        # none of the cancelled requests outlives the fetch
+        await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+
@@ -0,0 +1,115 @@
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple, Dict
+
+import cv2
+import numpy as np
+
+from map_storage.features.shared.descriptors import QuantizedDescriptors, compact_descriptors
+from map_storage.features.shared.images import encode_image, image_codec, downsample_image
+from map_storage.features.shared.keypoints import keypoints_to_array
+
+from .command import ImportActions
+from .features_detection import canny_hough_detect
+
+
+@dataclass(frozen=True)
+class TileProcessingSettings:
+    save_img: bool
+    surf_hessian_threshold: Optional[int] = None
+    compute_fast: bool = False
+    img_codec: str = 'raw'
+    img_quality: int = 90
+    descriptors_dtype: str = 'float32'
+    overview_factors: Tuple[int, ...] = ()
+
+    @staticmethod
+    def from_actions(actions: ImportActions) -> 'TileProcessingSettings':
+        return TileProcessingSettings(
+            save_img=actions.save_img,
+            surf_hessian_threshold=actions.compute_surf.hessianThreshold if actions.compute_surf else None,
+            compute_fast=actions.compute_fast is not None,
+            img_codec=actions.img_codec.value,
+            img_quality=actions.img_quality,
+            descriptors_dtype=actions.surf_descriptors_dtype.value,
+            overview_factors=tuple(sorted(set(actions.overview_factors)))
+        )
+
+
+@dataclass
+class ProcessedTile:
+    img_shape: Tuple[int, int] = (0, 0)
+    img: Optional[np.ndarray] = None
+    img_encoded: Optional[bytes] = None
+    # KEYPOINT_DTYPE array, cv2.KeyPoint can't be pickled between processes
+    surf_keypoints: Optional[np.ndarray] = None
+    # QuantizedDescriptors for uint8 descriptors
+    surf_descriptors: Optional[np.ndarray | QuantizedDescriptors] = None
+    fast_keypoints: Optional[np.ndarray] = None
+    # encoded overview images by downsampling factor
+    overviews: Optional[Dict[int, bytes]] = None
+    error: Optional[str] = None
+    processing_seconds: float = 0
+
+
+@lru_cache
+def _surf_detector(hessian_threshold: int):
+    return cv2.xfeatures2d.SURF_create(hessianThreshold=hessian_threshold)
+
+
+def rotate_to_tile(img: np.ndarray, azimuth: float, width_px: int, height_px: int) -> np.ndarray:
+    # img is north-up and centered on the tile, turn it so that the tile top faces up and cut the tile
+    center = ((img.shape[1] - 1) / 2, (img.shape[0] - 1) / 2)
+    transform = cv2.getRotationMatrix2D(center, azimuth, 1)
+    transform[:, 2] += ((width_px - 1) / 2 - center[0], (height_px - 1) / 2 - center[1])
+    return cv2.warpAffine(img, transform, (width_px, height_px),
+                          flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def process_tile(img: Optional[np.ndarray],
+                 img_bytes: Optional[bytes],
+                 settings: TileProcessingSettings,
+                 azimuth: float = 0,
+                 tile_size_px: Optional[Tuple[int, int]] = None) -> ProcessedTile:
+    started_at = time.perf_counter()
+
+    if img is None and img_bytes:
+        img = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_COLOR)
+
+    if img is None:
+        return ProcessedTile(error='Map provider returned no img')
+
+    rotated = bool(azimuth) and tile_size_px is not None
+    if rotated:
+        img = rotate_to_tile(img, azimuth, *tile_size_px)
+
+    res = ProcessedTile(img_shape=img.shape[:2])
+
+    if settings.save_img and settings.img_codec == 'raw':
+        res.img = img
+    elif settings.save_img and settings.img_codec == 'png' and not rotated and img_bytes \
+            and image_codec(img_bytes) == 'png':
+        # lossless provider image decodes to the same pixels, no need to encode it again
+        res.img_encoded = img_bytes
+    elif settings.save_img:
+        res.img_encoded = encode_image(img, settings.img_codec, settings.img_quality)
+
+    if settings.overview_factors:
+        # raw layers keep lossless overviews
+        overview_codec = settings.img_codec if settings.img_codec != 'raw' else 'png'
+        res.overviews = {f: encode_image(downsample_image(img, f), overview_codec, settings.img_quality)
+                         for f in settings.overview_factors}
+
+    if settings.surf_hessian_threshold is not None:
+        img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        keypoints, descriptors = (_surf_detector(settings.surf_hessian_threshold)
+                                  .detectAndCompute(img_gray, None))
+        res.surf_keypoints = keypoints_to_array(keypoints)
+        res.surf_descriptors = compact_descriptors(descriptors, settings.descriptors_dtype)
+
+    if settings.compute_fast:
+        res.fast_keypoints = canny_hough_detect(img, 9, (300, 330), 30, 30, 5)
+
+    res.processing_seconds = time.perf_counter() - started_at
+    return res
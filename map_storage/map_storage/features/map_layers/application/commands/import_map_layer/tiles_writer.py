@@ -0,0 +1,54 @@
+import time
+from typing import List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from map_storage.features.map_layers.data.tiles_store import next_layer_version, bulk_insert_tiles, tile_row, \
+    tile_payload, tile_overviews
+from map_storage.features.map_layers.models.map_tile import MapTile
+
+from .import_pipeline import StageStats, TilesMemoryBudget
+
+
+class TilesBatchWriter:
+    def __init__(self,
+                 db: AsyncSession,
+                 batch_size: int,
+                 memory_budget: Optional[TilesMemoryBudget] = None,
+                 stats: Optional[StageStats] = None):
+        self._db = db
+        self._batch_size = min(batch_size, memory_budget.max_tiles) if memory_budget else batch_size
+        self._memory_budget = memory_budget
+        self._stats = stats
+        self._batch: List[MapTile] = []
+
+    async def add(self, tile: MapTile):
+        self._batch.append(tile)
+
+        if len(self._batch) >= self._batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self._batch:
+            return
+
+        # tiles aren't added to the session, they are inserted in bulk and not needed by the import afterwards
+        started_at = time.perf_counter()
+        # every batch is a new version of the layer, reserved right before the insert so that the layer row
+        # is locked only until the batch is committed
+        version = await next_layer_version(self._db, self._batch[0].map_layer_id)
+        for tile in self._batch:
+            tile.version = version
+        await bulk_insert_tiles(self._db,
+                                [tile_row(t) for t in self._batch],
+                                [tile_payload(t) for t in self._batch],
+                                [tile_overviews(t) for t in self._batch])
+        await self._db.commit()
+
+        if self._memory_budget is not None:
+            self._memory_budget.release(len(self._batch))
+
+        if self._stats is not None:
+            self._stats.record(time.perf_counter() - started_at, len(self._batch))
+
+        self._batch = []
@@ -0,0 +1,58 @@
+from typing import Optional
+
+from pydantic import BaseModel, constr
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from map_storage.features.map_layers.data.layer_bundle import LayerBundleReader
+from map_storage.features.map_layers.data.tiles_store import next_layer_version, insert_tiles
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.shared.exceptions import MapStorageException
+
+
+class ImportMapLayerBundleCommand(BaseModel):
+    path: str
+    # the bundled layer name is kept when not set
+    layer_name: Optional[constr(min_length=1, max_length=50)] = None
+
+
+class ImportMapLayerBundleResponse(BaseModel):
+    id: int
+    tiles: int
+
+
+class ImportMapLayerBundleHandler:
+    def __init__(self, db: AsyncSession):
+        self._db = db
+
+    async def __call__(self, command: ImportMapLayerBundleCommand) -> ImportMapLayerBundleResponse:
+        reader = LayerBundleReader(command.path)
+        try:
+            settings = dict(reader.layer)
+            source_layer_id, source_version = settings.pop('id'), settings.pop('version')
+            if command.layer_name is not None:
+                settings['name'] = command.layer_name
+            if await self._db.scalar(select(MapLayer.id).where(MapLayer.name == settings['name']).limit(1)):
+                raise MapStorageException("map layer with same name already exist")
+
+            # the copy can be kept up to date with SyncMapLayerHandler from the bundled version on
+            map_layer = MapLayer(**settings)
+            map_layer.source_layer_id = source_layer_id
+            map_layer.synced_version = source_version
+            self._db.add(map_layer)
+            await self._db.flush()
+
+            map_layer_id, tiles = map_layer.id, 0
+            version = await next_layer_version(self._db, map_layer_id)
+            for batch in reader.batches():
+                await insert_tiles(self._db, map_layer_id, version, batch.tiles, batch.payloads, batch.overviews)
+                tiles += len(batch)
+
+            await self._db.commit()
+        except BaseException:
+            await self._db.rollback()
+            raise
+        finally:
+            reader.close()
+
+        return ImportMapLayerBundleResponse(id=map_layer_id, tiles=tiles)
@@ -0,0 +1,2 @@
+from .command import ImportRasterLayerCommand
+from .command_handler import ImportRasterLayerHandler
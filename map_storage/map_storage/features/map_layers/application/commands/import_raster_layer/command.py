@@ -0,0 +1,29 @@
+from typing import Optional, List, Tuple
+
+from pydantic import BaseModel, conint, constr, confloat
+
+from map_storage.features.map_layers.application.commands.import_map_layer import (
+    ImportProfileType, TilingScheme, RectangleProfileArgs, PolylineProfileArgs, ImportActions,
+    ProcessingOptions, PersistenceOptions
+)
+
+
+class ImportRasterLayerCommand(BaseModel):
+    raster_path: constr(min_length=1)
+    layer_name: constr(min_length=1, max_length=50)
+    actions: ImportActions
+    # raster native resolution is used when not set
+    zoom_lvl: Optional[confloat(ge=0, le=23)] = None
+    # whole raster extent is imported when not set
+    import_profile_type: Optional[ImportProfileType] = None
+    import_profile_args: Optional[PolylineProfileArgs|RectangleProfileArgs] = None
+    # web mercator tiling uses the closest integer zoom above the raster resolution when zoom_lvl is not set
+    tiling: TilingScheme = TilingScheme.PROFILE
+    # raster bands read as red, green, blue, a single band is read as grayscale
+    bands: List[conint(ge=1)] = [1, 2, 3]
+    # values mapped to 0..255 for rasters other than 8-bit, the range of the read bands is used when not set
+    value_range: Optional[Tuple[float, float]] = None
+    max_tile_size_px: conint(ge=64, le=4096) = 640
+    processing: ProcessingOptions = ProcessingOptions()
+    persistence: PersistenceOptions = PersistenceOptions()
+    description: Optional[constr(max_length=200)] = None
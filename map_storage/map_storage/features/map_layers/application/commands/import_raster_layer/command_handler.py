@@ -0,0 +1,121 @@
+import asyncio
+import math
+from concurrent.futures import Executor
+from functools import partial
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.shared.contracts.repository import Repository
+from map_storage.features.shared.exceptions import MapStorageException
+from map_storage.features.shared.models.coordinates import Coordinates
+from map_storage.features.shared.web_mercator import meters_per_px
+
+from ..import_map_layer import ImportProfileType, TilingScheme, RectangleProfileArgs, ImportProgress
+from ..import_map_layer.import_pipeline import TilesMemoryBudget, create_processing_pool, run_processing_jobs
+from ..import_map_layer.layer_import import (
+    create_map_layer, begin_layer_import, store_processed_tiles, complete_layer_import
+)
+from ..import_map_layer.map_tiles_grids import build_tiles_grid
+from ..import_map_layer.response import ImportMapLayerResponse, ImportStats
+from ..import_map_layer.tiles_processing import TileProcessingSettings
+from ..import_map_layer.tiles_writer import TilesBatchWriter
+from .command import ImportRasterLayerCommand
+from .raster_windows import read_raster_info, read_raster_value_range, process_raster_window
+
+
+class ImportRasterLayerHandler:
+    def __init__(self,
+                 db: AsyncSession,
+                 map_layer_repo: Repository[MapLayer],
+                 executor: Optional[Executor] = None,
+                 progress: Optional[ImportProgress] = None):
+        self._db = db
+        self.map_layer_repo = map_layer_repo
+        self._executor = executor
+        self._progress = progress
+
+    async def __call__(self, command: ImportRasterLayerCommand):
+        if len(command.bands) not in (1, 3):
+            raise MapStorageException('raster must be read as 1 grayscale or 3 color bands')
+
+        if (command.import_profile_type is None) != (command.import_profile_args is None):
+            raise MapStorageException('import_profile_type and import_profile_args must be set together')
+
+        if command.value_range is not None and command.value_range[0] >= command.value_range[1]:
+            raise MapStorageException('value_range must be increasing')
+
+        raster = await asyncio.to_thread(read_raster_info, command.raster_path)
+        value_range = command.value_range or await asyncio.to_thread(
+            read_raster_value_range, command.raster_path, tuple(command.bands))
+        zoom_lvl = command.zoom_lvl if command.zoom_lvl is not None else raster.zoom_lvl
+        if command.zoom_lvl is None and command.tiling == TilingScheme.WEB_MERCATOR:
+            zoom_lvl = math.ceil(zoom_lvl)
+
+        import_profile_type = command.import_profile_type or ImportProfileType.RECTANGLE
+        import_profile_args = command.import_profile_args or RectangleProfileArgs(
+            start=Coordinates(raster.north, raster.west),
+            end=Coordinates(raster.south, raster.east)
+        )
+
+        map_layer, layer_import, stored_grid_indices = await begin_layer_import(
+            self._db,
+            self.map_layer_repo,
+            create_map_layer(
+                command.layer_name, import_profile_type, zoom_lvl,
+                command.actions, command.description, command.tiling),
+            import_profile_type,
+            {**import_profile_args.model_dump(mode='json'), 'raster_path': command.raster_path}
+        )
+
+        tiles_grid = build_tiles_grid(
+            meters_per_px(zoom_lvl),
+            command.max_tile_size_px,
+            import_profile_type,
+            import_profile_args,
+            command.tiling,
+            zoom_lvl
+        )
+
+        progress = self._progress or ImportProgress()
+        progress.start(map_layer.id, len(tiles_grid), len(stored_grid_indices))
+        stats = progress.stats
+        memory_budget = TilesMemoryBudget.for_tile_size(
+            command.persistence.max_memory_mb, tiles_grid.tiles_width_px, tiles_grid.tiles_height_px)
+        tiles_writer = TilesBatchWriter(
+            self._db, command.persistence.batch_size, memory_budget, stats.store)
+        executor = self._executor or create_processing_pool(command.processing.workers)
+        settings = TileProcessingSettings.from_actions(command.actions)
+
+        async def raster_windows():
+            # windows are read inside pool workers, only their processed results come back
+            for grid_tile in tiles_grid.grid_tiles(skip_indices=stored_grid_indices):
+                await memory_budget.acquire()
+                yield grid_tile, partial(
+                    process_raster_window,
+                    command.raster_path,
+                    grid_tile.coordinates[1:],
+                    tiles_grid.tiles_width_px, tiles_grid.tiles_height_px,
+                    tuple(command.bands),
+                    settings,
+                    grid_tile.azimuth,
+                    value_range
+                )
+
+        processed_tiles = run_processing_jobs(
+            raster_windows(), executor, command.processing.queue_size, stats.process)
+
+        try:
+            await store_processed_tiles(map_layer, layer_import, processed_tiles, tiles_writer)
+        finally:
+            if executor is not self._executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        await complete_layer_import(self._db, layer_import, len(tiles_grid))
+
+        return ImportMapLayerResponse(
+            id=map_layer.id,
+            resumed_tiles=len(stored_grid_indices),
+            stats=ImportStats.from_pipeline_stats(stats)
+        )
@@ -0,0 +1,158 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from map_storage.features.shared.exceptions import MapStorageException
+from map_storage.features.shared.models.coordinates import Coordinates
+from map_storage.features.shared.web_mercator import EQUATOR_METERS_PER_PX
+
+from ..import_map_layer.map_tiles_grids import rotated_bounds_px
+from ..import_map_layer.tiles_processing import TileProcessingSettings, ProcessedTile, process_tile
+
+_meters_per_degree = 111320
+_max_open_rasters = 8
+# longest side of the decimated read the value range of a raster is computed from
+_value_range_sample_px = 1024
+# datasets aren't shared between threads, each worker thread keeps its own
+_open_rasters = threading.local()
+
+
+def require_rasterio():
+    try:
+        import rasterio
+        import rasterio.warp
+        import rasterio.windows
+    except ImportError:
+        raise MapStorageException('rasterio is required to import raster layers, install map_storage[geotiff]')
+    return rasterio
+
+
+@dataclass(frozen=True)
+class RasterInfo:
+    north: float
+    west: float
+    south: float
+    east: float
+    meters_per_px: float
+
+    @property
+    def zoom_lvl(self) -> float:
+        return math.log2(EQUATOR_METERS_PER_PX / self.meters_per_px)
+
+
+def read_raster_info(raster_path: str) -> RasterInfo:
+    rasterio = require_rasterio()
+
+    with rasterio.open(raster_path) as dataset:
+        if dataset.crs is None:
+            raise MapStorageException(f'{raster_path} is not georeferenced')
+
+        west, south, east, north = rasterio.warp.transform_bounds(dataset.crs, 'EPSG:4326', *dataset.bounds)
+        res_x = abs(dataset.res[0])
+        if dataset.crs.is_geographic:
+            meters_per_px = res_x * _meters_per_degree * math.cos(math.radians((north + south) / 2))
+        else:
+            meters_per_px = res_x * dataset.crs.linear_units_factor[1]
+
+    return RasterInfo(north, west, south, east, meters_per_px)
+
+
+def read_raster_value_range(raster_path: str, bands: Tuple[int, ...]) -> Optional[Tuple[float, float]]:
+    # range of the valid values of the bands, mapped to 0..255 when the raster isn't 8-bit.
+    # One range for the whole raster keeps brightness of neighbouring tiles consistent
+    rasterio = require_rasterio()
+
+    with rasterio.open(raster_path) as dataset:
+        if max(bands) > dataset.count:
+            raise MapStorageException(f'{raster_path} has {dataset.count} bands')
+        if all(dataset.dtypes[band - 1] == 'uint8' for band in bands):
+            return None
+
+        scale = min(1.0, _value_range_sample_px / max(dataset.width, dataset.height))
+        data = dataset.read(
+            indexes=list(bands), masked=True,
+            out_shape=(len(bands), max(1, round(dataset.height * scale)), max(1, round(dataset.width * scale))),
+            resampling=rasterio.enums.Resampling.nearest)
+
+    # nodata pixels are masked, nan and infinite values are left out too
+    values = data.compressed()
+    values = values[np.isfinite(values)]
+    if not values.size:
+        raise MapStorageException(f'{raster_path} has no valid values in bands {list(bands)}')
+
+    low, high = float(values.min()), float(values.max())
+    return low, high if high > low else low + 1
+
+
+def _open_raster(raster_path: str):
+    # datasets stay open in pool workers between windows of the same import, a file replaced
+    # since it was opened is opened again
+    stat = os.stat(raster_path)
+    key = (raster_path, stat.st_mtime_ns, stat.st_size)
+    datasets: OrderedDict = getattr(_open_rasters, 'datasets', None)
+    if datasets is None:
+        datasets = _open_rasters.datasets = OrderedDict()
+
+    dataset = datasets.get(key)
+    if dataset is not None:
+        datasets.move_to_end(key)
+        return dataset
+
+    for stale_key in [k for k in datasets if k[0] == raster_path]:
+        datasets.pop(stale_key).close()
+    while len(datasets) >= _max_open_rasters:
+        datasets.popitem(last=False)[1].close()
+
+    dataset = datasets[key] = require_rasterio().open(raster_path)
+    return dataset
+
+
+def process_raster_window(raster_path: str,
+                          corners: Tuple[Coordinates, ...],
+                          width_px: int, height_px: int,
+                          bands: Tuple[int, ...],
+                          settings: TileProcessingSettings,
+                          azimuth: float = 0,
+                          value_range: Optional[Tuple[float, float]] = None) -> ProcessedTile:
+    started_at = time.perf_counter()
+    rasterio = require_rasterio()
+
+    try:
+        dataset = _open_raster(raster_path)
+        xs, ys = rasterio.warp.transform(
+            'EPSG:4326', dataset.crs, [c.longitude for c in corners], [c.latitude for c in corners])
+        window = rasterio.windows.from_bounds(min(xs), min(ys), max(xs), max(ys), dataset.transform)
+        # rotated tiles are read with their north-up bounds and turned by process_tile
+        window_width_px, window_height_px = rotated_bounds_px(width_px, height_px, azimuth)
+
+        # only the blocks under the window are read, decimated by gdal to the tile size
+        data = dataset.read(
+            indexes=list(bands), window=window, out_shape=(len(bands), window_height_px, window_width_px),
+            boundless=True, fill_value=0, resampling=rasterio.enums.Resampling.bilinear)
+    except (rasterio.errors.RasterioError, OSError) as e:
+        return ProcessedTile(error=f'{raster_path}: {e}')
+
+    res = process_tile(_to_bgr(data, value_range), None, settings, azimuth, (width_px, height_px))
+    res.processing_seconds = time.perf_counter() - started_at
+    return res
+
+
+def _to_bgr(data: np.ndarray, value_range: Optional[Tuple[float, float]] = None) -> np.ndarray:
+    if data.dtype != np.uint8:
+        if value_range is None:
+            value_range = (0, np.iinfo(data.dtype).max if np.issubdtype(data.dtype, np.integer) else 1.0)
+        low, high = value_range
+        scaled = np.nan_to_num((data.astype(np.float32) - low) * (255 / (high - low)))
+        data = np.clip(scaled, 0, 255).astype(np.uint8)
+
+    img = np.moveaxis(data, 0, -1)
+    if img.shape[2] == 1:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    return np.ascontiguousarray(img[:, :, 2::-1])
@@ -0,0 +1,154 @@
+from typing import Optional
+
+from pydantic import BaseModel, conint
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from map_storage.features.map_layers.data.tiles_store import raw_tiles_select, raw_payloads_table, \
+    tiles_records, tiles_payloads, payloads_size, next_layer_version, insert_tiles, delete_tiles, \
+    select_overviews, overviews_size, PAYLOAD_COLUMNS, TILE_DTYPE
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.map_layers.models.map_tile import MapTile
+from map_storage.features.map_layers.models.map_tile_overview import MapTileOverview
+from map_storage.features.map_layers.models.map_tile_tombstone import MapTileTombstone
+from map_storage.features.shared.exceptions import NotFoundException, MapStorageException
+
+_tombstone_size = 8
+
+
+class SyncMapLayerCommand(BaseModel):
+    source_layer_id: conint(ge=1)
+
+
+class SyncMapLayerResponse(BaseModel):
+    id: int
+    source_layer_id: int
+    synced_version: int
+    upserted_tiles: int
+    deleted_tiles: int
+    # tile rows, payloads, overviews and tombstones read from the source
+    transferred_bytes: int
+    full_copy_bytes: int
+    saved_bytes: int
+
+
+class SyncMapLayerHandler:
+    # brings the copy of a source db layer in the target db to the current source layer version,
+    # creating the copy on the first sync
+    def __init__(self, source_db: AsyncSession, target_db: AsyncSession, batch_size: int = 500):
+        self._source_db = source_db
+        self._target_db = target_db
+        self._batch_size = batch_size
+
+    async def __call__(self, command: SyncMapLayerCommand) -> SyncMapLayerResponse:
+        source_layer = await self._source_db.get(MapLayer, command.source_layer_id)
+        if source_layer is None:
+            raise NotFoundException()
+        # tiles written during the sync are newer than this version and come with the next one
+        source_version = source_layer.version
+
+        target_layer = await self._target_layer(source_layer)
+        target_layer_id = target_layer.id
+        # the first sync copies every tile, tiles written before layer versions were added have version 0
+        synced_version = target_layer.synced_version
+
+        version = await next_layer_version(self._target_db, target_layer_id)
+        upserted, transferred = await self._sync_tiles(
+            source_layer.id, synced_version, target_layer_id, version)
+        deleted = 0
+        if synced_version is not None:
+            deleted, tombstones = await self._sync_tombstones(
+                source_layer.id, synced_version, target_layer_id, version)
+            transferred += tombstones * _tombstone_size
+
+        target_layer.synced_version = source_version
+        await self._target_db.commit()
+
+        full_copy = await self._full_copy_size(source_layer.id)
+        return SyncMapLayerResponse(
+            id=target_layer_id,
+            source_layer_id=command.source_layer_id,
+            synced_version=source_version,
+            upserted_tiles=upserted,
+            deleted_tiles=deleted,
+            transferred_bytes=transferred,
+            full_copy_bytes=full_copy,
+            saved_bytes=max(full_copy - transferred, 0)
+        )
+
+    async def _target_layer(self, source_layer: MapLayer) -> MapLayer:
+        target_layer: Optional[MapLayer] = await self._target_db.scalar(
+            select(MapLayer).where(MapLayer.source_layer_id == source_layer.id))
+
+        if target_layer is None:
+            target_layer = MapLayer(**source_layer.settings())
+            target_layer.source_layer_id = source_layer.id
+            self._target_db.add(target_layer)
+            await self._target_db.flush()
+        elif not target_layer.has_same_settings(source_layer):
+            raise MapStorageException('source layer settings changed, the layer has to be copied again')
+
+        return target_layer
+
+    async def _sync_tiles(self,
+                          source_layer_id: int,
+                          synced_version: Optional[int],
+                          target_layer_id: int,
+                          version: int):
+        # new and changed tiles replace their previous copies, batches are read in source id order
+        changed = (MapTile.version > synced_version,) if synced_version is not None else ()
+        upserted, transferred, last_id = 0, 0, 0
+        while True:
+            rows = (await self._source_db.execute(
+                raw_tiles_select(MapTile.map_layer_id == source_layer_id,
+                                 *changed,
+                                 MapTile.id > last_id)
+                .order_by(MapTile.id.asc())
+                .limit(self._batch_size))).all()
+
+            if not rows:
+                return upserted, transferred
+
+            tiles, payloads = tiles_records(rows), tiles_payloads(rows)
+            source_ids = tiles['id'].tolist()
+            source_overviews = await select_overviews(self._source_db, source_ids)
+            overviews = [source_overviews.get(tile_id, []) for tile_id in source_ids]
+
+            await delete_tiles(self._target_db, target_layer_id, version, MapTile.source_id.in_(source_ids))
+            await insert_tiles(self._target_db, target_layer_id, version, tiles, payloads, overviews)
+
+            upserted += len(rows)
+            transferred += tiles.nbytes + payloads_size(payloads) + overviews_size(overviews)
+            last_id = source_ids[-1]
+
+    async def _sync_tombstones(self, source_layer_id: int, synced_version: int, target_layer_id: int, version: int):
+        deleted, tombstones, last_id = 0, 0, 0
+        while True:
+            rows = (await self._source_db.execute(
+                select(MapTileTombstone.id, MapTileTombstone.tile_id)
+                .where(MapTileTombstone.map_layer_id == source_layer_id)
+                .where(MapTileTombstone.version > synced_version)
+                .where(MapTileTombstone.id > last_id)
+                .order_by(MapTileTombstone.id.asc())
+                .limit(self._batch_size))).all()
+
+            if not rows:
+                return deleted, tombstones
+
+            deleted += await delete_tiles(self._target_db, target_layer_id, version,
+                                          MapTile.source_id.in_([r.tile_id for r in rows]))
+            tombstones += len(rows)
+            last_id = rows[-1].id
+
+    async def _full_copy_size(self, source_layer_id: int) -> int:
+        tiles, payloads = (await self._source_db.execute(
+            select(func.count(MapTile.id),
+                   sum(func.coalesce(func.sum(func.length(raw_payloads_table.c[c])), 0) for c in PAYLOAD_COLUMNS))
+            .outerjoin(raw_payloads_table, raw_payloads_table.c.tile_id == MapTile.id)
+            .where(MapTile.map_layer_id == source_layer_id))).one()
+        overviews = await self._source_db.scalar(
+            select(func.coalesce(func.sum(func.length(MapTileOverview.img_encoded)), 0))
+            .join(MapTile, MapTile.id == MapTileOverview.tile_id)
+            .where(MapTile.map_layer_id == source_layer_id))
+
+        return tiles * TILE_DTYPE.itemsize + payloads + overviews
@@ -0,0 +1,190 @@
+from typing import Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from map_storage.features.map_layers.application.commands.import_map_layer import (
+    ImportProfileType, TilingScheme, ImageCodec, RectangleProfileArgs, PolylineProfileArgs, ImportActions,
+    FetchOptions
+)
+from map_storage.features.map_layers.application.commands.import_map_layer.map_tiles_grids import build_tiles_grid
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.map_layers.models.map_tile import MapTile, MapTilePayload
+from map_storage.features.map_layers.models.map_tile_overview import MapTileOverview
+from map_storage.features.shared.contracts.map_provider import MapProvider
+
+# images are stored as raw BGR arrays
+_default_img_bytes_per_megapixel = 3 * 10 ** 6
+
+
+class EstimateMapLayerImportQuery(BaseModel):
+    import_profile_type: ImportProfileType
+    import_profile_args: PolylineProfileArgs|RectangleProfileArgs
+    zoom_lvl: float
+    actions: ImportActions
+    tiling: TilingScheme = TilingScheme.PROFILE
+    fetch: FetchOptions = FetchOptions()
+
+
+class ArtifactEstimate(BaseModel):
+    # unknown when no stored tile has the artifact
+    bytes_per_megapixel: Optional[float] = None
+    total_bytes: Optional[int] = None
+    # stored tiles the size was measured on, 0 for a default
+    sampled_tiles: int = 0
+
+
+class EstimateMapLayerImportResponse(BaseModel):
+    tiles: int
+    provider_requests: int
+    tile_width_px: int
+    tile_height_px: int
+    megapixels: float
+    img: Optional[ArtifactEstimate] = None
+    surf_keypoints: Optional[ArtifactEstimate] = None
+    surf_descriptors: Optional[ArtifactEstimate] = None
+    fast_keypoints: Optional[ArtifactEstimate] = None
+    # images of all overview factors, per megapixel of the full resolution tiles
+    overviews: Optional[ArtifactEstimate] = None
+    total_bytes: Optional[int] = None
+    estimated_seconds: Optional[float] = None
+
+
+class EstimateMapLayerImportQueryHandler:
+    def __init__(self,
+                 db: AsyncSession,
+                 map_provider: MapProvider,
+                 request_latency_s: Optional[float] = None,
+                 sample_size: int = 2000):
+        self._db = db
+        self._map_provider = map_provider
+        self._request_latency_s = request_latency_s
+        self._sample_size = sample_size
+
+    async def __call__(self, query: EstimateMapLayerImportQuery) -> EstimateMapLayerImportResponse:
+        tiles_grid = build_tiles_grid(
+            self._map_provider.zoom_lvl_to_meters_per_px(query.zoom_lvl),
+            self._map_provider.max_tile_size_px(),
+            query.import_profile_type,
+            query.import_profile_args,
+            query.tiling,
+            query.zoom_lvl
+        )
+        tiles = len(tiles_grid)
+        megapixels = tiles * tiles_grid.tiles_width_px * tiles_grid.tiles_height_px / 10 ** 6
+
+        res = EstimateMapLayerImportResponse(
+            tiles=tiles,
+            provider_requests=tiles,
+            tile_width_px=tiles_grid.tiles_width_px,
+            tile_height_px=tiles_grid.tiles_height_px,
+            megapixels=megapixels,
+            estimated_seconds=self._fetch_seconds(tiles, query.fetch)
+        )
+
+        actions = query.actions
+        if actions.save_img and actions.img_codec == ImageCodec.RAW:
+            res.img = await self._artifact_estimate(MapTilePayload.img, megapixels, _default_img_bytes_per_megapixel)
+        elif actions.save_img:
+            # compressed sizes are only comparable between layers of the same codec
+            res.img = await self._artifact_estimate(
+                MapTilePayload.img_encoded, megapixels,
+                criteria=(MapLayer._img_codec == actions.img_codec.value,),
+                preferred_criteria=(MapLayer._img_quality == actions.img_quality,))
+
+        if actions.compute_surf is not None:
+            # keypoints count depends on the hessian threshold, prefer layers computed with the same one
+            same_threshold = MapLayer._surf_min_hessian == actions.compute_surf.hessianThreshold
+            res.surf_keypoints = await self._artifact_estimate(MapTilePayload.surf_keypoints, megapixels,
+                                                               preferred_criteria=(same_threshold,))
+            res.surf_descriptors = await self._artifact_estimate(
+                MapTilePayload.surf_descriptors, megapixels,
+                criteria=(MapLayer._descriptors_dtype == actions.surf_descriptors_dtype.value,),
+                preferred_criteria=(same_threshold,))
+
+        if actions.compute_fast is not None:
+            res.fast_keypoints = await self._artifact_estimate(MapTilePayload.fast_keypoints, megapixels)
+
+        if actions.overview_factors:
+            res.overviews = await self._overviews_estimate(actions, megapixels)
+
+        artifacts = [a for a in (res.img, res.surf_keypoints, res.surf_descriptors, res.fast_keypoints,
+                                 res.overviews) if a]
+        if all(a.total_bytes is not None for a in artifacts):
+            res.total_bytes = sum(a.total_bytes for a in artifacts)
+
+        return res
+
+    async def _overviews_estimate(self, actions: ImportActions, megapixels: float) -> ArtifactEstimate:
+        # overviews are encoded with the layer codec, png for raw layers, and measured for each factor
+        estimates = [await self._artifact_estimate(
+            MapTileOverview.img_encoded, megapixels,
+            criteria=(MapLayer._img_codec == actions.img_codec.value,),
+            preferred_criteria=(MapLayer._img_quality == actions.img_quality,),
+            rows_criteria=(MapTileOverview.factor == factor,))
+            for factor in sorted(set(actions.overview_factors))]
+
+        if any(e.bytes_per_megapixel is None for e in estimates):
+            return ArtifactEstimate(sampled_tiles=min(e.sampled_tiles for e in estimates))
+        return ArtifactEstimate(
+            bytes_per_megapixel=sum(e.bytes_per_megapixel for e in estimates),
+            total_bytes=sum(e.total_bytes for e in estimates),
+            sampled_tiles=min(e.sampled_tiles for e in estimates)
+        )
+
+    async def _artifact_estimate(self,
+                                 column,
+                                 megapixels: float,
+                                 default_bytes_per_megapixel: Optional[float] = None,
+                                 criteria=(),
+                                 preferred_criteria=(),
+                                 rows_criteria=()) -> ArtifactEstimate:
+        sampled_tiles, bytes_per_megapixel = 0, None
+        if preferred_criteria:
+            sampled_tiles, bytes_per_megapixel = await self._sample_bytes_per_megapixel(
+                column, (*criteria, *preferred_criteria), rows_criteria)
+        if not sampled_tiles:
+            sampled_tiles, bytes_per_megapixel = await self._sample_bytes_per_megapixel(
+                column, criteria, rows_criteria)
+
+        if not sampled_tiles:
+            bytes_per_megapixel = default_bytes_per_megapixel
+
+        return ArtifactEstimate(
+            bytes_per_megapixel=bytes_per_megapixel,
+            total_bytes=round(bytes_per_megapixel * megapixels) if bytes_per_megapixel is not None else None,
+            sampled_tiles=sampled_tiles
+        )
+
+    async def _sample_bytes_per_megapixel(self,
+                                          column,
+                                          layers_criteria=(),
+                                          rows_criteria=()) -> Tuple[int, Optional[float]]:
+        # the most recently stored tiles are measured, so the estimate doesn't scan whole layers.
+        # column is a payload or overview column, sizes are relative to the full resolution tile
+        tile_id = column.class_.tile_id
+        sample = select(
+            func.length(column).label('size'),
+            (MapTile.img_width * MapTile.img_height).label('px')
+        ).join(MapTile, MapTile.id == tile_id).where(column.is_not(None)).where(*rows_criteria)
+
+        if layers_criteria:
+            sample = sample.where(MapTile.map_layer_id.in_(select(MapLayer.id).where(*layers_criteria)))
+
+        sample = sample.order_by(tile_id.desc()).limit(self._sample_size).subquery()
+        tiles, size, px = (await self._db.execute(
+            select(func.count(), func.sum(sample.c.size), func.sum(sample.c.px)))).one()
+
+        if not tiles or not px:
+            return 0, None
+        return tiles, size / px * 10 ** 6
+
+    def _fetch_seconds(self, requests: int, fetch: FetchOptions) -> Optional[float]:
+        rates = []
+        if self._request_latency_s:
+            rates.append(fetch.max_concurrent_requests / self._request_latency_s)
+        if fetch.max_requests_per_second:
+            rates.append(fetch.max_requests_per_second)
+
+        return requests / min(rates) if rates else None
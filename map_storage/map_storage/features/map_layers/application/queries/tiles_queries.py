@@ -1,16 +1,25 @@
-from typing import List, Optional, Sequence, Any, Callable, Tuple
+import math
+from typing import List, Optional, Any, Callable, Tuple, Dict
 import cv2
 import geopy
 import geopy.distance
 import numpy as np
-from pydantic import BaseModel
+from pydantic import BaseModel, confloat
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from dataclasses import dataclass
+from functools import cached_property
 
-from map_storage.features.map_layers.models.map_tile import MapTile
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.map_layers.models.map_tile import MapTile, MapTilePayload
+from map_storage.features.map_layers.models.map_tile_overview import MapTileOverview
+from map_storage.features.shared.descriptors import QuantizedDescriptors, float32_descriptors
+from map_storage.features.shared.images import EncodedImage
+from map_storage.features.shared.keypoints import keypoints_from_array
 from map_storage.features.shared.models.coordinates import Coordinates
 
+_payloads_chunk_size = 5000
+
 
 class ListTilesQuery(BaseModel):
     layers_ids: List[int]
@@ -27,11 +36,30 @@ class TileResponse:
     longitude: float
     vertices: List[Tuple[float, float]]
     azimuth: float
-    img: Optional[np.ndarray]
-    surf_keypoints: Sequence[cv2.KeyPoint]
-    surf_descriptors: np.ndarray[Any, np.dtype[np.generic]]
+    # the image as it is stored, see img
+    img_encoded: Optional[EncodedImage]
+    # KEYPOINT_DTYPE structured array, see surf_cv_keypoints
+    surf_keypoints: Optional[np.ndarray]
+    # descriptors in the stored dtype of the layer, QuantizedDescriptors for uint8 layers, see surf_descriptors
+    surf_descriptors_raw: Optional[np.ndarray[Any, np.dtype[np.generic]] | QuantizedDescriptors]
     fast_keypoints: Optional[np.ndarray]
     img_shape: Tuple[int, int]
+    key: Optional[Tuple[int, int, int]] = None
+    # downsampling factor of overview images, 1 for full resolution
+    overview_factor: int = 1
+
+    @property
+    def img(self) -> Optional[np.ndarray]:
+        # compressed images are decoded on first access
+        return self.img_encoded.pixels if self.img_encoded is not None else None
+
+    @cached_property
+    def surf_descriptors(self) -> Optional[np.ndarray]:
+        # float32, descriptors of float16 and uint8 layers are converted on first access
+        return float32_descriptors(self.surf_descriptors_raw)
+
+    def surf_cv_keypoints(self) -> Optional[List[cv2.KeyPoint]]:
+        return keypoints_from_array(self.surf_keypoints) if self.surf_keypoints is not None else None
 
 
 async def query_tiles_wrapper(
@@ -40,6 +68,7 @@ async def query_tiles_wrapper(
         db_query: Callable):
 
     select_attributes = [
+        MapTile.id,
         MapTile.center_lat, MapTile.center_long,
         MapTile.nw_lat, MapTile.nw_long,
         MapTile.ne_lat, MapTile.ne_long,
@@ -47,31 +76,65 @@ async def query_tiles_wrapper(
         MapTile.sw_lat, MapTile.sw_long,
         MapTile.azimuth,
         MapTile.img_height,
-        MapTile.img_width
+        MapTile.img_width,
+        MapTile.tile_z, MapTile.tile_x, MapTile.tile_y
     ]
 
+    payload_attributes = []
+
     if query.select_img:
-        select_attributes.append(MapTile.img)
+        payload_attributes.extend((MapTilePayload.img, MapTilePayload.img_encoded))
 
     if query.select_surf:
-        select_attributes.append(MapTile.surf_features)
+        payload_attributes.append(MapTilePayload.surf_features)
 
     if query.select_fast:
-        select_attributes.append(MapTile.fast_keypoints)
+        payload_attributes.append(MapTilePayload.fast_keypoints)
 
     res = (await db.execute(db_query(select_attributes))).all()
+    payloads = await _query_payloads(db, [row.id for row in res], payload_attributes)
+
+    return [_tile_response(row, payloads.get(row.id), query) for row in res]
+
+
+async def _query_payloads(db: AsyncSession, tiles_ids: List[int], payload_attributes: List) -> Dict[int, Any]:
+    # tiles are filtered on the coordinates table, payloads of the found tiles are fetched in bulk
+    payloads = {}
+    if not payload_attributes:
+        return payloads
 
-    return [TileResponse(
+    for start in range(0, len(tiles_ids), _payloads_chunk_size):
+        chunk = tiles_ids[start:start + _payloads_chunk_size]
+        rows = await db.execute(
+            select(MapTilePayload.tile_id, *payload_attributes).where(MapTilePayload.tile_id.in_(chunk)))
+        payloads.update((row.tile_id, row) for row in rows)
+
+    return payloads
+
+
+def _tile_response(row, payload, query: ListTilesQuery) -> TileResponse:
+    surf_features = payload.surf_features if payload is not None and query.select_surf else None
+
+    return TileResponse(
         latitude=row.center_lat,
         longitude=row.center_long,
         vertices=[(row.nw_lat, row.nw_long), (row.ne_lat, row.ne_long), (row.se_lat, row.se_long), (row.sw_lat, row.sw_long)],
         azimuth=row.azimuth,
-        img=row.img if query.select_img else None,
-        surf_keypoints=row.surf_features.keypoints if query.select_surf else None,
-        surf_descriptors=row.surf_features.descriptors if query.select_surf else None,
-        fast_keypoints=row.fast_keypoints if query.select_fast else None,
-        img_shape=(row.img_height, row.img_width)
-    ) for row in res]
+        img_encoded=_encoded_img(payload) if payload is not None and query.select_img else None,
+        surf_keypoints=surf_features.keypoints if surf_features is not None else None,
+        surf_descriptors_raw=surf_features.descriptors if surf_features is not None else None,
+        fast_keypoints=payload.fast_keypoints if payload is not None and query.select_fast else None,
+        img_shape=(row.img_height, row.img_width),
+        key=(row.tile_z, row.tile_x, row.tile_y) if row.tile_z is not None else None
+    )
+
+
+def _encoded_img(payload) -> Optional[EncodedImage]:
+    if payload.img_encoded is not None:
+        return EncodedImage(data=payload.img_encoded)
+    if payload.img is not None:
+        return EncodedImage(pixels=payload.img)
+    return None
 
 
 class ListTilesInRectangleQuery(ListTilesQuery):
@@ -102,24 +165,29 @@ class ListTilesOverlappingWithSquareQuery(ListTilesQuery):
     square_size: float
 
 
+def square_intervals(center: Coordinates, size_m: float) -> Tuple[List[float], List[float]]:
+    center = geopy.Point(*center)
+    d = geopy.distance.distance(kilometers=size_m / 2 / 1000)
+
+    limiting_points = [
+        d.destination(point=center, bearing=0),
+        d.destination(point=center, bearing=180),
+        d.destination(point=center, bearing=90),
+        d.destination(point=center, bearing=270)
+    ]
+
+    lat_interval = sorted(p.latitude for p in limiting_points[:2])
+    long_interval = sorted(p.longitude for p in limiting_points[-2:])
+    return lat_interval, long_interval
+
+
 class ListTilesOverlappingWithSquareQueryHandler:
     def __init__(self, db: AsyncSession):
         self._db = db
 
     async def __call__(self, query: ListTilesOverlappingWithSquareQuery):
         def db_query(select_attributes):
-            center = geopy.Point(*query.square_center)
-            d = geopy.distance.distance(kilometers=query.square_size / 2 / 1000)
-
-            limiting_points = [
-                d.destination(point=center, bearing=0),
-                d.destination(point=center, bearing=180),
-                d.destination(point=center, bearing=90),
-                d.destination(point=center, bearing=270)
-            ]
-
-            lat_interval = sorted(p.latitude for p in limiting_points[:2])
-            long_interval = sorted(p.longitude for p in limiting_points[-2:])
+            lat_interval, long_interval = square_intervals(query.square_center, query.square_size)
 
             return ((select(*select_attributes)
                     .where(MapTile.map_layer_id.in_(query.layers_ids)))
@@ -130,4 +198,129 @@ class ListTilesOverlappingWithSquareQueryHandler:
                     .order_by(MapTile.center_lat.asc(), MapTile.center_long.asc())
                     .offset(query.offset).limit(query.limit))
 
-        return await query_tiles_wrapper(self._db, query, db_query)
\ No newline at end of file
+        return await query_tiles_wrapper(self._db, query, db_query)
+
+
+class ListTilesInTileRangeQuery(ListTilesQuery):
+    # web mercator tile keys of layers imported with web mercator tiling, ranges are inclusive
+    z: int
+    x_range: Tuple[int, int]
+    y_range: Tuple[int, int]
+
+
+class ListTilesInTileRangeQueryHandler:
+    def __init__(self, db: AsyncSession):
+        self._db = db
+
+    async def __call__(self, query: ListTilesInTileRangeQuery) -> List[TileResponse]:
+        def db_query(select_attributes):
+            return (select(*select_attributes)
+                    .where(MapTile.map_layer_id.in_(query.layers_ids))
+                    .where(MapTile.tile_z == query.z)
+                    .where(MapTile.tile_x.between(*sorted(query.x_range)))
+                    .where(MapTile.tile_y.between(*sorted(query.y_range)))
+                    .order_by(MapTile.tile_y.asc(), MapTile.tile_x.asc())
+                    .offset(query.offset).limit(query.limit))
+
+        return await query_tiles_wrapper(self._db, query, db_query)
+
+
+class ListOverviewTilesInRectangleQuery(BaseModel):
+    layers_ids: List[int]
+    start: Coordinates
+    end: Coordinates
+    meters_per_px: confloat(gt=0)
+    offset: int
+    limit: int
+
+
+class ListOverviewTilesInRectangleQueryHandler:
+    # tile images served from the overview closest to the requested resolution, tiles without
+    # that overview, e.g. of layers imported without overviews, come in full resolution
+    def __init__(self, db: AsyncSession):
+        self._db = db
+
+    async def __call__(self, query: ListOverviewTilesInRectangleQuery) -> List[TileResponse]:
+        layers_factors = dict((await self._db.execute(
+            select(MapLayer.id, MapLayer._overview_factors).where(MapLayer.id.in_(query.layers_ids)))).all())
+
+        lat_interval = sorted((query.start.latitude, query.end.latitude))
+        long_interval = sorted((query.start.longitude, query.end.longitude))
+        rows = (await self._db.execute(
+            select(MapTile.id, MapTile.map_layer_id,
+                   MapTile.center_lat, MapTile.center_long,
+                   MapTile.nw_lat, MapTile.nw_long,
+                   MapTile.ne_lat, MapTile.ne_long,
+                   MapTile.se_lat, MapTile.se_long,
+                   MapTile.sw_lat, MapTile.sw_long,
+                   MapTile.azimuth, MapTile.img_height, MapTile.img_width,
+                   MapTile.tile_z, MapTile.tile_x, MapTile.tile_y)
+            .where(MapTile.map_layer_id.in_(query.layers_ids))
+            .where(MapTile.center_lat.between(*lat_interval))
+            .where(MapTile.center_long.between(*long_interval))
+            .order_by(MapTile.center_lat.asc(), MapTile.center_long.asc())
+            .offset(query.offset).limit(query.limit))).all()
+
+        factors = {row.id: closest_overview_factor((row.nw_lat, row.nw_long), (row.ne_lat, row.ne_long),
+                                                   row.img_width, layers_factors.get(row.map_layer_id) or [],
+                                                   query.meters_per_px)
+                   for row in rows}
+        overviews = await self._query_overviews(factors)
+        payloads = await _query_payloads(self._db, [row.id for row in rows if row.id not in overviews],
+                                         [MapTilePayload.img, MapTilePayload.img_encoded])
+
+        return [_overview_tile_response(row, overviews.get(row.id), payloads.get(row.id)) for row in rows]
+
+    async def _query_overviews(self, factors: Dict[int, int]) -> Dict[int, Any]:
+        factor_tiles: Dict[int, List[int]] = {}
+        for tile_id, factor in factors.items():
+            if factor > 1:
+                factor_tiles.setdefault(factor, []).append(tile_id)
+
+        overviews = {}
+        for factor, tiles_ids in factor_tiles.items():
+            for start in range(0, len(tiles_ids), _payloads_chunk_size):
+                rows = await self._db.execute(
+                    select(MapTileOverview.tile_id, MapTileOverview.factor, MapTileOverview.img_width,
+                           MapTileOverview.img_height, MapTileOverview.img_encoded)
+                    .where(MapTileOverview.factor == factor)
+                    .where(MapTileOverview.tile_id.in_(tiles_ids[start:start + _payloads_chunk_size])))
+                overviews.update((row.tile_id, row) for row in rows)
+
+        return overviews
+
+
+def closest_overview_factor(nw: Tuple[float, float],
+                            ne: Tuple[float, float],
+                            img_width: int,
+                            factors: List[int],
+                            meters_per_px: float) -> int:
+    if not factors or not img_width:
+        return 1
+
+    # ground resolution of the tile from the length of its top edge
+    tile_meters_per_px = geopy.distance.distance(nw, ne).meters / img_width
+    return min((1, *factors), key=lambda f: abs(math.log(tile_meters_per_px * f / meters_per_px)))
+
+
+def _overview_tile_response(row, overview, payload) -> TileResponse:
+    if overview is not None:
+        encoded_img = EncodedImage(data=overview.img_encoded)
+        img_shape, factor = (overview.img_height, overview.img_width), overview.factor
+    else:
+        encoded_img = _encoded_img(payload) if payload is not None else None
+        img_shape, factor = (row.img_height, row.img_width), 1
+
+    return TileResponse(
+        latitude=row.center_lat,
+        longitude=row.center_long,
+        vertices=[(row.nw_lat, row.nw_long), (row.ne_lat, row.ne_long), (row.se_lat, row.se_long), (row.sw_lat, row.sw_long)],
+        azimuth=row.azimuth,
+        img_encoded=encoded_img,
+        surf_keypoints=None,
+        surf_descriptors_raw=None,
+        fast_keypoints=None,
+        img_shape=img_shape,
+        key=(row.tile_z, row.tile_x, row.tile_y) if row.tile_z is not None else None,
+        overview_factor=factor
+    )
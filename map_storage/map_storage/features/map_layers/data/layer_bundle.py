@@ -0,0 +1,145 @@
+import gzip
+import json
+import struct
+from typing import Optional, List, Dict, Any, Iterator, Tuple, BinaryIO
+
+import numpy as np
+
+from map_storage.features.map_layers.data.tiles_store import TILE_DTYPE, PAYLOAD_COLUMNS, tiles_records, \
+    tiles_payloads
+from map_storage.features.shared.exceptions import MapStorageException
+
+# gzip stream of MSLB, version, layer settings json, tiles batches and an end record with the tiles count.
+# Payloads and overviews are moved as the bytes stored in the db, so they are never decoded on the way.
+_bundle_magic = b'MSLB'
+_bundle_version = 3
+_bundle_header = struct.Struct('<4sBI')
+_record_header = struct.Struct('<cI')
+_batch_record, _end_record = b'T', b'E'
+# overviews of a batch, tile is the position of the overview tile in the batch
+_overview_dtype = np.dtype([
+    ('tile', '<u4'), ('factor', '<i4'), ('img_width', '<i4'), ('img_height', '<i4'), ('length', '<i8')
+])
+
+
+class TilesBatch:
+    def __init__(self,
+                 tiles: np.ndarray,
+                 payloads: List[Tuple[Optional[bytes], ...]],
+                 overviews: List[List[Tuple[int, int, int, bytes]]]):
+        # tiles is a TILE_DTYPE structured array, overviews are OVERVIEW_COLUMNS of each tile overview
+        self.tiles = tiles
+        self.payloads = payloads
+        self.overviews = overviews
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+
+class LayerBundleWriter:
+    def __init__(self, path: str, layer: Dict[str, Any], compress_level: int = 1):
+        self._file: BinaryIO = gzip.open(path, 'wb', compresslevel=compress_level)
+        self._tiles = 0
+
+        settings = json.dumps(layer).encode('utf-8')
+        self._file.write(_bundle_header.pack(_bundle_magic, _bundle_version, len(settings)))
+        self._file.write(settings)
+
+    def write_batch(self, rows, overviews: Optional[List[List[Tuple[int, int, int, bytes]]]] = None):
+        # rows of raw_tiles_select and overviews of each row
+        tiles = tiles_records(rows)
+        payloads = [p for payload in tiles_payloads(rows) for p in payload]
+        lengths = np.array([-1 if p is None else len(p) for p in payloads], dtype='<i8')
+
+        blobs_length = int(lengths[lengths > 0].sum())
+        self._file.write(_record_header.pack(_batch_record, len(rows)))
+        self._file.write(struct.pack('<Q', blobs_length))
+        self._file.write(tiles.tobytes())
+        self._file.write(lengths.tobytes())
+        for payload in payloads:
+            if payload:
+                self._file.write(payload)
+        self._write_overviews(overviews or [])
+
+        self._tiles += len(rows)
+
+    def close(self) -> int:
+        self._file.write(_record_header.pack(_end_record, self._tiles))
+        self._file.close()
+        return self._tiles
+
+    def abort(self):
+        self._file.close()
+
+    def _write_overviews(self, overviews: List[List[Tuple[int, int, int, bytes]]]):
+        records = np.array([(tile, factor, img_width, img_height, len(img_encoded))
+                            for tile, tile_overviews in enumerate(overviews)
+                            for factor, img_width, img_height, img_encoded in tile_overviews],
+                           dtype=_overview_dtype)
+        self._file.write(struct.pack('<I', len(records)))
+        self._file.write(records.tobytes())
+        for tile_overviews in overviews:
+            for overview in tile_overviews:
+                self._file.write(overview[-1])
+
+
+class LayerBundleReader:
+    def __init__(self, path: str):
+        self._file: BinaryIO = gzip.open(path, 'rb')
+
+        magic, version, settings_length = _bundle_header.unpack(self._read(_bundle_header.size))
+        if magic != _bundle_magic:
+            raise MapStorageException(f'{path} is not a layer bundle')
+        if version != _bundle_version:
+            raise MapStorageException(f'unsupported layer bundle version {version}')
+
+        self.layer: Dict[str, Any] = json.loads(self._read(settings_length))
+        self.tiles_count: Optional[int] = None
+
+    def batches(self) -> Iterator[TilesBatch]:
+        while True:
+            record, count = _record_header.unpack(self._read(_record_header.size))
+            if record == _end_record:
+                self.tiles_count = count
+                return
+            if record != _batch_record:
+                raise MapStorageException('corrupted layer bundle')
+
+            blobs_length, = struct.unpack('<Q', self._read(8))
+            tiles = np.frombuffer(self._read(count * TILE_DTYPE.itemsize), TILE_DTYPE)
+            lengths = np.frombuffer(self._read(count * len(PAYLOAD_COLUMNS) * 8), '<i8').tolist()
+            blobs = memoryview(self._read(blobs_length))
+
+            payloads, position = [], 0
+            for length in lengths:
+                if length < 0:
+                    payloads.append(None)
+                else:
+                    payloads.append(bytes(blobs[position:position + length]))
+                    position += length
+
+            columns = len(PAYLOAD_COLUMNS)
+            yield TilesBatch(tiles,
+                             [tuple(payloads[i:i + columns]) for i in range(0, len(payloads), columns)],
+                             self._read_overviews(count))
+
+    def close(self):
+        self._file.close()
+
+    def _read_overviews(self, tiles: int) -> List[List[Tuple[int, int, int, bytes]]]:
+        count, = struct.unpack('<I', self._read(4))
+        records = np.frombuffer(self._read(count * _overview_dtype.itemsize), _overview_dtype)
+
+        blobs = memoryview(self._read(int(records['length'].sum())))
+
+        overviews, position = [[] for _ in range(tiles)], 0
+        for tile, factor, img_width, img_height, length in records.tolist():
+            overviews[tile].append((factor, img_width, img_height, bytes(blobs[position:position + length])))
+            position += length
+        return overviews
+
+    def _read(self, size: int) -> bytes:
+        data = self._file.read(size)
+        if len(data) != size:
+            raise MapStorageException('unexpected end of layer bundle')
+        return data
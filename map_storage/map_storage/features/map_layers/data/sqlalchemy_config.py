@@ -1,10 +1,14 @@
 from typing import Tuple
-from sqlalchemy import Table, Column, Integer, Float, String, ForeignKey, Index, Boolean
+from sqlalchemy import Table, Column, Integer, BigInteger, Float, String, ForeignKey, Index, Boolean, JSON, \
+    LargeBinary
 from sqlalchemy.orm import registry, composite, relationship
 
 from map_storage.features.map_layers.models.map_layer import MapLayer
-from map_storage.features.map_layers.models.map_tile import MapTile, TileSURFFeatures
-from map_storage.features.shared.custom_db_types import NumpyArray, SURFKeyPoints
+from map_storage.features.map_layers.models.map_layer_import import MapLayerImport
+from map_storage.features.map_layers.models.map_tile import MapTile, MapTilePayload, TileSURFFeatures
+from map_storage.features.map_layers.models.map_tile_overview import MapTileOverview
+from map_storage.features.map_layers.models.map_tile_tombstone import MapTileTombstone
+from map_storage.features.shared.custom_db_types import NumpyArray, SURFKeyPoints, SURFDescriptors
 
 
 def configure_map_layers_orm(orm_registry: registry):
@@ -21,7 +25,15 @@ def configure_map_layers_orm(orm_registry: registry):
         Column('has_fast_features', Boolean, nullable=False, server_default='0'),
         Column('fast_threshold', Float, nullable=True),
         Column('fast_nonmax_suppression', Boolean, nullable=True),
-        Column('fast_type', Integer, nullable=True)
+        Column('fast_type', Integer, nullable=True),
+        Column('tiling', String(20), nullable=False, server_default='profile'),
+        Column('img_codec', String(10), nullable=False, server_default='raw'),
+        Column('img_quality', Integer, nullable=True),
+        Column('descriptors_dtype', String(10), nullable=False, server_default='float32'),
+        Column('overview_factors', JSON, nullable=True),
+        Column('version', BigInteger, nullable=False, server_default='0'),
+        Column('source_layer_id', Integer, nullable=True),
+        Column('synced_version', BigInteger, nullable=True)
     )
     orm_registry.map_imperatively(
         MapLayer, map_layers_table,
@@ -33,10 +45,31 @@ def configure_map_layers_orm(orm_registry: registry):
             '_has_fast_features': map_layers_table.c.has_fast_features,
             '_fast_threshold': map_layers_table.c.fast_threshold,
             '_fast_nonmax_suppression': map_layers_table.c.fast_nonmax_suppression,
+            '_fast_type': map_layers_table.c.fast_type,
+            '_tiling': map_layers_table.c.tiling,
+            '_img_codec': map_layers_table.c.img_codec,
+            '_img_quality': map_layers_table.c.img_quality,
+            '_descriptors_dtype': map_layers_table.c.descriptors_dtype,
+            '_overview_factors': map_layers_table.c.overview_factors,
+            '_version': map_layers_table.c.version,
             '_tiles': relationship(MapTile, uselist=True, cascade='all'),
+            '_imports': relationship(MapLayerImport, uselist=True, cascade='all', passive_deletes=True),
         }
     )
 
+    map_layer_imports_table = Table(
+        'map_layer_imports', orm_registry.metadata,
+        Column('id', Integer, primary_key=True, autoincrement=True),
+        Column('map_layer_id', Integer,
+               ForeignKey('map_layers.id', ondelete='CASCADE'), nullable=False),
+        Column('status', String(20), nullable=False),
+        Column('import_profile_type', String(20), nullable=False),
+        Column('import_profile_args', JSON, nullable=False),
+        Column('tiles_count', Integer, nullable=False, server_default='0'),
+        Index('idx_map_layer_imports_map_layer_id', 'map_layer_id', unique=False)
+    )
+    orm_registry.map_imperatively(MapLayerImport, map_layer_imports_table)
+
     map_tiles_table = Table(
         'map_tiles', orm_registry.metadata,
         Column('id', Integer, primary_key=True, autoincrement=True),
@@ -53,25 +86,71 @@ def configure_map_layers_orm(orm_registry: registry):
         Column('azimuth', Float, nullable=False),
         Column('map_layer_id', Integer,
                ForeignKey('map_layers.id', ondelete='CASCADE')),
-        Column('img', NumpyArray, nullable=True),
+        Column('import_id', Integer,
+               ForeignKey('map_layer_imports.id', ondelete='SET NULL'), nullable=True),
+        Column('grid_index', Integer, nullable=True),
+        Column('tile_z', Integer, nullable=True),
+        Column('tile_x', Integer, nullable=True),
+        Column('tile_y', Integer, nullable=True),
         Column('img_width', Integer, nullable=False, server_default='0'),
         Column('img_height', Integer, nullable=False, server_default='0'),
-        Column('surf_keypoints', SURFKeyPoints, nullable=True),
-        Column('surf_descriptors', NumpyArray, nullable=True),
-        Column('fast_keypoints', NumpyArray, nullable=True),
+        Column('version', BigInteger, nullable=False, server_default='0'),
+        Column('source_id', Integer, nullable=True),
         Index('idx_map_layer_id', 'map_layer_id', unique=False),
-        Index('idx_coordinates', 'center_lat', 'center_long', unique=False)
+        Index('idx_coordinates', 'center_lat', 'center_long', unique=False),
+        Index('idx_import_grid_index', 'import_id', 'grid_index', unique=False),
+        Index('idx_tile_key', 'map_layer_id', 'tile_z', 'tile_x', 'tile_y', unique=False),
+        Index('idx_map_layer_version', 'map_layer_id', 'version', unique=False),
+        Index('idx_map_layer_source_id', 'map_layer_id', 'source_id', unique=False)
+    )
+    map_tile_payloads_table = Table(
+        'map_tile_payloads', orm_registry.metadata,
+        Column('tile_id', Integer,
+               ForeignKey('map_tiles.id', ondelete='CASCADE'), primary_key=True),
+        Column('img', NumpyArray, nullable=True),
+        Column('img_encoded', LargeBinary, nullable=True),
+        Column('surf_keypoints', SURFKeyPoints, nullable=True),
+        Column('surf_descriptors', SURFDescriptors, nullable=True),
+        Column('fast_keypoints', NumpyArray, nullable=True)
     )
     orm_registry.map_imperatively(
-        MapTile, map_tiles_table,
+        MapTilePayload, map_tile_payloads_table,
         properties={
             'surf_features': composite(
                 TileSURFFeatures,
-                map_tiles_table.c.surf_keypoints,
-                map_tiles_table.c.surf_descriptors,
+                map_tile_payloads_table.c.surf_keypoints,
+                map_tile_payloads_table.c.surf_descriptors,
                 default=None
             )
         }
     )
+    map_tile_overviews_table = Table(
+        'map_tile_overviews', orm_registry.metadata,
+        Column('tile_id', Integer,
+               ForeignKey('map_tiles.id', ondelete='CASCADE'), primary_key=True),
+        Column('factor', Integer, primary_key=True),
+        Column('img_width', Integer, nullable=False),
+        Column('img_height', Integer, nullable=False),
+        Column('img_encoded', LargeBinary, nullable=False)
+    )
+    orm_registry.map_imperatively(MapTileOverview, map_tile_overviews_table)
+    orm_registry.map_imperatively(
+        MapTile, map_tiles_table,
+        properties={
+            'payload': relationship(MapTilePayload, uselist=False, lazy='raise',
+                                    cascade='all, delete-orphan', passive_deletes=True),
+            'overviews': relationship(MapTileOverview, uselist=True, lazy='raise',
+                                      cascade='all, delete-orphan', passive_deletes=True)
+        }
+    )
 
-    
\ No newline at end of file
+    map_tile_tombstones_table = Table(
+        'map_tile_tombstones', orm_registry.metadata,
+        Column('id', Integer, primary_key=True, autoincrement=True),
+        Column('map_layer_id', Integer,
+               ForeignKey('map_layers.id', ondelete='CASCADE'), nullable=False),
+        Column('tile_id', Integer, nullable=False),
+        Column('version', BigInteger, nullable=False),
+        Index('idx_tombstones_map_layer_version', 'map_layer_id', 'version', unique=False)
+    )
+    orm_registry.map_imperatively(MapTileTombstone, map_tile_tombstones_table)
@@ -0,0 +1,286 @@
+import json
+import mmap
+import os
+import struct
+from typing import Optional, List, Tuple, Dict, Any
+
+import numpy as np
+
+from map_storage.features.map_layers.application.queries.tiles_queries import TileResponse, \
+    closest_overview_factor
+from map_storage.features.shared.custom_db_types import encode_array, decode_array, encode_descriptors, \
+    decode_descriptors
+from map_storage.features.shared.descriptors import QuantizedDescriptors
+from map_storage.features.shared.exceptions import MapStorageException
+from map_storage.features.shared.images import EncodedImage
+from map_storage.features.shared.keypoints import KEYPOINT_DTYPE
+
+# MSPK, version, tiles count, index offset, metadata offset and length, overviews count and index offset.
+# Blobs follow the header, then the index of tiles sorted by center coordinates, the overviews index
+# and the layer metadata as json.
+_pack_magic = b'MSPK'
+_pack_version = 2
+_pack_header = struct.Struct('<4sB3xQQQQQQ')
+_pack_alignment = 16
+
+IMG_NONE, IMG_ENCODED, IMG_RAW = 0, 1, 2
+
+# blob offsets are 0 for missing blobs, the header is never referenced
+_index_dtype = np.dtype([
+    ('center_lat', '<f8'), ('center_long', '<f8'),
+    ('nw_lat', '<f8'), ('nw_long', '<f8'),
+    ('ne_lat', '<f8'), ('ne_long', '<f8'),
+    ('se_lat', '<f8'), ('se_long', '<f8'),
+    ('sw_lat', '<f8'), ('sw_long', '<f8'),
+    ('azimuth', '<f8'),
+    ('img_height', '<i4'), ('img_width', '<i4'),
+    ('tile_z', '<i4'), ('tile_x', '<i4'), ('tile_y', '<i4'),
+    ('img_format', '<i4'),
+    ('img_offset', '<u8'), ('img_length', '<u8'),
+    ('surf_keypoints_offset', '<u8'), ('surf_keypoints_length', '<u8'),
+    ('surf_descriptors_offset', '<u8'), ('surf_descriptors_length', '<u8'),
+    ('fast_keypoints_offset', '<u8'), ('fast_keypoints_length', '<u8'),
+    ('overviews_start', '<u4'), ('overviews_count', '<u4')
+])
+
+# overviews of a tile are consecutive, in the order they were added
+_overview_index_dtype = np.dtype([
+    ('factor', '<i4'), ('img_width', '<i4'), ('img_height', '<i4'), ('img_offset', '<u8'), ('img_length', '<u8')
+])
+
+_vertices_fields = [('nw_lat', 'nw_long'), ('ne_lat', 'ne_long'), ('se_lat', 'se_long'), ('sw_lat', 'sw_long')]
+
+
+class TilePackWriter:
+    def __init__(self, path: str, layer: Dict[str, Any]):
+        self._path = path
+        self._layer = layer
+        self._file = open(path, 'wb')
+        self._file.write(bytes(_pack_header.size + -_pack_header.size % _pack_alignment))
+        self._index: List[tuple] = []
+        self._overviews: List[tuple] = []
+
+    def add_tile(self,
+                 coordinates: Tuple[float, ...],
+                 azimuth: float,
+                 img_shape: Tuple[int, int],
+                 key: Optional[Tuple[int, int, int]] = None,
+                 img: Optional[np.ndarray] = None,
+                 img_encoded: Optional[bytes] = None,
+                 surf_keypoints: Optional[np.ndarray] = None,
+                 surf_descriptors: Optional[np.ndarray | QuantizedDescriptors] = None,
+                 fast_keypoints: Optional[np.ndarray] = None,
+                 overviews: Optional[List[Tuple[int, int, int, bytes]]] = None):
+        # coordinates are center, nw, ne, se, sw latitude and longitude pairs, overviews are
+        # factor, width, height and encoded image of each tile overview
+        if img_encoded is not None:
+            img_format, img_blob = IMG_ENCODED, self._write(img_encoded)
+        elif img is not None:
+            img_format, img_blob = IMG_RAW, self._write(encode_array(img))
+        else:
+            img_format, img_blob = IMG_NONE, (0, 0)
+
+        surf_keypoints_blob = self._write(np.asarray(surf_keypoints, KEYPOINT_DTYPE).tobytes()) \
+            if surf_keypoints is not None else (0, 0)
+        surf_descriptors_blob = self._write(encode_descriptors(surf_descriptors)) \
+            if surf_descriptors is not None else (0, 0)
+        fast_keypoints_blob = self._write(encode_array(fast_keypoints)) \
+            if fast_keypoints is not None else (0, 0)
+
+        overviews_start = len(self._overviews)
+        for factor, img_width, img_height, img_encoded in overviews or []:
+            self._overviews.append((factor, img_width, img_height, *self._write(img_encoded)))
+
+        self._index.append((
+            *coordinates, azimuth, *img_shape, *(key if key is not None else (-1, -1, -1)),
+            img_format, *img_blob, *surf_keypoints_blob, *surf_descriptors_blob, *fast_keypoints_blob,
+            overviews_start, len(self._overviews) - overviews_start
+        ))
+
+    def close(self) -> int:
+        index = np.array(self._index, dtype=_index_dtype)
+        index = index[np.lexsort((index['center_long'], index['center_lat']))]
+
+        index_offset, _ = self._write(index.tobytes())
+        overviews_offset, _ = self._write(np.array(self._overviews, dtype=_overview_index_dtype).tobytes())
+        metadata_offset, metadata_length = self._write(json.dumps(self._layer).encode('utf-8'))
+
+        self._file.seek(0)
+        self._file.write(_pack_header.pack(_pack_magic, _pack_version, len(index),
+                                           index_offset, metadata_offset, metadata_length,
+                                           len(self._overviews), overviews_offset))
+        self._file.close()
+        return os.path.getsize(self._path)
+
+    def abort(self):
+        self._file.close()
+        os.remove(self._path)
+
+    def _write(self, data) -> Tuple[int, int]:
+        # blobs start 16 bytes aligned, so array data can be viewed in place
+        position = self._file.tell()
+        padding = -position % _pack_alignment
+        if padding:
+            self._file.write(bytes(padding))
+        self._file.write(data)
+        return position + padding, len(data)
+
+
+class TilePack:
+    # tiles of one layer read from a memory mapped pack file, returned arrays and images are
+    # read-only views of the mapping
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+
+        magic, version = _pack_header.unpack_from(self._buffer)[:2]
+        if magic != _pack_magic:
+            raise MapStorageException(f'{path} is not a tile pack')
+        if version != _pack_version:
+            raise MapStorageException(f'unsupported tile pack version {version}')
+
+        _, _, tiles, index_offset, metadata_offset, metadata_length, overviews, overviews_offset = \
+            _pack_header.unpack_from(self._buffer)
+        self._index = np.frombuffer(self._buffer, _index_dtype, count=tiles, offset=index_offset)
+        self._overviews = np.frombuffer(self._buffer, _overview_index_dtype, count=overviews, offset=overviews_offset)
+        self.layer: Dict[str, Any] = json.loads(bytes(self._buffer[metadata_offset:metadata_offset + metadata_length]))
+
+        self._center_lat = np.ascontiguousarray(self._index['center_lat'])
+        # tiles overlapping an area have centers at most this far outside of it
+        self._max_half_height = max((np.abs(self._index[f] - self._center_lat).max(initial=0)
+                                     for f, _ in _vertices_fields), default=0)
+
+    @property
+    def layer_id(self) -> int:
+        return self.layer['id']
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def tiles_in_rectangle(self,
+                           start: Tuple[float, float],
+                           end: Tuple[float, float],
+                           offset: int, limit: int,
+                           select_img: bool, select_surf: bool, select_fast: bool) -> List[TileResponse]:
+        return self._tiles(self._rectangle_positions(start, end), offset, limit, select_img, select_surf, select_fast)
+
+    def tiles_overlapping_with_rectangle(self,
+                                         start: Tuple[float, float],
+                                         end: Tuple[float, float],
+                                         offset: int, limit: int,
+                                         select_img: bool, select_surf: bool, select_fast: bool) -> List[TileResponse]:
+        lat_interval = sorted((start[0], end[0]))
+        long_interval = sorted((start[1], end[1]))
+
+        candidates = self._lat_positions(lat_interval[0] - self._max_half_height,
+                                         lat_interval[1] + self._max_half_height)
+        tiles = self._index[candidates]
+        overlaps = np.zeros(len(tiles), dtype=bool)
+        for lat, long in _vertices_fields:
+            overlaps |= ((tiles[lat] >= lat_interval[0]) & (tiles[lat] <= lat_interval[1])
+                         & (tiles[long] >= long_interval[0]) & (tiles[long] <= long_interval[1]))
+
+        return self._tiles(candidates[overlaps], offset, limit, select_img, select_surf, select_fast)
+
+    def tiles_in_tile_range(self,
+                            z: int,
+                            x_range: Tuple[int, int],
+                            y_range: Tuple[int, int],
+                            offset: int, limit: int,
+                            select_img: bool, select_surf: bool, select_fast: bool) -> List[TileResponse]:
+        x_range, y_range = sorted(x_range), sorted(y_range)
+        index = self._index
+        positions = np.flatnonzero((index['tile_z'] == z)
+                                   & (index['tile_x'] >= x_range[0]) & (index['tile_x'] <= x_range[1])
+                                   & (index['tile_y'] >= y_range[0]) & (index['tile_y'] <= y_range[1]))
+        positions = positions[np.lexsort((index['tile_x'][positions], index['tile_y'][positions]))]
+
+        return self._tiles(positions, offset, limit, select_img, select_surf, select_fast)
+
+    def overview_in_rectangle(self,
+                              start: Tuple[float, float],
+                              end: Tuple[float, float],
+                              meters_per_px: float,
+                              offset: int, limit: int) -> List[TileResponse]:
+        # images of the tiles from the overviews closest to meters_per_px, like ListOverviewTilesInRectangleQuery
+        factors = self.layer.get('overview_factors') or []
+        return [self._overview_tile_response(self._index[p], factors, meters_per_px)
+                for p in self._rectangle_positions(start, end)[offset:offset + limit]]
+
+    def close(self):
+        self._index = self._overviews = self._center_lat = None
+        self._buffer.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # views handed out keep the mapping alive until they are released
+            pass
+
+    def _rectangle_positions(self, start: Tuple[float, float], end: Tuple[float, float]) -> np.ndarray:
+        long_interval = sorted((start[1], end[1]))
+        positions = self._lat_positions(*sorted((start[0], end[0])))
+        longs = self._index['center_long'][positions]
+        return positions[(longs >= long_interval[0]) & (longs <= long_interval[1])]
+
+    def _lat_positions(self, min_lat: float, max_lat: float) -> np.ndarray:
+        return np.arange(np.searchsorted(self._center_lat, min_lat, 'left'),
+                         np.searchsorted(self._center_lat, max_lat, 'right'))
+
+    def _tiles(self,
+               positions: np.ndarray,
+               offset: int, limit: int,
+               select_img: bool, select_surf: bool, select_fast: bool) -> List[TileResponse]:
+        return [self._tile_response(self._index[p], select_img, select_surf, select_fast)
+                for p in positions[offset:offset + limit]]
+
+    def _tile_response(self, tile, select_img: bool, select_surf: bool, select_fast: bool) -> TileResponse:
+        surf_keypoints = surf_descriptors = None
+        if select_surf and tile['surf_keypoints_offset']:
+            surf_keypoints = np.frombuffer(self._buffer, KEYPOINT_DTYPE,
+                                           count=int(tile['surf_keypoints_length']) // KEYPOINT_DTYPE.itemsize,
+                                           offset=int(tile['surf_keypoints_offset']))
+            surf_descriptors = decode_descriptors(self._blob(tile, 'surf_descriptors')) \
+                if tile['surf_descriptors_offset'] else None
+
+        return TileResponse(
+            latitude=float(tile['center_lat']),
+            longitude=float(tile['center_long']),
+            vertices=[(float(tile[lat]), float(tile[long])) for lat, long in _vertices_fields],
+            azimuth=float(tile['azimuth']),
+            img_encoded=self._encoded_img(tile) if select_img else None,
+            surf_keypoints=surf_keypoints,
+            surf_descriptors_raw=surf_descriptors,
+            fast_keypoints=self._array(tile, 'fast_keypoints') if select_fast else None,
+            img_shape=(int(tile['img_height']), int(tile['img_width'])),
+            key=(int(tile['tile_z']), int(tile['tile_x']), int(tile['tile_y'])) if tile['tile_z'] >= 0 else None
+        )
+
+    def _overview_tile_response(self, tile, factors: List[int], meters_per_px: float) -> TileResponse:
+        factor = closest_overview_factor((float(tile['nw_lat']), float(tile['nw_long'])),
+                                         (float(tile['ne_lat']), float(tile['ne_long'])),
+                                         int(tile['img_width']), factors, meters_per_px)
+        start = int(tile['overviews_start'])
+        overview = next((o for o in self._overviews[start:start + int(tile['overviews_count'])]
+                         if o['factor'] == factor), None) if factor > 1 else None
+
+        response = self._tile_response(tile, overview is None, False, False)
+        if overview is not None:
+            response.img_encoded = EncodedImage(data=self._blob(overview, 'img'))
+            response.img_shape = (int(overview['img_height']), int(overview['img_width']))
+            response.overview_factor = factor
+        return response
+
+    def _encoded_img(self, tile) -> Optional[EncodedImage]:
+        if tile['img_format'] == IMG_ENCODED:
+            return EncodedImage(data=self._blob(tile, 'img'))
+        if tile['img_format'] == IMG_RAW:
+            return EncodedImage(pixels=decode_array(self._blob(tile, 'img')))
+        return None
+
+    def _array(self, tile, name: str) -> Optional[np.ndarray]:
+        return decode_array(self._blob(tile, name)) if tile[f'{name}_offset'] else None
+
+    def _blob(self, tile, name: str) -> memoryview:
+        offset = int(tile[f'{name}_offset'])
+        return self._buffer[offset:offset + int(tile[f'{name}_length'])]
@@ -0,0 +1,220 @@
+from typing import List, Dict, Any, Tuple, Optional
+
+import numpy as np
+from sqlalchemy import Table, Column, Integer, LargeBinary, MetaData, select, insert, delete, update, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.map_layers.models.map_tile import MapTile
+from map_storage.features.map_layers.models.map_tile_overview import MapTileOverview
+from map_storage.features.map_layers.models.map_tile_tombstone import MapTileTombstone
+from map_storage.features.shared.custom_db_types import encode_array, encode_descriptors, SURFKeyPoints
+
+PAYLOAD_COLUMNS = ('img', 'img_encoded', 'surf_keypoints', 'surf_descriptors', 'fast_keypoints')
+OVERVIEW_COLUMNS = ('factor', 'img_width', 'img_height', 'img_encoded')
+
+# tile row moved between databases, tile_z is -1 for tiles without a key
+TILE_DTYPE = np.dtype([
+    ('id', '<i8'),
+    ('center_lat', '<f8'), ('center_long', '<f8'),
+    ('nw_lat', '<f8'), ('nw_long', '<f8'),
+    ('ne_lat', '<f8'), ('ne_long', '<f8'),
+    ('se_lat', '<f8'), ('se_long', '<f8'),
+    ('sw_lat', '<f8'), ('sw_long', '<f8'),
+    ('azimuth', '<f8'),
+    ('img_height', '<i4'), ('img_width', '<i4'),
+    ('tile_z', '<i4'), ('tile_x', '<i4'), ('tile_y', '<i4')
+])
+TILE_COLUMNS = TILE_DTYPE.names[1:]
+
+# payloads table with the stored bytes, bypassing NumpyArray and SURFKeyPoints conversions
+raw_payloads_table = Table(
+    'map_tile_payloads', MetaData(),
+    Column('tile_id', Integer, primary_key=True),
+    *(Column(c, LargeBinary, nullable=True) for c in PAYLOAD_COLUMNS)
+)
+
+_ids_chunk_size = 5000
+_keypoints_type = SURFKeyPoints()
+
+
+def raw_tiles_select(*criteria):
+    # tile rows with their stored payload bytes, for copying tiles to another database
+    return (select(MapTile.id, *(getattr(MapTile, c) for c in TILE_COLUMNS),
+                   *(raw_payloads_table.c[c] for c in PAYLOAD_COLUMNS))
+            .outerjoin(raw_payloads_table, raw_payloads_table.c.tile_id == MapTile.id)
+            .where(*criteria))
+
+
+def tiles_records(rows) -> np.ndarray:
+    return np.array([tuple(-1 if v is None else v for v in (r.id, *(getattr(r, c) for c in TILE_COLUMNS)))
+                     for r in rows], dtype=TILE_DTYPE)
+
+
+def tiles_payloads(rows) -> List[Tuple[Optional[bytes], ...]]:
+    return [tuple(getattr(r, c) for c in PAYLOAD_COLUMNS) for r in rows]
+
+
+def tile_row(tile: MapTile) -> Dict[str, Any]:
+    return {c.key: _python_value(getattr(tile, c.key))
+            for c in inspect(MapTile).local_table.columns if c.key != 'id'}
+
+
+def tile_payload(tile: MapTile) -> Tuple[Optional[bytes], ...]:
+    # payload columns as they are stored
+    surf_features = tile.surf_features
+    keypoints = surf_features.keypoints if surf_features is not None else None
+    descriptors = surf_features.descriptors if surf_features is not None else None
+    return (
+        encode_array(tile.img) if tile.img is not None else None,
+        tile.img_encoded,
+        _keypoints_type.process_bind_param(keypoints, None) if keypoints is not None else None,
+        encode_descriptors(descriptors) if descriptors is not None else None,
+        encode_array(tile.fast_keypoints) if tile.fast_keypoints is not None else None
+    )
+
+
+def tile_overviews(tile: MapTile) -> List[Tuple[int, int, int, bytes]]:
+    return [tuple(getattr(overview, c) for c in OVERVIEW_COLUMNS) for overview in tile.overviews]
+
+
+def payloads_size(payloads: List[Tuple[Optional[bytes], ...]]) -> int:
+    return sum(len(p) for payload in payloads for p in payload if p is not None)
+
+
+def overviews_size(overviews: List[List[Tuple[int, int, int, bytes]]]) -> int:
+    return sum(len(overview[-1]) for tile_overviews in overviews for overview in tile_overviews)
+
+
+async def select_overviews(db: AsyncSession, tiles_ids: List[int]) -> Dict[int, List[Tuple[int, int, int, bytes]]]:
+    overviews_table = inspect(MapTileOverview).local_table
+    overviews = {}
+    for start in range(0, len(tiles_ids), _ids_chunk_size):
+        rows = await db.execute(
+            select(overviews_table.c.tile_id, *(overviews_table.c[c] for c in OVERVIEW_COLUMNS))
+            .where(overviews_table.c.tile_id.in_(tiles_ids[start:start + _ids_chunk_size]))
+            .order_by(overviews_table.c.tile_id, overviews_table.c.factor))
+        for row in rows:
+            overviews.setdefault(row.tile_id, []).append(tuple(row[1:]))
+    return overviews
+
+
+async def next_layer_version(db: AsyncSession, map_layer_id: int) -> int:
+    # the layer row stays locked until the tiles written in the version are committed
+    return await db.scalar(
+        update(MapLayer)
+        .where(MapLayer.id == map_layer_id)
+        .values(_version=MapLayer._version + 1)
+        .returning(MapLayer._version)
+        .execution_options(synchronize_session=False))
+
+
+async def insert_tiles(db: AsyncSession,
+                       map_layer_id: int,
+                       version: int,
+                       tiles: np.ndarray,
+                       payloads: List[Tuple[Optional[bytes], ...]],
+                       overviews: Optional[List[List[Tuple[int, int, int, bytes]]]] = None) -> List[int]:
+    # copies of tiles from another database, their ids there are kept as source ids
+    tile_rows = []
+    for tile in tiles.tolist():
+        row: Dict[str, Any] = dict(zip(TILE_DTYPE.names, tile))
+        row['source_id'] = row.pop('id')
+        if row['tile_z'] < 0:
+            row['tile_z'] = row['tile_x'] = row['tile_y'] = None
+        tile_rows.append({**row, 'map_layer_id': map_layer_id, 'version': version})
+
+    return await bulk_insert_tiles(db, tile_rows, payloads, overviews)
+
+
+async def bulk_insert_tiles(db: AsyncSession,
+                            tile_rows: List[Dict[str, Any]],
+                            payloads: List[Tuple[Optional[bytes], ...]],
+                            overviews: Optional[List[List[Tuple[int, int, int, bytes]]]] = None) -> List[int]:
+    # tile rows have the same columns, payloads are PAYLOAD_COLUMNS of each tile as stored bytes and overviews
+    # OVERVIEW_COLUMNS of each tile overview. Postgres takes them through COPY, other databases through
+    # multi-row inserts.
+    if not tile_rows:
+        return []
+
+    copy_connection = await _asyncpg_connection(db)
+    if copy_connection is not None:
+        tiles_ids = await _copy_tiles(db, copy_connection, tile_rows)
+    else:
+        map_tiles_table = inspect(MapTile).local_table
+        tiles_ids = (await db.execute(
+            insert(map_tiles_table).returning(map_tiles_table.c.id, sort_by_parameter_order=True),
+            tile_rows)).scalars().all()
+
+    await _insert_records(db, copy_connection, raw_payloads_table, ('tile_id', *PAYLOAD_COLUMNS),
+                          [(tile_id, *payload) for tile_id, payload in zip(tiles_ids, payloads)
+                           if any(p is not None for p in payload)])
+    if overviews:
+        await _insert_records(db, copy_connection, inspect(MapTileOverview).local_table,
+                              ('tile_id', *OVERVIEW_COLUMNS),
+                              [(tile_id, *overview) for tile_id, tile_overviews in zip(tiles_ids, overviews)
+                               for overview in tile_overviews])
+
+    return tiles_ids
+
+
+async def delete_tiles(db: AsyncSession, map_layer_id: int, version: int, *criteria) -> int:
+    # deleted tiles leave tombstones, so that copies of the layer drop them on the next sync
+    tiles_ids = (await db.scalars(
+        select(MapTile.id).where(MapTile.map_layer_id == map_layer_id).where(*criteria))).all()
+
+    overviews_table = inspect(MapTileOverview).local_table
+    for start in range(0, len(tiles_ids), _ids_chunk_size):
+        chunk = tiles_ids[start:start + _ids_chunk_size]
+        await db.execute(delete(raw_payloads_table).where(raw_payloads_table.c.tile_id.in_(chunk)))
+        await db.execute(delete(overviews_table).where(overviews_table.c.tile_id.in_(chunk)))
+        await db.execute(delete(MapTile).where(MapTile.id.in_(chunk)).execution_options(synchronize_session=False))
+        await db.execute(insert(MapTileTombstone), [
+            {'map_layer_id': map_layer_id, 'tile_id': tile_id, 'version': version} for tile_id in chunk])
+
+    return len(tiles_ids)
+
+
+async def _copy_tiles(db: AsyncSession, copy_connection, tile_rows: List[Dict[str, Any]]) -> List[int]:
+    # COPY doesn't return generated ids, they are taken from the table sequence up front
+    map_tiles_table = inspect(MapTile).local_table
+    tiles_ids = (await db.scalars(
+        text('SELECT nextval(pg_get_serial_sequence(:table, :column)) FROM generate_series(1, :count)'),
+        {'table': map_tiles_table.name, 'column': 'id', 'count': len(tile_rows)})).all()
+
+    columns = list(tile_rows[0])
+    await copy_connection.copy_records_to_table(
+        map_tiles_table.name,
+        records=[(tile_id, *(row[c] for c in columns)) for tile_id, row in zip(tiles_ids, tile_rows)],
+        columns=['id', *columns])
+
+    return tiles_ids
+
+
+async def _insert_records(db: AsyncSession,
+                         copy_connection,
+                         table: Table,
+                         columns: Tuple[str, ...],
+                         records: List[tuple]):
+    if not records:
+        return
+
+    if copy_connection is not None:
+        await copy_connection.copy_records_to_table(table.name, records=records, columns=list(columns))
+    else:
+        await db.execute(insert(table), [dict(zip(columns, record)) for record in records])
+
+
+async def _asyncpg_connection(db: AsyncSession):
+    # driver connection of the session transaction, when COPY is available
+    connection = await db.connection()
+    if connection.dialect.name != 'postgresql' or connection.dialect.driver != 'asyncpg':
+        return None
+
+    raw_connection = await connection.get_raw_connection()
+    return raw_connection.driver_connection
+
+
+def _python_value(value):
+    # numpy scalars from the tiles grid aren't accepted by the db drivers
+    return value.item() if isinstance(value, np.generic) else value
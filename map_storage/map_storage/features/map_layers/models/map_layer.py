@@ -19,7 +19,12 @@ class MapLayer:
                  fast_threshold: Optional[float] = None,
                  fast_nonmax_suppression: Optional[bool] = None,
                  fast_type: Optional[int] = None,
-                 description: Optional[str] = None):
+                 description: Optional[str] = None,
+                 tiling: str = 'profile',
+                 img_codec: str = 'raw',
+                 img_quality: Optional[int] = None,
+                 descriptors_dtype: str = 'float32',
+                 overview_factors: Optional[List[int]] = None):
         self._tiles: List[MapTile] = []
         self.name = name
         self.import_type = import_type
@@ -32,6 +37,15 @@ class MapLayer:
         self._fast_threshold = fast_threshold
         self._fast_nonmax_suppression = fast_nonmax_suppression
         self._fast_type = fast_type
+        self._tiling = tiling
+        self._img_codec = img_codec
+        self._img_quality = img_quality
+        self._descriptors_dtype = descriptors_dtype
+        self._overview_factors = overview_factors
+        self._version = 0
+        # layer of the database this layer is copied from and its version the copy is synced to
+        self.source_layer_id: Optional[int] = None
+        self.synced_version: Optional[int] = None
 
     @property
     def zoom(self) -> float:
@@ -53,15 +67,94 @@ class MapLayer:
     def has_fast_features(self) -> bool:
         return self._has_fast_features
 
+    @property
+    def fast_threshold(self) -> Optional[float]:
+        return self._fast_threshold
+
+    @property
+    def fast_nonmax_suppression(self) -> Optional[bool]:
+        return self._fast_nonmax_suppression
+
+    @property
+    def fast_type(self) -> Optional[int]:
+        return self._fast_type
+
+    @property
+    def tiling(self) -> str:
+        return self._tiling
+
+    @property
+    def img_codec(self) -> str:
+        return self._img_codec
+
+    @property
+    def img_quality(self) -> Optional[int]:
+        return self._img_quality
+
+    @property
+    def descriptors_dtype(self) -> str:
+        # float32, float16 or uint8 with a scale per tile
+        return self._descriptors_dtype
+
+    @property
+    def overview_factors(self) -> List[int]:
+        # ascending downsampling factors of the tile overviews
+        return self._overview_factors or []
+
+    @property
+    def version(self) -> int:
+        # bumped on every write of the layer tiles
+        return self._version
+
     @property
     def tiles(self) -> List[MapTile]:
         return self._tiles
     
     def add_tile(self, tile: MapTile):
-        if self._has_images and tile.img is None:
+        self.validate_tile(tile)
+        tile.map_layer_id = self.id
+
+        self._tiles.append(tile)
+
+    def has_same_settings(self, other: 'MapLayer') -> bool:
+        return (self._zoom == other.zoom
+                and self.import_type == other.import_type
+                and self._has_images == other.has_images
+                and self._has_surf_features == other.has_surf_features
+                and self._surf_min_hessian == other.surf_min_hessian
+                and self._has_fast_features == other.has_fast_features
+                and self._tiling == other.tiling
+                and self._img_codec == other.img_codec
+                and self._img_quality == other.img_quality
+                and self._descriptors_dtype == other.descriptors_dtype
+                and self.overview_factors == other.overview_factors)
+
+    def settings(self) -> dict:
+        # constructor arguments of a layer with the same settings, e.g. in another database
+        return {
+            'name': self.name,
+            'description': self.description,
+            'import_type': self.import_type,
+            'zoom': self._zoom,
+            'tiling': self._tiling,
+            'has_images': self._has_images,
+            'img_codec': self._img_codec,
+            'img_quality': self._img_quality,
+            'overview_factors': self._overview_factors,
+            'has_surf_features': self._has_surf_features,
+            'surf_min_hessian': self._surf_min_hessian,
+            'descriptors_dtype': self._descriptors_dtype,
+            'has_fast_features': self._has_fast_features,
+            'fast_threshold': self._fast_threshold,
+            'fast_nonmax_suppression': self._fast_nonmax_suppression,
+            'fast_type': self._fast_type
+        }
+
+    def validate_tile(self, tile: MapTile):
+        if self._has_images and tile.img is None and tile.img_encoded is None:
             raise ValueError('MapTile.img expected but not provided.')
 
-        if not self._has_images and tile.img is not None:
+        if not self._has_images and (tile.img is not None or tile.img_encoded is not None):
             raise ValueError("MapTile.img provided when none is expected.")
 
         if self._has_surf_features and not bool(tile.surf_features):
@@ -75,7 +168,3 @@ class MapLayer:
 
         if not self._has_fast_features and tile.fast_keypoints is not None:
             raise ValueError('MapTile.fast_keypoints provided but none is expected')
-
-        tile.map_layer_id = self.id
-
-        self._tiles.append(tile)
@@ -0,0 +1,28 @@
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict
+
+
+class MapLayerImportStatus(str, Enum):
+    in_progress = 'in_progress'
+    completed = 'completed'
+
+
+@dataclass
+class MapLayerImport:
+    map_layer_id: int
+    import_profile_type: str
+    import_profile_args: Dict[str, Any] = field(default_factory=dict)
+    tiles_count: int = 0
+    status: MapLayerImportStatus = MapLayerImportStatus.in_progress
+    id: int = None
+
+    def is_completed(self) -> bool:
+        return self.status == MapLayerImportStatus.completed
+
+    def is_same_import(self, import_profile_type: str, import_profile_args: Dict[str, Any]) -> bool:
+        return (self.import_profile_type == import_profile_type
+                and self.import_profile_args == import_profile_args)
+
+    def complete(self):
+        self.status = MapLayerImportStatus.completed
@@ -1,14 +1,29 @@
-from dataclasses import dataclass
-from typing import Sequence, Any, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Any, Optional, Tuple, List
 
-import cv2
 import numpy as np
 
+from map_storage.features.map_layers.models.map_tile_overview import MapTileOverview
+from map_storage.features.shared.descriptors import QuantizedDescriptors
+
 
 @dataclass
 class TileSURFFeatures:
-    keypoints: Sequence[cv2.KeyPoint]
-    descriptors: np.ndarray[Any, np.dtype[np.generic]] | np.ndarray
+    # KEYPOINT_DTYPE structured array
+    keypoints: np.ndarray
+    # stored dtype of the layer, QuantizedDescriptors for uint8 layers
+    descriptors: np.ndarray[Any, np.dtype[np.generic]] | np.ndarray | QuantizedDescriptors
+
+
+@dataclass
+class MapTilePayload:
+    # images and features of a tile, stored apart from the coordinates that tiles are searched by
+    tile_id: Optional[int] = None
+    img: Optional[np.ndarray] = None
+    # compressed image of layers that don't store raw pixels
+    img_encoded: Optional[bytes] = None
+    surf_features: Optional[TileSURFFeatures] = None
+    fast_keypoints: Optional[np.ndarray] = None
 
 
 @dataclass
@@ -25,12 +40,58 @@ class MapTile:
     sw_long: float
     id: Optional[int] = None
     map_layer_id: int = 0
+    import_id: Optional[int] = None
+    grid_index: Optional[int] = None
+    tile_z: Optional[int] = None
+    tile_x: Optional[int] = None
+    tile_y: Optional[int] = None
     azimuth: float = 0
-    surf_features: Optional[TileSURFFeatures] = None
-    fast_keypoints: Optional[np.ndarray] = None
-    img: Optional[np.ndarray] = None
     img_height: int = 0
     img_width: int = 0
+    # layer version the tile was written in
+    version: int = 0
+    # id of the tile in the database the layer was copied from
+    source_id: Optional[int] = None
+    # not loaded with the tile, payload columns are queried explicitly
+    payload: Optional[MapTilePayload] = None
+    # downsampled images of layers with overviews, not loaded with the tile either
+    overviews: List[MapTileOverview] = field(default_factory=list)
+
+    @property
+    def img(self) -> Optional[np.ndarray]:
+        return self.payload.img if self.payload is not None else None
+
+    @img.setter
+    def img(self, value: Optional[np.ndarray]):
+        if value is not None or self.payload is not None:
+            self._ensure_payload().img = value
+
+    @property
+    def img_encoded(self) -> Optional[bytes]:
+        return self.payload.img_encoded if self.payload is not None else None
+
+    @img_encoded.setter
+    def img_encoded(self, value: Optional[bytes]):
+        if value is not None or self.payload is not None:
+            self._ensure_payload().img_encoded = value
+
+    @property
+    def surf_features(self) -> Optional[TileSURFFeatures]:
+        return self.payload.surf_features if self.payload is not None else None
+
+    @surf_features.setter
+    def surf_features(self, value: Optional[TileSURFFeatures]):
+        if value is not None or self.payload is not None:
+            self._ensure_payload().surf_features = value
+
+    @property
+    def fast_keypoints(self) -> Optional[np.ndarray]:
+        return self.payload.fast_keypoints if self.payload is not None else None
+
+    @fast_keypoints.setter
+    def fast_keypoints(self, value: Optional[np.ndarray]):
+        if value is not None or self.payload is not None:
+            self._ensure_payload().fast_keypoints = value
 
     @property
     def img_shape(self) -> Tuple[int, int]:
@@ -41,3 +102,8 @@ class MapTile:
         if len(value) < 2:
             raise ValueError('width and height values expected')
         self.img_height, self.img_width = value
+
+    def _ensure_payload(self) -> MapTilePayload:
+        if self.payload is None:
+            self.payload = MapTilePayload()
+        return self.payload
@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class MapTileOverview:
+    # tile image downsampled by factor, for queries that don't need the full resolution
+    factor: int
+    img_width: int
+    img_height: int
+    img_encoded: bytes
+    tile_id: Optional[int] = None
@@ -0,0 +1,10 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class MapTileTombstone:
+    # id of a deleted tile and the layer version it was deleted in, so that copies of the layer can drop it
+    map_layer_id: int
+    tile_id: int
+    version: int
+    id: int = None
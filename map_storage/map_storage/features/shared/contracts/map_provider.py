@@ -10,6 +10,13 @@ from map_storage.features.shared.models.coordinates import Coordinates
 class GetTileResult:
     error: Optional[str] = None
     img: Optional[np.ndarray] = None
+    img_bytes: Optional[bytes] = None  # encoded image, decoded by the import pipeline when img is not set
+    status: Optional[int] = None
+
+    def size_bytes(self) -> int:
+        if self.img_bytes is not None:
+            return len(self.img_bytes)
+        return self.img.nbytes if self.img is not None else 0
 
 
 class MapProvider(Protocol):
@@ -1,4 +1,6 @@
+import math
 import pickle
+import struct
 from io import BytesIO
 from typing import Optional, Sequence
 
@@ -7,54 +9,163 @@ import numpy as np
 from sqlalchemy import LargeBinary
 from sqlalchemy.types import TypeDecorator
 
+from map_storage.features.shared.descriptors import QuantizedDescriptors
+from map_storage.features.shared.keypoints import KEYPOINT_DTYPE, keypoints_to_array
+
 
 class NumpyArray(TypeDecorator):
     impl = LargeBinary
+    cache_ok = True
 
     def process_bind_param(self, value, dialect):
         if value is None:
             return value
 
-        np_bytes = BytesIO()
-        np.save(np_bytes, value, allow_pickle=True)
-        return np_bytes.getvalue()
+        return encode_array(value)
 
     def process_result_value(self, value, dialect):
         if value is None:
             return value
 
-        np_bytes = BytesIO(value)
-        return np.load(np_bytes, allow_pickle=True)
+        # read-only, code changing loaded arrays in place copies them first
+        return decode_array(value)
+
+
+# \x93MSA, version, ndim, dtype length, dtype, little endian uint64 shape, padding to 16 bytes, raw C-ordered data
+_array_magic = b'\x93MSA'
+_array_version = 1
+_array_header = struct.Struct('<4sBBB')
+_array_alignment = 16
+_npy_magic = b'\x93NUMPY'
+
+
+def encode_array(value: np.ndarray) -> bytes:
+    array = np.asarray(value, order='C')
+    if array.dtype.hasobject:
+        raise ValueError('object arrays can not be stored')
+
+    dtype = array.dtype.str.encode('ascii')
+    header = (_array_header.pack(_array_magic, _array_version, array.ndim, len(dtype))
+              + dtype + struct.pack(f'<{array.ndim}Q', *array.shape))
+    header += bytes(-len(header) % _array_alignment)
+
+    return b''.join((header, array.reshape(-1).view(np.uint8)))
+
+
+def decode_array(value: bytes) -> np.ndarray:
+    # arrays are read-only views over the buffer
+    if bytes(value[:len(_array_magic)]) == _array_magic:
+        _, version, ndim, dtype_length = _array_header.unpack_from(value)
+        if version != _array_version:
+            raise ValueError(f'unsupported array format version {version}')
+
+        offset = _array_header.size
+        dtype = np.dtype(bytes(value[offset:offset + dtype_length]).decode('ascii'))
+        offset += dtype_length
+        shape = struct.unpack_from(f'<{ndim}Q', value, offset)
+        offset += 8 * ndim
+        offset += -offset % _array_alignment
+
+        return np.frombuffer(value, dtype, count=math.prod(shape), offset=offset).reshape(shape)
+
+    if bytes(value[:len(_npy_magic)]) == _npy_magic:
+        return _decode_npy(value)
+
+    raise ValueError('unknown array format')
+
+
+def _decode_npy(value: bytes) -> np.ndarray:
+    # rows written by np.save before the binary format, pickled object arrays are not accepted
+    stream = BytesIO(value)
+    version = np.lib.format.read_magic(stream)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+
+    if dtype.hasobject:
+        raise ValueError('pickled arrays are not loaded')
+
+    array = np.frombuffer(value, dtype, count=math.prod(shape), offset=stream.tell())
+    return array.reshape(shape, order='F' if fortran_order else 'C')
+
+
+class SURFDescriptors(TypeDecorator):
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self,
+                           value: np.ndarray | QuantizedDescriptors,
+                           dialect) -> Optional[bytes]:
+        if value is None:
+            return value
+
+        return encode_descriptors(value)
+
+    def process_result_value(self,
+                             value: bytes,
+                             dialect) -> Optional[np.ndarray | QuantizedDescriptors]:
+        if value is None:
+            return value
+
+        return decode_descriptors(value)
+
+
+# \x93MSQ, format version, float32 scale, padding to 16 bytes and the encoded uint8 values
+_quantized_magic = b'\x93MSQ\x01'
+_quantized_header = struct.Struct('<5sf7x')
+
+
+def encode_descriptors(value: np.ndarray | QuantizedDescriptors) -> bytes:
+    # float descriptors are stored as plain arrays
+    if isinstance(value, QuantizedDescriptors):
+        return _quantized_header.pack(_quantized_magic, value.scale) + encode_array(value.values)
+
+    return encode_array(value)
+
+
+def decode_descriptors(value: bytes) -> np.ndarray | QuantizedDescriptors:
+    if bytes(value[:len(_quantized_magic)]) == _quantized_magic:
+        _, scale = _quantized_header.unpack_from(value)
+        return QuantizedDescriptors(decode_array(memoryview(value)[_quantized_header.size:]), scale)
+
+    return decode_array(value)
 
 
 class SURFKeyPoints(TypeDecorator):
     impl = LargeBinary
+    cache_ok = True
 
     def process_bind_param(self,
-                           value: Sequence[cv2.KeyPoint],
+                           value: np.ndarray | Sequence[cv2.KeyPoint],
                            dialect) -> Optional[bytes]:
         if value is None:
             return value
 
-        tuples = [(kp.pt, kp.size, kp.angle, kp.response, kp.octave, kp.class_id)
-                  for kp in value]
+        if not isinstance(value, np.ndarray):
+            value = keypoints_to_array(value)
 
-        return pickle.dumps(tuples)
+        return _keypoints_magic + np.asarray(value, KEYPOINT_DTYPE).tobytes()
 
     def process_result_value(self,
                              value: bytes,
-                             dialect) -> Optional[Sequence[cv2.KeyPoint]]:
+                             dialect) -> Optional[np.ndarray]:
         if value is None:
             return value
 
-        tuples = pickle.loads(value)
-
-        return [cv2.KeyPoint(
-                    x=t[0][0], y=t[0][1],
-                    size=t[1],
-                    angle=t[2],
-                    response=t[3],
-                    octave=t[4],
-                    class_id=t[5]
-                )
-                for t in tuples]
+        if bytes(value[:len(_keypoints_magic)]) == _keypoints_magic:
+            return np.frombuffer(value, KEYPOINT_DTYPE, offset=len(_keypoints_magic))
+
+        # rows written before the packed format hold a pickled list of keypoint tuples
+        tuples = _TuplesUnpickler(BytesIO(value)).load()
+        return np.array([(t[0][0], t[0][1], *t[1:]) for t in tuples], dtype=KEYPOINT_DTYPE)
+
+
+# \x93MSK and a format version, followed by packed KEYPOINT_DTYPE records
+_keypoints_magic = b'\x93MSK\x01'
+
+
+class _TuplesUnpickler(pickle.Unpickler):
+    # keypoint tuples are built from plain numbers only, any referenced class is rejected
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f'{module}.{name} is not allowed in stored keypoints')
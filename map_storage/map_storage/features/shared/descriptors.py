@@ -0,0 +1,53 @@
+from typing import Optional
+
+import numpy as np
+
+DESCRIPTORS_DTYPES = ('float32', 'float16', 'uint8')
+
+_uint8_zero = 128
+_uint8_max_step = 127
+
+
+class QuantizedDescriptors:
+    # uint8 descriptors of a tile, descriptor values are (values - 128) * scale
+    def __init__(self, values: np.ndarray, scale: float):
+        self.values = values
+        self.scale = scale
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def to_float32(self) -> np.ndarray:
+        res = self.values.astype(np.float32)
+        res -= _uint8_zero
+        res *= np.float32(self.scale)
+        return res
+
+
+def compact_descriptors(descriptors: Optional[np.ndarray], dtype: str) -> Optional[np.ndarray | QuantizedDescriptors]:
+    # descriptors as they are stored in layers of the given descriptors dtype
+    if descriptors is None or dtype == 'float32':
+        return descriptors
+    if dtype == 'float16':
+        return descriptors.astype(np.float16)
+    if dtype == 'uint8':
+        # one scale per tile maps the largest descriptor value of the tile to the end of the uint8 range
+        max_value = float(np.abs(descriptors).max()) if descriptors.size else 0.
+        scale = max_value / _uint8_max_step if max_value > 0 else 1.
+        values = np.rint(descriptors / np.float32(scale)) + _uint8_zero
+        return QuantizedDescriptors(np.clip(values, 0, 255).astype(np.uint8), scale)
+
+    raise ValueError(f'unknown descriptors dtype {dtype}')
+
+
+def float32_descriptors(descriptors: Optional[np.ndarray | QuantizedDescriptors]) -> Optional[np.ndarray]:
+    # float32 descriptors of any storage mode, stored float32 arrays are returned as they are
+    if descriptors is None:
+        return None
+    if isinstance(descriptors, QuantizedDescriptors):
+        return descriptors.to_float32()
+    return descriptors if descriptors.dtype == np.float32 else descriptors.astype(np.float32)
@@ -0,0 +1,75 @@
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+_png_signature = b'\x89PNG\r\n\x1a\n'
+_jpeg_signature = b'\xff\xd8\xff'
+
+
+def encode_image(img: np.ndarray, codec: str, quality: int = 90) -> bytes:
+    if codec == 'png':
+        ok, buffer = cv2.imencode('.png', img, [cv2.IMWRITE_PNG_COMPRESSION, 3])
+    elif codec == 'jpeg':
+        ok, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    elif codec == 'webp':
+        ok, buffer = cv2.imencode('.webp', img, [cv2.IMWRITE_WEBP_QUALITY, quality])
+    else:
+        raise ValueError(f'unknown image codec {codec}')
+
+    if not ok:
+        raise ValueError(f'image could not be encoded as {codec}')
+    return buffer.tobytes()
+
+
+def overview_size(width: int, height: int, factor: int) -> Tuple[int, int]:
+    return max(1, round(width / factor)), max(1, round(height / factor))
+
+
+def downsample_image(img: np.ndarray, factor: int) -> np.ndarray:
+    return cv2.resize(img, overview_size(img.shape[1], img.shape[0], factor), interpolation=cv2.INTER_AREA)
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def image_codec(data: bytes) -> Optional[str]:
+    if data[:len(_png_signature)] == _png_signature:
+        return 'png'
+    if data[:len(_jpeg_signature)] == _jpeg_signature:
+        return 'jpeg'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class EncodedImage:
+    # keeps the stored image bytes, pixels are decoded on first access
+    def __init__(self, data: Optional[bytes] = None, pixels: Optional[np.ndarray] = None):
+        if data is None and pixels is None:
+            raise ValueError('image data or pixels expected')
+        self._data = data
+        self._pixels = pixels
+
+    @property
+    def data(self) -> Optional[bytes]:
+        # None for images stored as raw pixels
+        return self._data
+
+    @property
+    def codec(self) -> str:
+        return image_codec(self._data) if self._data is not None else 'raw'
+
+    @property
+    def is_decoded(self) -> bool:
+        return self._pixels is not None
+
+    @property
+    def pixels(self) -> np.ndarray:
+        if self._pixels is None:
+            self._pixels = decode_image(self._data)
+        return self._pixels
+
+    def __array__(self, dtype=None, copy=None):
+        return self.pixels if dtype is None else self.pixels.astype(dtype)
@@ -0,0 +1,25 @@
+from typing import Sequence, List
+
+import cv2
+import numpy as np
+
+# packed cv2.KeyPoint fields, 28 bytes per keypoint
+KEYPOINT_DTYPE = np.dtype([
+    ('x', '<f4'), ('y', '<f4'), ('size', '<f4'), ('angle', '<f4'), ('response', '<f4'),
+    ('octave', '<i4'), ('class_id', '<i4')
+])
+
+
+def keypoints_to_array(keypoints: Sequence[cv2.KeyPoint]) -> np.ndarray:
+    return np.array([(kp.pt[0], kp.pt[1], kp.size, kp.angle, kp.response, kp.octave, kp.class_id)
+                     for kp in keypoints], dtype=KEYPOINT_DTYPE)
+
+
+def keypoints_from_array(keypoints: np.ndarray) -> List[cv2.KeyPoint]:
+    return [cv2.KeyPoint(x=x, y=y, size=size, angle=angle, response=response, octave=octave, class_id=class_id)
+            for x, y, size, angle, response, octave, class_id in keypoints.tolist()]
+
+
+def keypoints_points(keypoints: np.ndarray) -> np.ndarray:
+    # (n, 2) float32 x, y, e.g. for cv2.findHomography
+    return np.column_stack((keypoints['x'], keypoints['y']))
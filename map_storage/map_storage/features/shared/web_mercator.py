@@ -0,0 +1,49 @@
+from typing import Tuple
+
+import numpy as np
+
+from map_storage.features.shared.models.coordinates import Coordinates
+
+# ground resolution of a 256px zoom 0 tile at the equator
+EQUATOR_METERS_PER_PX = 156543.03392
+MAX_LATITUDE = 85.05112878
+TILE_SIZE_PX = 256
+
+
+def meters_per_px(zoom: float) -> float:
+    return EQUATOR_METERS_PER_PX / 2 ** zoom
+
+
+def world_size_px(zoom: float, tile_size_px: int = TILE_SIZE_PX) -> float:
+    return tile_size_px * 2 ** zoom
+
+
+def lat_long_to_world_px(latitude, longitude, zoom: float, tile_size_px: int = TILE_SIZE_PX):
+    # accepts scalars or numpy arrays
+    sin_lat = np.sin(np.radians(np.clip(latitude, -MAX_LATITUDE, MAX_LATITUDE)))
+    size = world_size_px(zoom, tile_size_px)
+
+    x = (np.asarray(longitude) + 180) / 360 * size
+    y = (0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)) * size
+    return x, y
+
+
+def world_px_to_lat_long(x, y, zoom: float, tile_size_px: int = TILE_SIZE_PX):
+    size = world_size_px(zoom, tile_size_px)
+    longitude = np.asarray(x) / size * 360 - 180
+    latitude = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y) / size))))
+    return latitude, longitude
+
+
+def coordinates_to_world_px(coordinates: Coordinates,
+                            zoom: float,
+                            tile_size_px: int = TILE_SIZE_PX) -> Tuple[float, float]:
+    x, y = lat_long_to_world_px(coordinates.latitude, coordinates.longitude, zoom, tile_size_px)
+    return float(x), float(y)
+
+
+def world_px_to_coordinates(x: float, y: float,
+                            zoom: float,
+                            tile_size_px: int = TILE_SIZE_PX) -> Coordinates:
+    latitude, longitude = world_px_to_lat_long(x, y, zoom, tile_size_px)
+    return Coordinates(float(latitude), float(longitude))
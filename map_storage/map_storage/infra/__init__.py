@@ -1,2 +1,5 @@
 from map_storage.infra.map_providers.google_maps_provider import *
-from map_storage.infra.http import http_session
\ No newline at end of file
+from map_storage.infra.map_providers.cached_map_provider import *
+from map_storage.infra.map_providers.adaptive_map_provider import *
+from map_storage.infra.map_providers.local_tiles_provider import *
+from map_storage.infra.http import http_session, close_http_session
\ No newline at end of file
@@ -1,3 +1,18 @@
+from typing import Optional
+
 import aiohttp
 
-http_session = aiohttp.ClientSession()
+_http_session: Optional[aiohttp.ClientSession] = None
+
+
+def http_session() -> aiohttp.ClientSession:
+    # created on first use, so that the session belongs to the running event loop
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession()
+    return _http_session
+
+
+async def close_http_session():
+    if _http_session is not None:
+        await _http_session.close()
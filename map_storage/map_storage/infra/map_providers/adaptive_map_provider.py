@@ -0,0 +1,146 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import aiohttp
+
+from map_storage.features.shared.contracts.map_provider import MapProvider, GetTileResult
+from map_storage.features.shared.models.coordinates import Coordinates
+
+_retryable_statuses = {408, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class AdaptiveLimiterMetrics:
+    limit: float
+    in_flight: int = 0
+    latency_ms: float = 0
+    min_latency_ms: float = 0
+    error_rate: float = 0
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+
+
+# AIMD limiter: grows concurrency while latency stays close to the best observed one,
+# cuts it on throttling/server errors and retries them with jittered backoff
+class AdaptiveConcurrencyMapProvider:
+    def __init__(self,
+                 map_provider: MapProvider,
+                 initial_limit: int = 4,
+                 min_limit: int = 1,
+                 max_limit: int = 64,
+                 latency_tolerance: float = 2.0,
+                 backoff_ratio: float = 0.5,
+                 max_retries: int = 5,
+                 retry_base_delay_s: float = 0.5,
+                 retry_max_delay_s: float = 30.0,
+                 ewma_alpha: float = 0.2):
+        self._map_provider = map_provider
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._latency_tolerance = latency_tolerance
+        self._backoff_ratio = backoff_ratio
+        self._max_retries = max_retries
+        self._retry_base_delay_s = retry_base_delay_s
+        self._retry_max_delay_s = retry_max_delay_s
+        self._ewma_alpha = ewma_alpha
+        self._slots_changed: Optional[asyncio.Condition] = None
+        self._last_decrease_at = 0.0
+        self.metrics = AdaptiveLimiterMetrics(limit=max(min_limit, min(initial_limit, max_limit)))
+
+    async def load_tile(self,
+                        center: Coordinates,
+                        zoom: float,
+                        with_px: int, height_px: int) -> GetTileResult:
+        attempt = 0
+        while True:
+            saturated = await self._acquire()
+            started_at = time.monotonic()
+            try:
+                tile_res = await self._map_provider.load_tile(center, zoom, with_px, height_px)
+                retryable = tile_res.error is not None and tile_res.status in _retryable_statuses
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                tile_res = GetTileResult(error=f'{type(e).__name__}: {e}')
+                retryable = True
+            finally:
+                await self._release()
+
+            latency_s = time.monotonic() - started_at
+            self.metrics.requests += 1
+
+            if not retryable:
+                # errors like 404 say nothing about the provider load
+                if tile_res.error is None:
+                    self._on_success(latency_s, saturated)
+                return tile_res
+
+            self._on_failure()
+            if attempt >= self._max_retries:
+                return tile_res
+
+            attempt += 1
+            self.metrics.retries += 1
+            await asyncio.sleep(self._retry_delay(attempt))
+
+    def zoom_lvl_to_meters_per_px(self, zoom_lvl: float) -> float:
+        return self._map_provider.zoom_lvl_to_meters_per_px(zoom_lvl)
+
+    def max_tile_size_px(self) -> int:
+        return self._map_provider.max_tile_size_px()
+
+    async def _acquire(self):
+        if self._slots_changed is None:
+            self._slots_changed = asyncio.Condition()
+
+        async with self._slots_changed:
+            await self._slots_changed.wait_for(lambda: self.metrics.in_flight < int(self.metrics.limit))
+            self.metrics.in_flight += 1
+            return self.metrics.in_flight >= int(self.metrics.limit)
+
+    async def _release(self):
+        # the slot is freed before waiting for the lock, so a cancelled release can't leak it,
+        # and waiters are woken up even then
+        self.metrics.in_flight -= 1
+        await asyncio.shield(self._notify_slots_changed())
+
+    async def _notify_slots_changed(self):
+        async with self._slots_changed:
+            self._slots_changed.notify_all()
+
+    def _on_success(self, latency_s: float, saturated: bool):
+        m = self.metrics
+        latency_ms = latency_s * 1000
+
+        m.latency_ms = latency_ms if m.latency_ms == 0 else self._ewma(m.latency_ms, latency_ms)
+        # baseline slowly drifts up so a lasting latency shift doesn't pin the limit at minimum
+        m.min_latency_ms = latency_ms if m.min_latency_ms == 0 else min(m.min_latency_ms * 1.01, latency_ms)
+        m.error_rate = self._ewma(m.error_rate, 0)
+
+        if m.latency_ms > m.min_latency_ms * self._latency_tolerance:
+            self._decrease()
+        elif saturated:
+            # additive increase: +1 once a full window of requests has completed,
+            # only while the window is actually used, otherwise the limit grows unbounded under light load
+            m.limit = min(self._max_limit, m.limit + 1 / m.limit)
+
+    def _on_failure(self):
+        self.metrics.failures += 1
+        self.metrics.error_rate = self._ewma(self.metrics.error_rate, 1)
+        self._decrease()
+
+    def _decrease(self):
+        # requests already in flight report the same congestion, so cut at most once per round trip
+        now = time.monotonic()
+        if now - self._last_decrease_at < self.metrics.latency_ms / 1000:
+            return
+        self._last_decrease_at = now
+        self.metrics.limit = max(self._min_limit, self.metrics.limit * self._backoff_ratio)
+
+    def _retry_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self._retry_max_delay_s, self._retry_base_delay_s * 2 ** attempt))
+
+    def _ewma(self, current: float, sample: float) -> float:
+        return current + self._ewma_alpha * (sample - current)
@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2
+
+from map_storage.features.shared.contracts.map_provider import MapProvider, GetTileResult
+from map_storage.features.shared.models.coordinates import Coordinates
+
+
+@dataclass
+class TilesCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    size_bytes: int = 0
+
+
+class DiskTilesCache:
+    def __init__(self, cache_dir: str, max_size_bytes: int):
+        self._cache_dir = cache_dir
+        self._max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+        # key -> file size, least recently used first
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self.stats = TilesCacheStats()
+        self._load_entries()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key not in self._entries:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(key)
+                self.stats.misses += 1
+            return None
+
+        with self._lock:
+            self.stats.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = len(data)
+            self.stats.entries += 1
+            self.stats.size_bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        while self.stats.size_bytes > self._max_size_bytes and len(self._entries) > 1:
+            key, _ = next(iter(self._entries.items()))
+            self._forget(key)
+            self.stats.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _forget(self, key: str):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self.stats.entries -= 1
+            self.stats.size_bytes -= size
+
+    def _load_entries(self):
+        os.makedirs(self._cache_dir, exist_ok=True)
+        files = []
+        for dir_entry in os.scandir(self._cache_dir):
+            if not dir_entry.is_dir():
+                continue
+            for file_entry in os.scandir(dir_entry.path):
+                if file_entry.name.endswith('.tmp'):
+                    continue
+                stat = file_entry.stat()
+                files.append((stat.st_mtime, file_entry.name, stat.st_size))
+
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self.stats.entries += 1
+            self.stats.size_bytes += size
+        self._evict()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, key[:2], key)
+
+
+class CachedMapProvider:
+    def __init__(self,
+                 map_provider: MapProvider,
+                 cache: DiskTilesCache,
+                 namespace: Optional[str] = None):
+        self._map_provider = map_provider
+        self._cache = cache
+        self._namespace = namespace or type(map_provider).__name__
+
+    @property
+    def stats(self) -> TilesCacheStats:
+        return self._cache.stats
+
+    @property
+    def metrics(self):
+        # concurrency limiter metrics of the wrapped provider, when it has them
+        return getattr(self._map_provider, 'metrics', None)
+
+    async def load_tile(self,
+                        center: Coordinates,
+                        zoom: float,
+                        with_px: int, height_px: int) -> GetTileResult:
+        key = self._cache_key(center, zoom, with_px, height_px)
+
+        img_bytes = await asyncio.to_thread(self._cache.get, key)
+        if img_bytes is not None:
+            return GetTileResult(img_bytes=img_bytes)
+
+        tile_res = await self._map_provider.load_tile(center, zoom, with_px, height_px)
+        if tile_res.error:
+            return tile_res
+
+        img_bytes = tile_res.img_bytes
+        if img_bytes is None and tile_res.img is not None:
+            img_bytes = cv2.imencode('.png', tile_res.img)[1].tobytes()
+
+        if img_bytes:
+            await asyncio.to_thread(self._cache.put, key, img_bytes)
+
+        return tile_res
+
+    def zoom_lvl_to_meters_per_px(self, zoom_lvl: float) -> float:
+        return self._map_provider.zoom_lvl_to_meters_per_px(zoom_lvl)
+
+    def max_tile_size_px(self) -> int:
+        return self._map_provider.max_tile_size_px()
+
+    def _cache_key(self, center: Coordinates, zoom: float, with_px: int, height_px: int) -> str:
+        request = f'{self._namespace}|{center.latitude!r}|{center.longitude!r}|{zoom!r}|{with_px}x{height_px}'
+        return hashlib.sha256(request.encode()).hexdigest()
@@ -1,7 +1,5 @@
 from typing import List
 
-import cv2
-import numpy as np
 from pydantic import confloat, conint
 
 import map_storage.infra as infra
@@ -52,18 +50,16 @@ class GoogleMapsProvider:
             'key': self._api_key
         }
 
-        async with infra.http_session.get(_googlemaps_api_url, params=params) as res:
+        async with infra.http_session().get(_googlemaps_api_url, params=params) as res:
             res_bytes = await res.read()
 
             if res.status != 200:
-                return GetTileResult(error=res_bytes.decode())
+                return GetTileResult(error=res_bytes.decode(), status=res.status)
 
             if len(res_bytes) == 0:
-                return GetTileResult(error='Google map_layers fastapi returned empty response body')
+                return GetTileResult(error='Google map_layers fastapi returned empty response body', status=res.status)
 
-            image_array = np.frombuffer(res_bytes, np.uint8)
-            img = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-            return GetTileResult(img=img)
+            return GetTileResult(img_bytes=res_bytes, status=res.status)
 
     @staticmethod
     def zoom_lvl_to_meters_per_px(zoom_lvl: float) -> float:
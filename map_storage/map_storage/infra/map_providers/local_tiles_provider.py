@@ -0,0 +1,120 @@
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Tuple
+
+import cv2
+import numpy as np
+
+from map_storage.features.shared.contracts.map_provider import GetTileResult
+from map_storage.features.shared.models.coordinates import Coordinates
+from map_storage.features.shared.web_mercator import coordinates_to_world_px, meters_per_px, TILE_SIZE_PX
+
+
+# serves web mercator XYZ tiles from a local directory tree, e.g. {z}/{x}/{y}.png,
+# stitching, cropping and resampling them into the requested static map tile
+class LocalTilesProvider:
+    def __init__(self,
+                 tiles_dir: str,
+                 path_template: str = '{z}/{x}/{y}.png',
+                 tile_size_px: int = TILE_SIZE_PX,
+                 tms: bool = False,
+                 max_tile_size: int = 640,
+                 source_tiles_cache_size: int = 256):
+        self._tiles_dir = tiles_dir
+        self._path_template = path_template
+        self._tile_size_px = tile_size_px
+        self._tms = tms
+        self._max_tile_size = max_tile_size
+        self._zoom_levels = self._find_zoom_levels()
+        self._source_tiles_cache_size = source_tiles_cache_size
+        self._source_tiles: OrderedDict[Tuple[int, int, int], Optional[np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def load_tile(self,
+                        center: Coordinates,
+                        zoom: float,
+                        with_px: int, height_px: int) -> GetTileResult:
+        return await asyncio.to_thread(self._load_tile, center, zoom, with_px, height_px)
+
+    def zoom_lvl_to_meters_per_px(self, zoom_lvl: float) -> float:
+        return meters_per_px(zoom_lvl)
+
+    def max_tile_size_px(self) -> int:
+        return self._max_tile_size
+
+    def _load_tile(self, center: Coordinates, zoom: float, with_px: int, height_px: int) -> GetTileResult:
+        if not self._zoom_levels:
+            return GetTileResult(error=f'No tiles found in {self._tiles_dir}', status=404)
+
+        source_zoom = self._source_zoom(zoom)
+        # size of the requested area in source zoom pixels
+        scale = 2 ** (source_zoom - zoom)
+        src_w, src_h = max(1, round(with_px * scale)), max(1, round(height_px * scale))
+
+        center_x, center_y = coordinates_to_world_px(center, source_zoom, self._tile_size_px)
+        left, top = round(center_x - src_w / 2), round(center_y - src_h / 2)
+
+        img = self._read_window(source_zoom, left, top, src_w, src_h)
+        if img is None:
+            return GetTileResult(error=f'No tiles cover {center} at zoom {source_zoom}', status=404)
+
+        if (src_w, src_h) != (with_px, height_px):
+            interpolation = cv2.INTER_AREA if scale > 1 else cv2.INTER_LINEAR
+            img = cv2.resize(img, (with_px, height_px), interpolation=interpolation)
+
+        return GetTileResult(img=img, status=200)
+
+    def _read_window(self, z: int, left: int, top: int, width: int, height: int) -> Optional[np.ndarray]:
+        ts = self._tile_size_px
+        tiles_count = 2 ** z
+        window = np.zeros((height, width, 3), np.uint8)
+        found = False
+
+        for ty in range(top // ts, (top + height - 1) // ts + 1):
+            if not 0 <= ty < tiles_count:
+                continue
+            for tx in range(left // ts, (left + width - 1) // ts + 1):
+                tile = self._source_tile(z, tx % tiles_count, ty)
+                if tile is None:
+                    continue
+                found = True
+
+                # intersection of the source tile with the window, in world pixels
+                x0, y0 = max(left, tx * ts), max(top, ty * ts)
+                x1, y1 = min(left + width, (tx + 1) * ts), min(top + height, (ty + 1) * ts)
+                window[y0 - top:y1 - top, x0 - left:x1 - left] = \
+                    tile[y0 - ty * ts:y1 - ty * ts, x0 - tx * ts:x1 - tx * ts]
+
+        return window if found else None
+
+    def _source_tile(self, z: int, x: int, y: int) -> Optional[np.ndarray]:
+        key = (z, x, y)
+        with self._lock:
+            if key in self._source_tiles:
+                self._source_tiles.move_to_end(key)
+                return self._source_tiles[key]
+
+        path = os.path.join(self._tiles_dir, self._path_template.format(
+            z=z, x=x, y=(2 ** z - 1 - y) if self._tms else y))
+        tile = cv2.imread(path, cv2.IMREAD_COLOR) if os.path.isfile(path) else None
+        if tile is not None and tile.shape[:2] != (self._tile_size_px, self._tile_size_px):
+            tile = cv2.resize(tile, (self._tile_size_px, self._tile_size_px), interpolation=cv2.INTER_AREA)
+
+        with self._lock:
+            self._source_tiles[key] = tile
+            while len(self._source_tiles) > self._source_tiles_cache_size:
+                self._source_tiles.popitem(last=False)
+        return tile
+
+    def _source_zoom(self, zoom: float) -> int:
+        # prefer downsampling from the closest more detailed level
+        higher = [z for z in self._zoom_levels if z >= zoom]
+        return min(higher) if higher else max(self._zoom_levels)
+
+    def _find_zoom_levels(self) -> List[int]:
+        zoom_dir = self._path_template.split('/')[0]
+        if zoom_dir != '{z}' or not os.path.isdir(self._tiles_dir):
+            return list(range(0, 23))
+        return sorted(int(d.name) for d in os.scandir(self._tiles_dir) if d.is_dir() and d.name.isdigit())
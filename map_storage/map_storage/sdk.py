@@ -1,10 +1,16 @@
-from typing import List, Tuple, Generator, Any
+from typing import List, Tuple, Generator, Any, Iterable, Optional
 from contextlib import asynccontextmanager
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import registry
 from map_storage.features.map_layers.application.queries.tiles_queries import ListTilesInRectangleQuery, \
     TileResponse, ListTilesInRectangleQueryHandler, ListTilesOverlappingWithSquareQuery, \
-    ListTilesOverlappingWithSquareQueryHandler
+    ListTilesOverlappingWithSquareQueryHandler, ListTilesInTileRangeQuery, ListTilesInTileRangeQueryHandler, \
+    ListOverviewTilesInRectangleQuery, ListOverviewTilesInRectangleQueryHandler, square_intervals
+from map_storage.features.map_layers.data.tile_pack import TilePack
+from map_storage.features.map_layers.application.commands.import_map_layer_bundle import \
+    ImportMapLayerBundleCommand, ImportMapLayerBundleHandler, ImportMapLayerBundleResponse
+from map_storage.features.map_layers.application.commands.sync_map_layer import SyncMapLayerCommand, \
+    SyncMapLayerHandler, SyncMapLayerResponse
 from map_storage.features.shared.models.coordinates import Coordinates
 from map_storage.features.map_layers.data.sqlalchemy_config import configure_map_layers_orm
 
@@ -64,3 +70,140 @@ class MapStorageSDK:
             )
             handler = ListTilesOverlappingWithSquareQueryHandler(session)
             return await handler(query)
+
+    async def tiles_in_tile_range(
+            self,
+            layers_ids: List[int],
+            z: int,
+            x_range: Tuple[int, int],
+            y_range: Tuple[int, int],
+            offset: int, limit: int,
+            select_img: bool, select_surf: bool, select_fast: bool) -> List[TileResponse]:
+        async with self.session_scope() as session:
+            query = ListTilesInTileRangeQuery(
+                layers_ids=layers_ids,
+                z=z, x_range=x_range, y_range=y_range,
+                offset=offset, limit=limit,
+                select_img=select_img, select_surf=select_surf, select_fast=select_fast
+            )
+            handler = ListTilesInTileRangeQueryHandler(session)
+            return await handler(query)
+
+    async def overview_in_rectangle_area(
+            self,
+            layers_ids: List[int],
+            start_coordinates: Tuple[float, float],
+            end_coordinates: Tuple[float, float],
+            meters_per_px: float,
+            offset: int, limit: int) -> List[TileResponse]:
+        # tile images only, from the overviews closest to meters_per_px
+        async with self.session_scope() as session:
+            query = ListOverviewTilesInRectangleQuery(
+                layers_ids=layers_ids,
+                start=Coordinates(*start_coordinates),
+                end=Coordinates(*end_coordinates),
+                meters_per_px=meters_per_px,
+                offset=offset, limit=limit
+            )
+            handler = ListOverviewTilesInRectangleQueryHandler(session)
+            return await handler(query)
+
+
+    async def import_layer_bundle(self, path: str, layer_name: Optional[str] = None) -> ImportMapLayerBundleResponse:
+        # layers exported from the hub with ExportMapLayerBundleHandler
+        async with self.session_scope() as session:
+            handler = ImportMapLayerBundleHandler(session)
+            return await handler(ImportMapLayerBundleCommand(path=path, layer_name=layer_name))
+
+
+    async def sync_layer(self, source_db_url: str, source_layer_id: int) -> SyncMapLayerResponse:
+        # pulls tiles of a hub layer changed since the last sync into its local copy
+        source_engine = create_async_engine(source_db_url)
+        try:
+            async with async_sessionmaker(bind=source_engine)() as source_session, \
+                    self.session_scope() as session:
+                handler = SyncMapLayerHandler(source_session, session)
+                return await handler(SyncMapLayerCommand(source_layer_id=source_layer_id))
+        finally:
+            await source_engine.dispose()
+
+
+class MapLayerPacksSDK:
+    # reads layers exported with ExportMapLayerPackHandler from memory mapped pack files, no database needed.
+    # Returned arrays are read-only, as with MapStorageSDK, and are zero-copy views of the mapped files
+    def __init__(self, packs_paths: Iterable[str]):
+        self._packs = {}
+        for path in packs_paths:
+            pack = TilePack(path)
+            self._packs[pack.layer_id] = pack
+
+    @property
+    def layers(self) -> List[dict]:
+        return [pack.layer for pack in self._packs.values()]
+
+    def close(self):
+        for pack in self._packs.values():
+            pack.close()
+
+    async def tiles_in_rectangle_area(
+            self,
+            layers_ids: List[int],
+            start_coordinates: Tuple[float, float],
+            end_coordinates: Tuple[float, float],
+            offset: int, limit: int,
+            select_img: bool, select_surf: bool, select_fast: bool) -> List[TileResponse]:
+        tiles = []
+        for pack in self._layers_packs(layers_ids):
+            tiles.extend(pack.tiles_in_rectangle(start_coordinates, end_coordinates, 0, offset + limit,
+                                                 select_img, select_surf, select_fast))
+        tiles.sort(key=lambda t: (t.latitude, t.longitude))
+        return tiles[offset:offset + limit]
+
+    async def tiles_overlapping_with_square(
+            self,
+            layers_ids: List[int],
+            square_center: Tuple[float, float],
+            square_size_m: float,
+            offset: int, limit: int,
+            select_img: bool, select_surf: bool, select_fast: bool) -> List[TileResponse]:
+        lat_interval, long_interval = square_intervals(Coordinates(*square_center), square_size_m)
+        start, end = (lat_interval[0], long_interval[0]), (lat_interval[1], long_interval[1])
+
+        tiles = []
+        for pack in self._layers_packs(layers_ids):
+            tiles.extend(pack.tiles_overlapping_with_rectangle(start, end, 0, offset + limit,
+                                                               select_img, select_surf, select_fast))
+        tiles.sort(key=lambda t: (t.latitude, t.longitude))
+        return tiles[offset:offset + limit]
+
+    async def tiles_in_tile_range(
+            self,
+            layers_ids: List[int],
+            z: int,
+            x_range: Tuple[int, int],
+            y_range: Tuple[int, int],
+            offset: int, limit: int,
+            select_img: bool, select_surf: bool, select_fast: bool) -> List[TileResponse]:
+        tiles = []
+        for pack in self._layers_packs(layers_ids):
+            tiles.extend(pack.tiles_in_tile_range(z, x_range, y_range, 0, offset + limit,
+                                                  select_img, select_surf, select_fast))
+        tiles.sort(key=lambda t: (t.key[2], t.key[1]))
+        return tiles[offset:offset + limit]
+
+    async def overview_in_rectangle_area(
+            self,
+            layers_ids: List[int],
+            start_coordinates: Tuple[float, float],
+            end_coordinates: Tuple[float, float],
+            meters_per_px: float,
+            offset: int, limit: int) -> List[TileResponse]:
+        tiles = []
+        for pack in self._layers_packs(layers_ids):
+            tiles.extend(pack.overview_in_rectangle(start_coordinates, end_coordinates, meters_per_px,
+                                                    0, offset + limit))
+        tiles.sort(key=lambda t: (t.latitude, t.longitude))
+        return tiles[offset:offset + limit]
+
+    def _layers_packs(self, layers_ids: List[int]) -> List[TilePack]:
+        return [self._packs[i] for i in layers_ids if i in self._packs]
@@ -42,6 +42,9 @@ setup(
         "SQLAlchemy==2.0.24",
         "typing_extensions==4.9.0"
     ],
-    extras_require={ },
+    extras_require={
+        "geotiff": ["rasterio>=1.3"],
+        "tests": ["pytest==9.1.1", "aiosqlite==0.22.1"]
+    },
     python_requires=">=3.11",
 )
\ No newline at end of file
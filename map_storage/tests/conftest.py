@@ -0,0 +1,28 @@
+import pytest
+
+from tests.helpers import create_db
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.fixture
+async def create_database(tmp_path):
+    # sqlite databases of the test, their engines are disposed on teardown
+    engines = []
+
+    async def create(name: str = 'db'):
+        engine, session_maker = await create_db(str(tmp_path / f'{name}.sqlite'))
+        engines.append(engine)
+        return session_maker
+
+    yield create
+    for engine in engines:
+        await engine.dispose()
+
+
+@pytest.fixture
+async def session_maker(create_database):
+    return await create_database()
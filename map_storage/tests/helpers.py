@@ -0,0 +1,110 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List
+
+import numpy as np
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import registry
+
+from map_storage.features.import_profiles.data.sqlalchemy_config import configure_import_profiles_orm
+from map_storage.features.import_profiles.models.import_profile import ImportProfile
+from map_storage.features.map_layers.application.commands.import_map_layer import ImportMapLayerHandler, \
+    ImportMapLayerCommand, ImportActions
+from map_storage.features.map_layers.data.sqlalchemy_config import configure_map_layers_orm
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.map_layers.models.map_tile import MapTile
+from map_storage.features.map_layers.models.map_tile_overview import MapTileOverview
+from map_storage.features.shared.contracts.map_provider import GetTileResult
+from map_storage.features.shared.images import downsample_image, encode_image
+from map_storage.features.shared.models.coordinates import Coordinates
+from map_storage.features.shared.web_mercator import EQUATOR_METERS_PER_PX
+from map_storage.infra.db.repository import SqlAlchemyRepository
+
+orm_registry = registry()
+configure_import_profiles_orm(orm_registry)
+configure_map_layers_orm(orm_registry)
+
+
+async def create_db(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_async_engine(f'sqlite+aiosqlite:///{path}')
+    async with engine.begin() as connection:
+        await connection.run_sync(orm_registry.metadata.create_all)
+    return engine, async_sessionmaker(bind=engine)
+
+
+def create_layer(name: str = 'layer', **kwargs) -> MapLayer:
+    settings = dict(zoom=17, import_type='rectangle', has_images=True,
+                    has_surf_features=False, has_fast_features=False)
+    settings.update(kwargs)
+    return MapLayer(name=name, **settings)
+
+
+def create_tile(map_layer_id: int, index: int, img: Optional[np.ndarray] = None, **kwargs) -> MapTile:
+    lat, long = 50 + index * 1e-3, 30.0
+    tile = MapTile(lat, long, lat + 5e-4, long - 5e-4, lat + 5e-4, long + 5e-4,
+                   lat - 5e-4, long + 5e-4, lat - 5e-4, long - 5e-4,
+                   map_layer_id=map_layer_id, grid_index=index, **kwargs)
+    if img is None:
+        img = np.random.default_rng(index).integers(0, 255, (16, 24, 3), dtype=np.uint8)
+    tile.img_shape = img.shape[:2]
+    tile.img = img
+    return tile
+
+
+def create_overviews(img: np.ndarray, factors: List[int]) -> List[MapTileOverview]:
+    overviews = []
+    for factor in factors:
+        overview = downsample_image(img, factor)
+        overviews.append(MapTileOverview(factor, overview.shape[1], overview.shape[0], encode_image(overview, 'png')))
+    return overviews
+
+
+class FakeMapProvider:
+    # png tiles of random pixels, fail_at makes that call of load_tile return an error
+    def __init__(self, max_px: int = 64, fail_at: Optional[int] = None):
+        self.max_px = max_px
+        self.fail_at = fail_at
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def load_tile(self, center: Coordinates, zoom: float, with_px: int, height_px: int) -> GetTileResult:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.001)
+            if self.calls == self.fail_at:
+                return GetTileResult(error='quota exceeded', status=429)
+            img = np.random.default_rng(self.calls).integers(0, 255, (height_px, with_px, 3), dtype=np.uint8)
+            return GetTileResult(img_bytes=encode_image(img, 'png'))
+        finally:
+            self.in_flight -= 1
+
+    @staticmethod
+    def zoom_lvl_to_meters_per_px(zoom_lvl: float) -> float:
+        return EQUATOR_METERS_PER_PX / 2 ** zoom_lvl
+
+    def max_tile_size_px(self) -> int:
+        return self.max_px
+
+
+def import_command(layer_name: str = 'layer', end=(50.003, 30.004), **kwargs) -> ImportMapLayerCommand:
+    args = dict(import_profile_type='rectangle',
+                import_profile_args={'start': {'latitude': 50.0, 'longitude': 30.0},
+                                     'end': {'latitude': end[0], 'longitude': end[1]}},
+                layer_name=layer_name, zoom_lvl=17, actions=ImportActions(save_img=True))
+    args.update(kwargs)
+    return ImportMapLayerCommand(**args)
+
+
+async def import_layer(session_maker, map_provider, command: ImportMapLayerCommand, executor=None):
+    # tiles are processed in threads unless an executor is given, spawning a process pool is slow for tests
+    with ThreadPoolExecutor(2) as threads:
+        async with session_maker() as db:
+            handler = ImportMapLayerHandler(db, SqlAlchemyRepository(db, ImportProfile),
+                                            SqlAlchemyRepository(db, MapLayer), map_provider, executor or threads)
+            return await handler(command)
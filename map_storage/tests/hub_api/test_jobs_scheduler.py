@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from hub_api.features.map_layers.import_jobs import ImportJobResponse
+from hub_api.infra.jobs_scheduler import JobsScheduler, JobStatus
+from map_storage.features.map_layers.application.commands.import_map_layer import ImportProgress
+from map_storage.features.map_layers.application.commands.import_map_layer.response import ImportMapLayerResponse
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_jobs_run_with_bounded_concurrency():
+    scheduler = JobsScheduler(max_concurrent_jobs=2)
+    release = asyncio.Event()
+    running = []
+
+    async def job_run(job):
+        running.append(job.id)
+        await release.wait()
+        return len(running)
+
+    jobs = [scheduler.submit(job_run) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    statuses = [job.status for job in jobs]
+    release.set()
+    await asyncio.gather(*(job._task for job in jobs))
+
+    assert statuses == [JobStatus.running, JobStatus.running, JobStatus.queued]
+    assert all(job.status == JobStatus.completed and job.finished_at is not None for job in jobs)
+    assert [job.result for job in jobs] == [2, 2, 3]
+
+
+async def test_failed_and_cancelled_jobs():
+    scheduler = JobsScheduler(max_concurrent_jobs=1)
+
+    async def failing(job):
+        raise ValueError('no tiles')
+
+    async def endless(job):
+        await asyncio.Event().wait()
+
+    failed = scheduler.submit(failing)
+    cancelled = scheduler.submit(endless)
+    await asyncio.sleep(0.01)
+    assert scheduler.cancel(cancelled.id) is cancelled
+    await asyncio.gather(failed._task, cancelled._task)
+
+    assert failed.status == JobStatus.failed and failed.error == 'no tiles'
+    assert cancelled.status == JobStatus.cancelled
+    assert scheduler.cancel('missing') is None
+
+
+async def test_job_cancelled_before_it_starts():
+    scheduler = JobsScheduler(max_concurrent_jobs=1)
+    runs = []
+
+    async def job_run(job):
+        runs.append(job.id)
+
+    job = scheduler.submit(job_run)
+    scheduler.cancel(job.id)
+    await asyncio.gather(job._task, return_exceptions=True)
+
+    assert runs == [] and job.status == JobStatus.cancelled and job.finished_at is not None
+
+
+async def test_oldest_finished_jobs_are_forgotten():
+    scheduler = JobsScheduler(max_concurrent_jobs=4, max_finished_jobs=2)
+
+    async def job_run(job):
+        return None
+
+    jobs = []
+    for _ in range(4):
+        jobs.append(scheduler.submit(job_run))
+        await jobs[-1]._task
+    # the latest job is not finished when it is submitted
+    jobs.append(scheduler.submit(job_run))
+    await jobs[-1]._task
+
+    assert scheduler.list() == jobs[2:]
+
+
+async def test_import_job_response():
+    scheduler = JobsScheduler(max_concurrent_jobs=1)
+    progress = ImportProgress()
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def job_run(job):
+        job.progress.start(7, tiles_total=10, tiles_resumed=4)
+        job.progress.stats.store.tiles = 2
+        job.progress.stats.fetch.bytes = 1024
+        started.set()
+        await release.wait()
+        return ImportMapLayerResponse(id=7, resumed_tiles=4)
+
+    job = scheduler.submit(job_run, progress)
+    await started.wait()
+    running = ImportJobResponse.from_job(job)
+    release.set()
+    await job._task
+    completed = ImportJobResponse.from_job(job)
+
+    assert running.status == JobStatus.running and running.map_layer_id == 7
+    assert (running.tiles_total, running.tiles_done, running.bytes_downloaded) == (10, 6, 1024)
+    assert running.eta_seconds is not None and running.eta_seconds > 0 and running.result is None
+    assert completed.status == JobStatus.completed and completed.eta_seconds is None
+    assert completed.result.id == 7 and completed.result.resumed_tiles == 4
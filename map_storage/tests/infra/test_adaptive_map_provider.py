@@ -0,0 +1,96 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from map_storage.features.shared.contracts.map_provider import GetTileResult
+from map_storage.features.shared.models.coordinates import Coordinates
+from map_storage.infra.map_providers.adaptive_map_provider import AdaptiveConcurrencyMapProvider
+
+pytestmark = pytest.mark.anyio
+
+
+class _Provider:
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.calls = 0
+        self.before_return = None
+
+    async def load_tile(self, center, zoom, with_px, height_px) -> GetTileResult:
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.before_return is not None:
+            await self.before_return.wait()
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status != 200:
+            return GetTileResult(error='failed', status=status)
+        return GetTileResult(img=np.zeros((2, 2, 3), np.uint8), status=status)
+
+    @staticmethod
+    def zoom_lvl_to_meters_per_px(zoom_lvl: float) -> float:
+        return 1
+
+    @staticmethod
+    def max_tile_size_px() -> int:
+        return 256
+
+
+def _load(provider):
+    return provider.load_tile(Coordinates(50, 30), 17, 256, 256)
+
+
+async def test_release_cancelled_while_waiting_for_the_lock_frees_the_slot():
+    loaded = asyncio.Event()
+    map_provider = _Provider()
+    map_provider.before_return = loaded
+    provider = AdaptiveConcurrencyMapProvider(map_provider, initial_limit=1, max_limit=1)
+
+    task = asyncio.create_task(_load(provider))
+    while map_provider.calls == 0:
+        await asyncio.sleep(0)
+
+    async with provider._slots_changed:
+        loaded.set()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        # the request is done and its release waits for the lock
+        task.cancel()
+        await asyncio.sleep(0)
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert task.cancelled() and provider.metrics.in_flight == 0
+    res = await asyncio.wait_for(_load(provider), timeout=1)
+    assert res.error is None
+
+
+async def test_retryable_errors_are_retried_and_cut_the_limit():
+    provider = AdaptiveConcurrencyMapProvider(_Provider([503, 429]), initial_limit=8,
+                                              retry_base_delay_s=0.001, retry_max_delay_s=0.001)
+    res = await _load(provider)
+    assert res.error is None and provider._map_provider.calls == 3
+    assert provider.metrics.retries == 2 and provider.metrics.limit < 8
+    assert provider.metrics.in_flight == 0
+
+    failing = AdaptiveConcurrencyMapProvider(_Provider([500] * 10), max_retries=2,
+                                             retry_base_delay_s=0.001, retry_max_delay_s=0.001)
+    assert (await _load(failing)).status == 500 and failing.metrics.failures == 3
+
+
+async def test_limit_grows_only_while_the_window_is_used():
+    # sub-millisecond latencies of the fake provider are noise, so they never cut the limit here
+    provider = AdaptiveConcurrencyMapProvider(_Provider(), initial_limit=4, latency_tolerance=1e6)
+    for _ in range(10):
+        await _load(provider)
+    assert provider.metrics.limit == 4
+
+    await asyncio.gather(*(_load(provider) for _ in range(16)))
+    assert provider.metrics.limit > 4
+
+
+async def test_non_retryable_errors_leave_the_limiter_alone():
+    provider = AdaptiveConcurrencyMapProvider(_Provider([404] * 8), initial_limit=2)
+    results = await asyncio.gather(*(_load(provider) for _ in range(8)))
+
+    assert all(res.status == 404 for res in results) and provider._map_provider.calls == 8
+    assert provider.metrics.limit == 2 and provider.metrics.latency_ms == 0
+    assert provider.metrics.failures == 0 and provider.metrics.error_rate == 0
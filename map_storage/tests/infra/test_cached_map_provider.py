@@ -0,0 +1,56 @@
+import pytest
+
+from map_storage.features.shared.models.coordinates import Coordinates
+from map_storage.infra.map_providers.cached_map_provider import CachedMapProvider, DiskTilesCache
+from tests.helpers import FakeMapProvider
+
+pytestmark = pytest.mark.anyio
+
+
+async def _load(provider, latitude: float = 50.0, zoom: float = 17):
+    return await provider.load_tile(Coordinates(latitude, 30.0), zoom, 16, 16)
+
+
+async def test_tiles_are_served_from_cache(tmp_path):
+    map_provider = FakeMapProvider()
+    provider = CachedMapProvider(map_provider, DiskTilesCache(str(tmp_path), 1 << 20))
+
+    first = await _load(provider)
+    cached = await _load(provider)
+    other_zoom = await _load(provider, zoom=18)
+
+    assert cached.img_bytes == first.img_bytes
+    assert other_zoom.img_bytes != first.img_bytes
+    assert map_provider.calls == 2
+    assert (provider.stats.hits, provider.stats.misses, provider.stats.entries) == (1, 2, 2)
+
+    reopened = CachedMapProvider(FakeMapProvider(), DiskTilesCache(str(tmp_path), 1 << 20), 'FakeMapProvider')
+    assert (await _load(reopened)).img_bytes == first.img_bytes
+    assert reopened.stats.size_bytes == provider.stats.size_bytes
+
+
+async def test_errors_are_not_cached(tmp_path):
+    map_provider = FakeMapProvider(fail_at=1)
+    provider = CachedMapProvider(map_provider, DiskTilesCache(str(tmp_path), 1 << 20))
+
+    assert (await _load(provider)).status == 429
+    assert (await _load(provider)).error is None
+    assert map_provider.calls == 2 and provider.stats.entries == 1
+
+
+async def test_least_recently_used_tiles_are_evicted(tmp_path):
+    map_provider = FakeMapProvider()
+    tile_size = len((await _load(map_provider)).img_bytes)
+    map_provider.calls = 0
+    provider = CachedMapProvider(map_provider, DiskTilesCache(str(tmp_path / 'cache'), tile_size * 2 + tile_size // 2))
+
+    await _load(provider, 50.0)
+    await _load(provider, 50.1)
+    await _load(provider, 50.0)
+    await _load(provider, 50.2)
+
+    assert provider.stats.evictions == 1 and provider.stats.entries == 2
+    await _load(provider, 50.0)
+    assert map_provider.calls == 3
+    await _load(provider, 50.1)
+    assert map_provider.calls == 4
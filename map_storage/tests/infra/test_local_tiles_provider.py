@@ -0,0 +1,62 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from map_storage.features.shared.web_mercator import world_px_to_coordinates
+from map_storage.infra.map_providers.local_tiles_provider import LocalTilesProvider
+
+pytestmark = pytest.mark.anyio
+
+_tile_size = 16
+
+
+def _tile_color(x: int, y: int):
+    return 40 * x, 40 * y, 200
+
+
+def _write_tiles(tiles_dir, z: int, tms: bool = False):
+    for x in range(2 ** z):
+        for y in range(2 ** z):
+            file_y = 2 ** z - 1 - y if tms else y
+            os.makedirs(tiles_dir / str(z) / str(x), exist_ok=True)
+            tile = np.full((_tile_size, _tile_size, 3), _tile_color(x, y), np.uint8)
+            cv2.imwrite(str(tiles_dir / str(z) / str(x) / f'{file_y}.png'), tile)
+
+
+async def _load(provider, world_x: float, world_y: float, zoom: float, size: int):
+    return await provider.load_tile(world_px_to_coordinates(world_x, world_y, zoom, _tile_size), zoom, size, size)
+
+
+async def test_tiles_are_stitched_across_source_tiles(tmp_path):
+    _write_tiles(tmp_path, 2)
+    provider = LocalTilesProvider(str(tmp_path), tile_size_px=_tile_size)
+
+    res = await _load(provider, 2 * _tile_size, _tile_size, 2, 8)
+
+    assert res.error is None and res.img.shape == (8, 8, 3)
+    assert (res.img[:4, :4] == _tile_color(1, 0)).all()
+    assert (res.img[:4, 4:] == _tile_color(2, 0)).all()
+    assert (res.img[4:, :4] == _tile_color(1, 1)).all()
+    assert (res.img[4:, 4:] == _tile_color(2, 1)).all()
+
+
+async def test_tms_rows_and_downsampling_from_a_more_detailed_level(tmp_path):
+    _write_tiles(tmp_path, 2, tms=True)
+    provider = LocalTilesProvider(str(tmp_path), tile_size_px=_tile_size, tms=True)
+
+    # a whole zoom 1 tile is made of four source tiles
+    res = await _load(provider, _tile_size / 2, _tile_size / 2, 1, _tile_size // 2)
+
+    assert res.img.shape == (_tile_size // 2, _tile_size // 2, 3)
+    assert (res.img[0, 0] == _tile_color(0, 0)).all()
+    assert (res.img[-1, -1] == _tile_color(1, 1)).all()
+
+
+async def test_missing_tiles(tmp_path):
+    _write_tiles(tmp_path / 'tiles', 1)
+
+    assert (await _load(LocalTilesProvider(str(tmp_path / 'empty')), 0, 0, 1, 8)).status == 404
+    provider = LocalTilesProvider(str(tmp_path / 'tiles'), path_template='{z}/{x}/{y}.jpg', tile_size_px=_tile_size)
+    assert (await _load(provider, _tile_size, _tile_size, 1, 8)).status == 404
@@ -0,0 +1,107 @@
+import pytest
+
+from map_storage.features.map_layers.application.commands.import_map_layer import ImportActions, FetchOptions
+from map_storage.features.map_layers.application.commands.import_map_layer.map_tiles_grids import build_tiles_grid
+from map_storage.features.map_layers.application.queries.estimate_map_layer_import import \
+    EstimateMapLayerImportQueryHandler, EstimateMapLayerImportQuery
+from map_storage.features.shared.web_mercator import EQUATOR_METERS_PER_PX
+from tests.helpers import create_layer, create_tile, create_overviews
+
+pytestmark = pytest.mark.anyio
+
+
+class _Provider:
+    @staticmethod
+    def zoom_lvl_to_meters_per_px(zoom_lvl: float) -> float:
+        return EQUATOR_METERS_PER_PX / 2 ** zoom_lvl
+
+    @staticmethod
+    def max_tile_size_px() -> int:
+        return 256
+
+
+def _query(fetch: FetchOptions = FetchOptions(), **actions) -> EstimateMapLayerImportQuery:
+    return EstimateMapLayerImportQuery(
+        import_profile_type='rectangle',
+        import_profile_args={'start': {'latitude': 50.0, 'longitude': 30.0},
+                             'end': {'latitude': 50.01, 'longitude': 30.01}},
+        zoom_lvl=17,
+        actions=ImportActions(**actions),
+        fetch=fetch)
+
+
+def _encoded_tiles(map_layer_id: int, count: int, size: int):
+    tiles = []
+    for i in range(count):
+        tile = create_tile(map_layer_id, i)
+        tile.img = None
+        tile.img_encoded = bytes(size)
+        tiles.append(tile)
+    return tiles
+
+
+async def test_tiles_and_images_estimate(session_maker):
+    async with session_maker(expire_on_commit=False) as db:
+        handler = EstimateMapLayerImportQueryHandler(db, _Provider(), request_latency_s=0.5)
+        query = _query(fetch=FetchOptions(max_concurrent_requests=4, max_requests_per_second=2))
+        raw = await handler(query)
+
+        grid = build_tiles_grid(_Provider.zoom_lvl_to_meters_per_px(17), 256,
+                                query.import_profile_type, query.import_profile_args)
+        assert raw.tiles == raw.provider_requests == len(grid)
+        assert raw.megapixels == pytest.approx(len(grid) * grid.tiles_width_px * grid.tiles_height_px / 10 ** 6)
+        # raw images have a default size, 3 bytes per pixel
+        assert raw.img.sampled_tiles == 0 and raw.img.total_bytes == round(raw.megapixels * 3 * 10 ** 6)
+        assert raw.total_bytes == raw.img.total_bytes
+        assert raw.estimated_seconds == pytest.approx(raw.tiles / 2)
+
+        # compressed sizes are unknown until a layer of the codec is stored
+        unknown = await handler(_query(img_codec='jpeg', img_quality=80))
+        assert unknown.img.total_bytes is None and unknown.total_bytes is None
+        assert unknown.estimated_seconds == pytest.approx(unknown.tiles / 8)
+
+        for quality, size in ((80, 200), (50, 100)):
+            layer = create_layer(f'jpeg {quality}', img_codec='jpeg', img_quality=quality)
+            db.add(layer)
+            await db.flush()
+            db.add_all(_encoded_tiles(layer.id, 3, size))
+        await db.commit()
+
+        px = 16 * 24
+        same_quality = await handler(_query(img_codec='jpeg', img_quality=80))
+        assert same_quality.img.sampled_tiles == 3
+        assert same_quality.img.bytes_per_megapixel == pytest.approx(200 / px * 10 ** 6)
+
+        other_quality = await handler(_query(img_codec='jpeg', img_quality=70))
+        assert other_quality.img.sampled_tiles == 6
+        assert other_quality.img.bytes_per_megapixel == pytest.approx(150 / px * 10 ** 6)
+        assert (await handler(_query(img_codec='webp'))).img.total_bytes is None
+
+
+async def test_overviews_are_estimated_from_stored_overviews(session_maker):
+    async with session_maker(expire_on_commit=False) as db:
+        layer = create_layer(overview_factors=[2, 4])
+        db.add(layer)
+        await db.flush()
+        tiles = [create_tile(layer.id, i) for i in range(4)]
+        for tile in tiles:
+            tile.overviews = create_overviews(tile.img, [2, 4])
+        db.add_all(tiles)
+        await db.commit()
+
+        handler = EstimateMapLayerImportQueryHandler(db, _Provider())
+        res = await handler(_query(overview_factors=[4, 2]))
+        assert res.overviews.sampled_tiles == 4
+
+        px = sum(t.img_width * t.img_height for t in tiles)
+        overview_bytes = sum(len(o.img_encoded) for t in tiles for o in t.overviews)
+        assert res.overviews.bytes_per_megapixel == pytest.approx(overview_bytes / px * 10 ** 6)
+        assert res.total_bytes == res.img.total_bytes + res.overviews.total_bytes
+
+        only_half = await handler(_query(overview_factors=[2]))
+        assert only_half.overviews.bytes_per_megapixel < res.overviews.bytes_per_megapixel
+
+        # no stored overviews of that factor
+        unknown = await handler(_query(overview_factors=[2, 8]))
+        assert unknown.overviews.total_bytes is None and unknown.total_bytes is None
+        assert (await handler(_query())).overviews is None
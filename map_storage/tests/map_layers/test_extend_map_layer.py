@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from sqlalchemy import select, func
+
+from map_storage.features.map_layers.application.commands.extend_map_layer import ExtendMapLayerCommand, \
+    ExtendMapLayerHandler
+from map_storage.features.map_layers.application.commands.extend_map_layer.tiles_coverage import TilesCoverage
+from map_storage.features.map_layers.application.commands.import_map_layer.command import TilingScheme
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.map_layers.models.map_layer_import import MapLayerImport
+from map_storage.features.map_layers.models.map_tile import MapTile
+from map_storage.features.shared.exceptions import MapStorageException
+from map_storage.infra.db.repository import SqlAlchemyRepository
+from tests.helpers import import_command, import_layer, FakeMapProvider
+
+
+async def _extend(session_maker, map_provider, map_layer_id: int, end):
+    command = ExtendMapLayerCommand(
+        map_layer_id=map_layer_id, import_profile_type='rectangle',
+        import_profile_args={'start': {'latitude': 50.0, 'longitude': 30.0},
+                             'end': {'latitude': end[0], 'longitude': end[1]}})
+    with ThreadPoolExecutor(2) as threads:
+        async with session_maker() as db:
+            return await ExtendMapLayerHandler(db, SqlAlchemyRepository(db, MapLayer), map_provider, threads)(command)
+
+
+@pytest.mark.anyio
+async def test_extension_fetches_only_uncovered_tiles(session_maker):
+    command = import_command(tiling=TilingScheme.WEB_MERCATOR)
+    imported = await import_layer(session_maker, FakeMapProvider(max_px=256), command)
+    async with session_maker() as db:
+        imported_tiles = await db.scalar(select(func.count()).select_from(MapTile))
+
+    same_area_provider = FakeMapProvider(max_px=256)
+    same_area = await _extend(session_maker, same_area_provider, imported.id, (50.003, 30.004))
+
+    provider = FakeMapProvider(max_px=256)
+    extended = await _extend(session_maker, provider, imported.id, (50.006, 30.004))
+
+    async with session_maker() as db:
+        tiles = await db.scalar(select(func.count()).select_from(MapTile))
+        keys = (await db.execute(select(MapTile.tile_z, MapTile.tile_x, MapTile.tile_y))).all()
+        imports = list(await db.scalars(select(MapLayerImport).order_by(MapLayerImport.id)))
+
+    assert same_area.skipped_tiles == imported_tiles and same_area_provider.calls == 0
+    assert extended.skipped_tiles == imported_tiles and provider.calls > 0
+    assert tiles == imported_tiles + provider.calls == imported_tiles + extended.stats.store.tiles
+    # the extension doesn't duplicate any stored tile
+    assert len(set(keys)) == len(keys)
+    assert all(i.is_completed() for i in imports) and imports[-1].tiles_count == provider.calls
+
+
+@pytest.mark.anyio
+async def test_layers_of_profile_tiles_are_not_extended(session_maker):
+    imported = await import_layer(session_maker, FakeMapProvider(), import_command())
+
+    with pytest.raises(MapStorageException):
+        await _extend(session_maker, FakeMapProvider(), imported.id, (50.006, 30.004))
+    async with session_maker() as db:
+        assert await db.scalar(select(func.count()).select_from(MapLayerImport)) == 1
+
+
+def test_coverage_of_rotated_tiles():
+    # a diamond of a tile rotated by 45 degrees, nw, ne, se, sw corners
+    corners = np.array([[[1., 0.], [2., 1.], [1., 2.], [0., 1.]],
+                        [[1., 10.], [1., 11.], [0., 11.], [0., 10.]]])
+    coverage = TilesCoverage.from_corners(corners)
+
+    points = np.array([[1., 1.], [1.9, 1.], [0.2, 0.2], [1.8, 1.8], [0.5, 10.5], [0.5, 12.]])
+    assert coverage.covers_points(points).tolist() == [True, True, False, False, True, False]
+    assert not TilesCoverage.from_corners(np.empty((0, 4, 2))).covers_points(points).any()
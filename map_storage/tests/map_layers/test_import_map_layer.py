@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import select, func
+
+from map_storage.features.map_layers.application.commands.import_map_layer import ImportMapLayerHandler
+from map_storage.features.map_layers.application.commands.import_map_layer.command import PersistenceOptions, \
+    FetchOptions, TilingScheme
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.map_layers.models.map_layer_import import MapLayerImport, MapLayerImportStatus
+from map_storage.features.map_layers.models.map_tile import MapTile
+from map_storage.features.shared.exceptions import MapProviderException, MapStorageException
+from map_storage.infra.db.repository import SqlAlchemyRepository
+from tests.helpers import import_command, import_layer, FakeMapProvider
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failed_import_resumes_from_missing_tiles(session_maker):
+    command = import_command(persistence=PersistenceOptions(batch_size=2),
+                             fetch=FetchOptions(max_concurrent_requests=1))
+
+    with pytest.raises(MapProviderException):
+        await import_layer(session_maker, FakeMapProvider(fail_at=5), command)
+
+    async with session_maker() as db:
+        assert await db.scalar(select(func.count()).select_from(MapTile)) == 4
+        assert await db.scalar(select(MapLayerImport.status)) == MapLayerImportStatus.in_progress
+
+    provider = FakeMapProvider()
+    response = await import_layer(session_maker, provider, command)
+
+    async with session_maker() as db:
+        grid_indices = list(await db.scalars(select(MapTile.grid_index).order_by(MapTile.grid_index)))
+        layer_import = await db.scalar(select(MapLayerImport))
+
+    assert response.resumed_tiles == 4
+    assert grid_indices == list(range(len(grid_indices)))
+    assert provider.calls == len(grid_indices) - 4
+    assert layer_import.is_completed() and layer_import.tiles_count == len(grid_indices)
+
+
+async def test_completed_import_is_not_resumed(session_maker):
+    await import_layer(session_maker, FakeMapProvider(), import_command())
+
+    with pytest.raises(MapStorageException):
+        await import_layer(session_maker, FakeMapProvider(), import_command())
+    with pytest.raises(MapStorageException):
+        await import_layer(session_maker, FakeMapProvider(), import_command(end=(50.004, 30.004)))
+
+
+async def test_begun_import_is_validated_and_then_picked_up(session_maker):
+    async def begin_import(command):
+        async with session_maker() as db:
+            handler = ImportMapLayerHandler(db, None, SqlAlchemyRepository(db, MapLayer), FakeMapProvider())
+            await handler.begin_import(command)
+
+    await begin_import(import_command())
+    response = await import_layer(session_maker, FakeMapProvider(), import_command())
+
+    with pytest.raises(MapStorageException):
+        await begin_import(import_command(end=(50.004, 30.004)))
+    async with session_maker() as db:
+        assert await db.scalar(select(func.count()).select_from(MapLayerImport)) == 1
+        assert (await db.scalar(select(MapLayerImport))).is_completed()
+    assert response.resumed_tiles == 0
+
+
+async def test_web_mercator_tiles_are_stored_with_their_keys(session_maker):
+    await import_layer(session_maker, FakeMapProvider(max_px=256), import_command(tiling=TilingScheme.WEB_MERCATOR))
+
+    async with session_maker() as db:
+        rows = (await db.execute(
+            select(MapTile.tile_z, MapTile.tile_x, MapTile.tile_y, MapTile.img_width, MapTile.img_height)
+            .order_by(MapTile.grid_index))).all()
+
+    assert rows and all(z == 17 and (w, h) == (256, 256) for z, _, _, w, h in rows)
+    keys = [(y, x) for _, x, y, _, _ in rows]
+    # row-major from the north-west tile
+    assert keys == sorted(set(keys))
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from map_storage.features.map_layers.application.commands.export_map_layer_bundle import \
+    ExportMapLayerBundleHandler, ExportMapLayerBundleCommand
+from map_storage.features.map_layers.application.commands.import_map_layer_bundle import \
+    ImportMapLayerBundleHandler, ImportMapLayerBundleCommand
+from map_storage.features.map_layers.data.tiles_store import select_overviews
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.map_layers.models.map_tile import MapTile, MapTilePayload
+from map_storage.features.shared.exceptions import MapStorageException
+from tests.helpers import create_layer, create_tile, create_overviews
+
+pytestmark = pytest.mark.anyio
+
+
+async def _layer_tiles(session_maker, layer_id):
+    async with session_maker() as db:
+        rows = (await db.execute(
+            select(MapTile.id, MapTile.center_lat, MapTilePayload.img)
+            .join(MapTilePayload, MapTilePayload.tile_id == MapTile.id)
+            .where(MapTile.map_layer_id == layer_id)
+            .order_by(MapTile.center_lat))).all()
+        overviews = await select_overviews(db, [row.id for row in rows])
+    return [(row.center_lat, row.img, overviews.get(row.id)) for row in rows]
+
+
+async def test_bundle_round_trip_keeps_tiles_and_overviews(tmp_path, create_database):
+    hub = await create_database('hub')
+    local = await create_database('local')
+
+    async with hub(expire_on_commit=False) as db:
+        layer = create_layer(overview_factors=[2, 4])
+        db.add(layer)
+        await db.flush()
+        tiles = [create_tile(layer.id, i) for i in range(3)]
+        for tile in tiles:
+            tile.overviews = create_overviews(tile.img, [2, 4])
+        db.add_all(tiles)
+        await db.commit()
+        layer_id = layer.id
+
+    path = str(tmp_path / 'layer.mslb.gz')
+    async with hub() as db:
+        exported = await ExportMapLayerBundleHandler(db, batch_size=2)(ExportMapLayerBundleCommand(id=layer_id, path=path))
+    async with local() as db:
+        imported = await ImportMapLayerBundleHandler(db)(ImportMapLayerBundleCommand(path=path))
+    assert exported.tiles == imported.tiles == 3
+
+    async with local() as db:
+        copy = await db.get(MapLayer, imported.id)
+        assert copy.overview_factors == [2, 4] and copy.source_layer_id == layer_id
+
+    expected, copied = await _layer_tiles(hub, layer_id), await _layer_tiles(local, imported.id)
+    assert len(copied) == 3
+    for (lat, img, overviews), (copy_lat, copy_img, copy_overviews) in zip(expected, copied):
+        assert lat == copy_lat and np.array_equal(img, copy_img)
+        assert [o[0] for o in copy_overviews] == [2, 4] and copy_overviews == overviews
+
+
+async def test_bundle_import_rejects_existing_layer_name(tmp_path, create_database):
+    hub = await create_database('hub')
+    local = await create_database('local')
+
+    async with hub(expire_on_commit=False) as db:
+        layer = create_layer('roads')
+        db.add(layer)
+        await db.flush()
+        db.add(create_tile(layer.id, 0))
+        await db.commit()
+        path = str(tmp_path / 'layer.mslb.gz')
+        await ExportMapLayerBundleHandler(db)(ExportMapLayerBundleCommand(id=layer.id, path=path))
+
+    async with local() as db:
+        await ImportMapLayerBundleHandler(db)(ImportMapLayerBundleCommand(path=path))
+    async with local() as db:
+        with pytest.raises(MapStorageException):
+            await ImportMapLayerBundleHandler(db)(ImportMapLayerBundleCommand(path=path))
+    async with local() as db:
+        renamed = await ImportMapLayerBundleHandler(db)(ImportMapLayerBundleCommand(path=path, layer_name='roads 2'))
+        assert renamed.tiles == 1
+        assert sorted((await db.scalars(select(MapLayer.name))).all()) == ['roads', 'roads 2']
@@ -0,0 +1,190 @@
+import math
+
+import numpy as np
+import pytest
+from geopy.distance import geodesic
+
+from map_storage.features.map_layers.application.commands.import_map_layer.command import PolylineProfileArgs, \
+    ImportProfileType, TilingScheme
+from map_storage.features.map_layers.application.commands.import_map_layer.map_tiles_grids import build_tiles_grid, \
+    corridor_cells, rectangle_grid_layout, rotated_bounds_px, RectangleProfileArgs
+from map_storage.features.map_layers.application.commands.extend_map_layer.tiles_coverage import TilesCoverage
+from map_storage.features.shared.exceptions import MapStorageException
+from map_storage.features.shared.models.coordinates import Coordinates
+
+_zoom_m_per_px = 0.6
+
+
+def _route(*points):
+    return [Coordinates(latitude=lat, longitude=long) for lat, long in points]
+
+
+def _brute_force_corridor_cells(layout, waypoints, load_distance_m):
+    # every lattice node is measured against every route segment
+    row_step_m, col_step_m = layout.cell_size_m()
+    rows_pos, cols_pos = layout.lattice_position(np.array([p.latitude for p in waypoints]),
+                                                 np.array([p.longitude for p in waypoints]))
+    points = np.column_stack((cols_pos * col_step_m, rows_pos * row_step_m))
+    node_rows, node_cols = np.mgrid[0:layout.lat_cells + 1, 0:layout.long_cells + 1]
+    nodes = np.column_stack((node_cols.ravel() * col_step_m, node_rows.ravel() * row_step_m))
+
+    distances = np.full(len(nodes), np.inf)
+    for a, b in zip(points[:-1], points[1:]):
+        d = b - a
+        t = np.clip((nodes - a) @ d / max(d @ d, 1e-12), 0, 1)
+        distances = np.minimum(distances, np.linalg.norm(a + t[:, None] * d - nodes, axis=1))
+
+    near = set(np.flatnonzero(distances < load_distance_m).tolist())
+    cells = []
+    for row in range(layout.lat_cells):
+        for col in range(layout.long_cells):
+            corners = (row * (layout.long_cells + 1) + col + offset
+                       for offset in (0, 1, layout.long_cells + 1, layout.long_cells + 2))
+            if near.intersection(corners):
+                cells.append(row * layout.long_cells + col)
+    return np.array(cells, np.int64)
+
+
+def test_corridor_cells_match_measuring_every_cell():
+    waypoints = _route((50.0, 30.0), (50.02, 30.01), (50.021, 30.05), (50.005, 30.06), (50.005, 30.06))
+    layout = rectangle_grid_layout(RectangleProfileArgs(start=Coordinates(latitude=50.021, longitude=30.0),
+                                                        end=Coordinates(latitude=50.0, longitude=30.06)),
+                                   _zoom_m_per_px, 400)
+
+    for load_distance_m in (20, 150, 600):
+        cells = corridor_cells(layout, waypoints, load_distance_m)
+        assert np.array_equal(cells, _brute_force_corridor_cells(layout, waypoints, load_distance_m))
+        assert 0 < len(cells) < layout.cells_count
+
+
+def test_polyline_grid_covers_the_route():
+    waypoints = _route((50.0, 30.0), (50.01, 30.02), (50.0, 30.04))
+    args = PolylineProfileArgs(waypoints=waypoints, load_distance_m=100)
+    grid = build_tiles_grid(_zoom_m_per_px, 400, ImportProfileType.POLYLINE, args)
+
+    tiles = list(grid.grid_tiles())
+    assert [tile.index for tile in tiles] == list(range(len(grid)))
+    for lat, long in np.linspace((50.0, 30.0), (50.01, 30.02), 20):
+        # tiles are 240m wide, the closest tile center of every route point is at most half a diagonal away
+        closest_m = min(geodesic((lat, long), tuple(tile.center)).meters for tile in tiles)
+        assert closest_m < 240 / np.sqrt(2) + 1
+
+
+def test_rectangle_grid_tiles():
+    args = RectangleProfileArgs(start=Coordinates(latitude=50.0, longitude=30.0),
+                                end=Coordinates(latitude=50.01, longitude=30.02))
+    grid = build_tiles_grid(_zoom_m_per_px, 400, ImportProfileType.RECTANGLE, args)
+    layout = grid.layout
+
+    tiles = list(grid.grid_tiles())
+    assert len(tiles) == len(grid) == layout.lat_cells * layout.long_cells > 1
+    assert max(grid.tiles_width_px, grid.tiles_height_px) <= 400
+    # row-major cells from the north-west corner to the south-east one
+    assert tuple(tiles[0].coordinates[1]) == (50.01, 30.0)
+    assert np.allclose(tuple(tiles[-1].coordinates[3]), (50.0, 30.02))
+    assert tuple(tiles[1].coordinates[1]) == tuple(tiles[0].coordinates[2])
+    assert tuple(tiles[layout.long_cells].coordinates[1]) == tuple(tiles[0].coordinates[4])
+
+    corners = np.concatenate([chunk.corners for chunk in grid.chunks(chunk_size=7)])
+    assert np.allclose(corners, [[tuple(c) for c in tile.coordinates[1:]] for tile in tiles])
+    assert all(tile.key is None and tile.azimuth == 0 for tile in tiles)
+
+
+def test_grid_chunks_skip_indices():
+    waypoints = _route((50.0, 30.0), (50.01, 30.02), (50.0, 30.04))
+    grid = build_tiles_grid(_zoom_m_per_px, 400, ImportProfileType.POLYLINE,
+                            PolylineProfileArgs(waypoints=waypoints, load_distance_m=100))
+    tiles = list(grid.grid_tiles())
+
+    skip = set(range(0, len(grid), 3)) | set(range(10, 20))
+    chunks = list(grid.chunks(chunk_size=5, skip_indices=skip))
+
+    assert all(0 < len(chunk) <= 5 for chunk in chunks)
+    remaining = [tile for chunk in chunks for tile in chunk.grid_tiles()]
+    assert remaining == [tile for tile in tiles if tile.index not in skip]
+    assert np.allclose(np.concatenate([chunk.centers for chunk in chunks]),
+                       [tuple(tile.center) for tile in remaining])
+
+
+def _slippy_key(lat: float, long: float, z: int):
+    n = 2 ** z
+    x = int((long + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return z, x, y
+
+
+def _slippy_north_west(z: int, x: int, y: int):
+    n = 2 ** z
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n)))), x / n * 360 - 180
+
+
+def test_web_mercator_grid_keys():
+    args = RectangleProfileArgs(start=Coordinates(latitude=50.01, longitude=30.0),
+                                end=Coordinates(latitude=50.0, longitude=30.02))
+    # 512px tiles at zoom 17 are keyed by zoom 16 tiles
+    grid = build_tiles_grid(_zoom_m_per_px, 640, ImportProfileType.RECTANGLE, args, TilingScheme.WEB_MERCATOR, 17)
+
+    tiles = list(grid.grid_tiles())
+    assert (grid.tiles_width_px, grid.tiles_height_px) == (512, 512)
+    first_key, last_key = _slippy_key(50.01, 30.0, 16), _slippy_key(50.0, 30.02, 16)
+    assert tiles[0].key == first_key and tiles[-1].key == last_key
+    assert len(tiles) == (last_key[1] - first_key[1] + 1) * (last_key[2] - first_key[2] + 1)
+
+    for tile in tiles:
+        z, x, y = tile.key
+        assert np.allclose(tuple(tile.coordinates[1]), _slippy_north_west(z, x, y))
+        assert np.allclose(tuple(tile.coordinates[3]), _slippy_north_west(z, x + 1, y + 1))
+
+    # the same cells are shared by every area that touches them
+    smaller = build_tiles_grid(_zoom_m_per_px, 640, ImportProfileType.RECTANGLE,
+                               RectangleProfileArgs(start=Coordinates(latitude=50.005, longitude=30.01),
+                                                    end=Coordinates(latitude=50.0, longitude=30.02)),
+                               TilingScheme.WEB_MERCATOR, 17)
+    assert {tile.key for tile in smaller.grid_tiles()} <= {tile.key for tile in tiles}
+
+
+def test_web_mercator_grid_requirements():
+    args = RectangleProfileArgs(start=Coordinates(latitude=50.01, longitude=30.0),
+                                end=Coordinates(latitude=50.0, longitude=30.02))
+    with pytest.raises(MapStorageException):
+        build_tiles_grid(_zoom_m_per_px, 640, ImportProfileType.RECTANGLE, args, TilingScheme.WEB_MERCATOR, 16.5)
+    with pytest.raises(MapStorageException):
+        build_tiles_grid(_zoom_m_per_px, 200, ImportProfileType.RECTANGLE, args, TilingScheme.WEB_MERCATOR, 17)
+    with pytest.raises(MapStorageException):
+        build_tiles_grid(_zoom_m_per_px, 640, ImportProfileType.POLYLINE,
+                         PolylineProfileArgs(waypoints=_route((50.0, 30.0), (50.01, 30.02)), route_aligned=True),
+                         TilingScheme.WEB_MERCATOR, 17)
+
+
+def test_rotated_bounds():
+    assert rotated_bounds_px(300, 200, 0) == (300, 200)
+    assert rotated_bounds_px(300, 200, 90) == (200, 300)
+    assert rotated_bounds_px(300, 200, 180) == (300, 200)
+    assert rotated_bounds_px(100, 100, 45) == rotated_bounds_px(100, 100, 315) == (142, 142)
+
+
+def test_route_aligned_tiles_follow_the_route():
+    # east, then north-east, then north
+    waypoints = _route((50.0, 30.0), (50.0, 30.01), (50.006, 30.019), (50.014, 30.019))
+    args = PolylineProfileArgs(waypoints=waypoints, load_distance_m=100, route_aligned=True)
+    grid = build_tiles_grid(_zoom_m_per_px, 640, ImportProfileType.POLYLINE, args)
+    layout = grid.layout
+    tiles = list(grid.grid_tiles())
+
+    assert len(tiles) == len(grid)
+    assert all(max(rotated_bounds_px(grid.tiles_width_px, grid.tiles_height_px, azimuth)) <= 640
+               for azimuth in layout.azimuths)
+    assert layout.long_cells * grid.tiles_width_px * _zoom_m_per_px >= 200
+
+    azimuths = sorted({round(tile.azimuth) for tile in tiles})
+    assert azimuths[0] == 0 and azimuths[-1] == 90 and len(azimuths) == 3
+    for tile in tiles:
+        nw, ne, se, sw = (geodesic(tuple(a), tuple(b)).meters for a, b in zip(
+            tile.coordinates[1:], tile.coordinates[2:] + tile.coordinates[1:2]))
+        assert np.allclose((nw, se), grid.tiles_width_px * _zoom_m_per_px, rtol=1e-2)
+        assert np.allclose((ne, sw), grid.tiles_height_px * _zoom_m_per_px, rtol=1e-2)
+
+    # points of the route and beside it are covered by tiles of their segment
+    corners = np.concatenate([chunk.corners for chunk in grid.chunks()])
+    for lat, long in [(50.0, 30.005), (50.0005, 30.005), (49.9995, 30.005), (50.01, 30.019), (50.01, 30.0199)]:
+        assert TilesCoverage.from_corners(corners).covers_points(np.array([[lat, long]])).all()
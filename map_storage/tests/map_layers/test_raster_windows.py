@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pytest
+
+from map_storage.features.map_layers.application.commands.import_raster_layer import raster_windows
+from map_storage.features.map_layers.application.commands.import_raster_layer.raster_windows import \
+    read_raster_info, read_raster_value_range, _open_raster, _to_bgr
+
+rasterio = pytest.importorskip('rasterio')
+
+
+def _write_raster(path: str, value: int):
+    transform = rasterio.transform.from_bounds(30.0, 50.0, 30.01, 50.01, 64, 64)
+    with rasterio.open(path, 'w', driver='GTiff', width=64, height=64, count=1, dtype='uint8',
+                       crs='EPSG:4326', transform=transform) as dataset:
+        dataset.write(np.full((1, 64, 64), value, np.uint8))
+
+
+def test_replaced_raster_is_opened_again(tmp_path):
+    path = str(tmp_path / 'raster.tif')
+    _write_raster(path, 10)
+
+    dataset = _open_raster(path)
+    assert _open_raster(path) is dataset
+    assert dataset.read(1)[0, 0] == 10
+
+    _write_raster(path, 20)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    reopened = _open_raster(path)
+    assert reopened is not dataset and dataset.closed
+    assert reopened.read(1)[0, 0] == 20
+
+
+def test_open_rasters_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(raster_windows, '_max_open_rasters', 2)
+    paths = [str(tmp_path / f'raster{i}.tif') for i in range(3)]
+    for i, path in enumerate(paths):
+        _write_raster(path, i)
+
+    datasets = [_open_raster(path) for path in paths]
+    assert datasets[0].closed and not datasets[1].closed and not datasets[2].closed
+
+    info = read_raster_info(paths[0])
+    assert info.north == pytest.approx(50.01) and info.west == pytest.approx(30.0)
+
+
+def test_value_range_of_float_rasters_skips_nodata(tmp_path):
+    path = str(tmp_path / 'elevation.tif')
+    data = np.linspace(100, 300, 64 * 64, dtype=np.float32).reshape(1, 64, 64)
+    data[:, :8] = -9999
+    data[:, 8, 0] = np.nan
+    transform = rasterio.transform.from_bounds(30.0, 50.0, 30.01, 50.01, 64, 64)
+    with rasterio.open(path, 'w', driver='GTiff', width=64, height=64, count=1, dtype='float32',
+                       crs='EPSG:4326', transform=transform, nodata=-9999) as dataset:
+        dataset.write(data)
+
+    low, high = read_raster_value_range(path, (1,))
+    assert low == pytest.approx(data[0, 8, 1]) and high == pytest.approx(300)
+    _write_raster(str(tmp_path / 'raster.tif'), 10)
+    assert read_raster_value_range(str(tmp_path / 'raster.tif'), (1,)) is None
+
+    img = _to_bgr(np.array([[[low, (low + high) / 2, high, -9999, np.nan]]], np.float32), (low, high))
+    assert img[0, :, 0].tolist() == [0, 127, 255, 0, 0]
+
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from map_storage.features.map_layers.application.commands.sync_map_layer import SyncMapLayerHandler, \
+    SyncMapLayerCommand
+from map_storage.features.map_layers.data.tiles_store import next_layer_version, delete_tiles
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.map_layers.models.map_tile import MapTile, MapTilePayload
+from tests.helpers import create_layer, create_tile
+
+pytestmark = pytest.mark.anyio
+
+
+async def _target_tiles(session_maker, layer_id):
+    async with session_maker() as db:
+        rows = (await db.execute(
+            select(MapTile.source_id, MapTilePayload.img)
+            .join(MapTilePayload, MapTilePayload.tile_id == MapTile.id)
+            .where(MapTile.map_layer_id == layer_id))).all()
+    return {source_id: img for source_id, img in rows}
+
+
+async def test_sync_copies_unversioned_tiles_and_then_changes(create_database):
+    source = await create_database('source')
+    target = await create_database('target')
+
+    # tiles written before layer versions, the layer and its tiles stay at version 0
+    async with source(expire_on_commit=False) as db:
+        layer = create_layer()
+        db.add(layer)
+        await db.flush()
+        tiles = [create_tile(layer.id, i) for i in range(3)]
+        db.add_all(tiles)
+        await db.commit()
+        layer_id, tiles_ids = layer.id, [t.id for t in tiles]
+        assert layer.version == 0 and all(t.version == 0 for t in tiles)
+
+    async with source() as source_db, target() as target_db:
+        res = await SyncMapLayerHandler(source_db, target_db)(SyncMapLayerCommand(source_layer_id=layer_id))
+    assert res.upserted_tiles == 3 and res.deleted_tiles == 0 and res.synced_version == 0
+    copied = await _target_tiles(target, res.id)
+    assert sorted(copied) == tiles_ids
+    assert all(np.array_equal(copied[t.id], t.img) for t in tiles)
+
+    async with source(expire_on_commit=False) as db:
+        version = await next_layer_version(db, layer_id)
+        new_tile = create_tile(layer_id, 3, version=version)
+        db.add(new_tile)
+        await delete_tiles(db, layer_id, version, MapTile.id == tiles_ids[0])
+        await db.commit()
+        new_tile_id = new_tile.id
+
+    async with source() as source_db, target() as target_db:
+        res = await SyncMapLayerHandler(source_db, target_db)(SyncMapLayerCommand(source_layer_id=layer_id))
+    assert res.upserted_tiles == 1 and res.deleted_tiles == 1 and res.synced_version == 1
+    assert sorted(await _target_tiles(target, res.id)) == tiles_ids[1:] + [new_tile_id]
+
+    async with target() as db:
+        assert len((await db.scalars(select(MapLayer))).all()) == 1
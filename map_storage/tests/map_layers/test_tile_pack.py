@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+
+from map_storage.features.map_layers.application.commands.export_map_layer_pack import \
+    ExportMapLayerPackHandler, ExportMapLayerPackCommand
+from map_storage.features.map_layers.data.tile_pack import TilePack
+from map_storage.features.map_layers.models.map_tile import TileSURFFeatures
+from map_storage.features.shared.exceptions import MapStorageException
+from map_storage.features.shared.keypoints import KEYPOINT_DTYPE
+from map_storage.sdk import MapLayerPacksSDK
+from tests.helpers import create_layer, create_tile, create_overviews
+
+pytestmark = pytest.mark.anyio
+
+
+async def _export_pack(session_maker, tmp_path, tiles_count: int, overview_factors):
+    async with session_maker(expire_on_commit=False) as db:
+        layer = create_layer(has_fast_features=True, overview_factors=overview_factors)
+        db.add(layer)
+        await db.flush()
+        tiles = []
+        for i in range(tiles_count):
+            tile = create_tile(layer.id, i)
+            tile.fast_keypoints = np.arange(i * 6, dtype=np.float32).reshape(-1, 3)
+            tile.overviews = create_overviews(tile.img, overview_factors)
+            tiles.append(tile)
+        db.add_all(tiles)
+        await db.commit()
+
+        path = str(tmp_path / 'layer.mspk')
+        res = await ExportMapLayerPackHandler(db, batch_size=2)(ExportMapLayerPackCommand(id=layer.id, path=path))
+    return path, res, tiles
+
+
+async def test_pack_round_trip(session_maker, tmp_path):
+    path, res, tiles = await _export_pack(session_maker, tmp_path, 5, [])
+    assert res.tiles == 5
+
+    pack = TilePack(path)
+    try:
+        found = pack.tiles_in_rectangle((49, 29), (51, 31), 0, 100, True, False, True)
+        assert [t.latitude for t in found] == [t.center_lat for t in tiles]
+        for response, tile in zip(found, tiles):
+            assert np.array_equal(response.img, tile.img)
+            assert np.array_equal(response.fast_keypoints, tile.fast_keypoints)
+            assert response.img_shape == tile.img_shape
+
+        assert len(pack.tiles_in_rectangle((50.0015, 29), (50.0035, 31), 0, 100, False, False, False)) == 2
+        assert len(pack.tiles_in_rectangle((49, 29), (51, 31), 1, 2, False, False, False)) == 2
+    finally:
+        pack.close()
+
+
+async def test_pack_serves_overviews(session_maker, tmp_path):
+    path, _, tiles = await _export_pack(session_maker, tmp_path, 3, [2, 4])
+
+    pack = TilePack(path)
+    try:
+        assert pack.layer['overview_factors'] == [2, 4]
+        # tiles of the helpers are about 3 m/px
+        for meters_per_px, factor in ((3, 1), (6, 2), (12, 4), (100, 4)):
+            found = pack.overview_in_rectangle((49, 29), (51, 31), meters_per_px, 0, 100)
+            assert len(found) == 3 and all(t.overview_factor == factor for t in found)
+            for response, tile in zip(found, tiles):
+                overview = next((o for o in tile.overviews if o.factor == factor), None)
+                if overview is None:
+                    assert np.array_equal(response.img, tile.img)
+                else:
+                    assert response.img_encoded.data == overview.img_encoded
+                    assert response.img_shape == (overview.img_height, overview.img_width)
+    finally:
+        pack.close()
+
+
+async def _export_keyed_surf_packs(session_maker, tmp_path):
+    # two layers of float16 descriptors, tiles of the second one lie between the tiles of the first one
+    paths, layers_tiles = [], []
+    async with session_maker(expire_on_commit=False) as db:
+        for layer_index in range(2):
+            layer = create_layer(f'layer {layer_index}', has_images=False, has_surf_features=True,
+                                 descriptors_dtype='float16', tiling='web_mercator')
+            db.add(layer)
+            await db.flush()
+            tiles = []
+            for i in range(3):
+                tile = create_tile(layer.id, i, tile_z=17, tile_x=100 + i, tile_y=200 + layer_index)
+                tile.img = None
+                tile.center_lat += layer_index * 5e-4
+                keypoints = np.zeros(i + 1, KEYPOINT_DTYPE)
+                keypoints['x'] = np.arange(i + 1)
+                tile.surf_features = TileSURFFeatures(keypoints, np.full((i + 1, 64), i + 0.5, np.float16))
+                tiles.append(tile)
+            db.add_all(tiles)
+            await db.commit()
+
+            paths.append(str(tmp_path / f'layer{layer_index}.mspk'))
+            await ExportMapLayerPackHandler(db)(ExportMapLayerPackCommand(id=layer.id, path=paths[-1]))
+            layers_tiles.append(tiles)
+    return paths, layers_tiles
+
+
+async def test_packs_sdk_queries(session_maker, tmp_path):
+    paths, layers_tiles = await _export_keyed_surf_packs(session_maker, tmp_path)
+    layers_ids = [tiles[0].map_layer_id for tiles in layers_tiles]
+
+    sdk = MapLayerPacksSDK(paths)
+    try:
+        assert sorted(layer['id'] for layer in sdk.layers) == layers_ids
+
+        found = await sdk.tiles_in_rectangle_area(layers_ids, (49, 29), (51, 31), 1, 4, False, True, False)
+        all_tiles = sorted((t for tiles in layers_tiles for t in tiles), key=lambda t: t.center_lat)
+        assert [t.latitude for t in found] == [t.center_lat for t in all_tiles[1:5]]
+        for response in found:
+            tile = next(t for t in all_tiles if t.center_lat == response.latitude)
+            assert response.img is None and response.fast_keypoints is None
+            assert np.array_equal(response.surf_keypoints, tile.surf_features.keypoints)
+            assert response.surf_descriptors_raw.dtype == np.float16
+            assert response.surf_descriptors.dtype == np.float32
+            assert np.array_equal(response.surf_descriptors, tile.surf_features.descriptors.astype(np.float32))
+
+        in_range = await sdk.tiles_in_tile_range(layers_ids, 17, (101, 102), (200, 201), 0, 10, False, False, False)
+        assert [t.key for t in in_range] == [(17, 101, 200), (17, 102, 200), (17, 101, 201), (17, 102, 201)]
+
+        # like the database query, tiles overlap the square when any of their corners lies in it
+        first, second, _ = layers_tiles[0]
+        overlapping = await sdk.tiles_overlapping_with_square([layers_ids[0]], (first.ne_lat, first.ne_long),
+                                                            20, 0, 10, False, False, False)
+        assert [t.latitude for t in overlapping] == [first.center_lat, second.center_lat]
+    finally:
+        sdk.close()
+
+
+def test_pack_rejects_other_files(tmp_path):
+    path = tmp_path / 'layer.mspk'
+    path.write_bytes(bytes(128))
+    with pytest.raises(MapStorageException):
+        TilePack(str(path))
@@ -0,0 +1,56 @@
+import dataclasses
+
+import numpy as np
+
+from map_storage.features.map_layers.application.queries.tiles_queries import TileResponse
+from map_storage.features.shared.descriptors import compact_descriptors
+from map_storage.features.shared.images import EncodedImage, encode_image
+
+
+def _tile_response(img_encoded=None, surf_descriptors_raw=None) -> TileResponse:
+    return TileResponse(latitude=50, longitude=30, vertices=[(50, 30)] * 4, azimuth=0, img_encoded=img_encoded,
+                        surf_keypoints=None, surf_descriptors_raw=surf_descriptors_raw, fast_keypoints=None,
+                        img_shape=(4, 6))
+
+
+def test_img_of_pixels():
+    pixels = np.full((4, 6, 3), 7, np.uint8)
+    tile = _tile_response(EncodedImage(pixels=pixels))
+    assert tile.img is pixels and tile.img_encoded.data is None
+    assert _tile_response().img is None
+
+
+def test_encoded_img_is_decoded_on_access():
+    pixels = np.random.default_rng(0).integers(0, 255, (4, 6, 3), dtype=np.uint8)
+    encoded = EncodedImage(data=encode_image(pixels, 'png'))
+    tile = _tile_response(encoded)
+    assert tile.img_encoded is encoded and not encoded.is_decoded
+    assert np.array_equal(tile.img, pixels)
+
+
+def test_payloads_are_fields():
+    encoded = EncodedImage(pixels=np.zeros((4, 6, 3), np.uint8))
+    tile = _tile_response(encoded)
+    assert 'img_encoded' in repr(tile) and tile == _tile_response(encoded)
+    assert tile != _tile_response(EncodedImage(pixels=np.zeros((4, 6, 3), np.uint8)))
+
+    moved = dataclasses.replace(tile, azimuth=90)
+    assert moved.azimuth == 90 and moved.img_encoded is encoded
+
+
+def test_surf_descriptors_read_as_float32():
+    descriptors = np.random.default_rng(0).uniform(-0.5, 0.5, (10, 64)).astype(np.float32)
+
+    tile = _tile_response(surf_descriptors_raw=descriptors)
+    assert tile.surf_descriptors is descriptors and tile.surf_descriptors_raw is descriptors
+
+    for dtype in ('float16', 'uint8'):
+        stored = compact_descriptors(descriptors, dtype)
+        tile = _tile_response(surf_descriptors_raw=stored)
+        assert tile.surf_descriptors.dtype == np.float32
+        assert tile.surf_descriptors is tile.surf_descriptors
+        assert np.allclose(tile.surf_descriptors, descriptors, atol=0.005)
+        # the converted descriptors aren't part of the response fields
+        assert tile == _tile_response(surf_descriptors_raw=stored)
+
+    assert _tile_response().surf_descriptors is None
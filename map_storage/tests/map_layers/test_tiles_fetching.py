@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+import pytest
+
+from map_storage.features.map_layers.application.commands.import_map_layer.command import FetchOptions
+from map_storage.features.map_layers.application.commands.import_map_layer.import_pipeline import \
+    StageStats, TilesMemoryBudget
+from map_storage.features.map_layers.application.commands.import_map_layer.map_tiles_grids import GridTile
+from map_storage.features.map_layers.application.commands.import_map_layer.tiles_fetching import fetch_tiles, \
+    RequestsRateLimiter
+from map_storage.features.shared.models.coordinates import Coordinates
+from map_storage.infra.map_providers.adaptive_map_provider import AdaptiveConcurrencyMapProvider
+from tests.helpers import FakeMapProvider
+
+pytestmark = pytest.mark.anyio
+
+
+def _grid_tiles(count: int):
+    return [GridTile(i, (Coordinates(50 + i * 1e-3, 30),) * 5) for i in range(count)]
+
+
+async def _fetch_all(provider, tiles, options, **kwargs):
+    return [item async for item in fetch_tiles(provider, tiles, 17, 16, 16, options, **kwargs)]
+
+
+async def test_fetches_are_concurrent_bounded_and_in_grid_order():
+    provider = FakeMapProvider()
+    stats = StageStats()
+    fetched = await _fetch_all(provider, _grid_tiles(20), FetchOptions(max_concurrent_requests=4), stats=stats)
+
+    assert [grid_tile.index for grid_tile, _ in fetched] == list(range(20))
+    assert all(res.error is None and res.img_bytes for _, res in fetched)
+    assert provider.max_in_flight == 4
+    assert stats.tiles == 20 and stats.bytes == sum(res.size_bytes() for _, res in fetched)
+
+
+async def test_adaptive_provider_governs_concurrency():
+    provider = FakeMapProvider()
+    adaptive = AdaptiveConcurrencyMapProvider(provider, initial_limit=8)
+    fetched = await _fetch_all(adaptive, _grid_tiles(40), FetchOptions(max_concurrent_requests=2))
+
+    assert [grid_tile.index for grid_tile, _ in fetched] == list(range(40))
+    assert provider.max_in_flight == 8
+
+
+class _StalledMapProvider(FakeMapProvider):
+    # only the first tile is loaded, the other requests never finish
+    async def load_tile(self, center, zoom, with_px, height_px):
+        if self.calls == 0:
+            return await super().load_tile(center, zoom, with_px, height_px)
+        self.calls += 1
+        self.in_flight += 1
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self.in_flight -= 1
+
+
+async def test_closed_fetch_waits_for_cancelled_requests():
+    provider = _StalledMapProvider()
+    fetched = fetch_tiles(provider, _grid_tiles(20), 17, 16, 16, FetchOptions(max_concurrent_requests=8))
+    await anext(fetched)
+    assert provider.in_flight > 0
+
+    await fetched.aclose()
+    assert provider.in_flight == 0
+
+
+async def test_memory_budget_bounds_tiles_ahead_of_the_consumer():
+    provider = FakeMapProvider()
+    budget = TilesMemoryBudget(3, 1)
+    consumed = 0
+    async for _ in fetch_tiles(provider, _grid_tiles(10), 17, 16, 16,
+                               FetchOptions(max_concurrent_requests=8), memory_budget=budget):
+        consumed += 1
+        # the consumer stores the tile and gives its memory back
+        assert provider.calls - consumed <= 2
+        budget.release()
+
+    assert consumed == 10
+
+
+async def test_rate_limiter_spaces_requests():
+    limiter = RequestsRateLimiter(max_requests_per_second=50)
+    started_at = time.perf_counter()
+    await asyncio.gather(*(limiter.acquire() for _ in range(6)))
+
+    assert time.perf_counter() - started_at >= 5 / 50 * 0.9
@@ -0,0 +1,107 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from map_storage.features.map_layers.application.commands.import_map_layer.import_pipeline import \
+    create_processing_pool, process_tiles, run_processing_jobs, StageStats
+from map_storage.features.map_layers.application.commands.import_map_layer.map_tiles_grids import GridTile
+from map_storage.features.map_layers.application.commands.import_map_layer.tiles_processing import \
+    TileProcessingSettings, process_tile, rotate_to_tile
+from map_storage.features.shared.contracts.map_provider import GetTileResult
+from map_storage.features.shared.exceptions import MapProviderException
+from map_storage.features.shared.images import encode_image, decode_image, image_codec
+from map_storage.features.shared.models.coordinates import Coordinates
+
+_img = np.random.default_rng(0).integers(0, 255, (48, 64, 3), dtype=np.uint8)
+_png = encode_image(_img, 'png')
+
+
+def test_raw_and_encoded_images():
+    raw = process_tile(None, _png, TileProcessingSettings(save_img=True))
+    assert np.array_equal(raw.img, _img) and raw.img_encoded is None and raw.img_shape == (48, 64)
+
+    # png provider images are stored as they came
+    assert process_tile(None, _png, TileProcessingSettings(save_img=True, img_codec='png')).img_encoded == _png
+
+    jpeg = process_tile(_img, None, TileProcessingSettings(save_img=True, img_codec='jpeg', img_quality=80))
+    assert jpeg.img is None and image_codec(jpeg.img_encoded) == 'jpeg'
+
+    none = process_tile(None, _png, TileProcessingSettings(save_img=False))
+    assert none.img is None and none.img_encoded is None and none.img_shape == (48, 64)
+
+    assert process_tile(None, None, TileProcessingSettings(save_img=True)).error
+
+
+def test_rotated_tiles_face_their_azimuth():
+    # north-up image, its eastern half is white
+    img = np.zeros((60, 60), np.uint8)
+    img[:, 30:] = 255
+
+    facing_east = rotate_to_tile(img, 90, 40, 20)
+    assert facing_east.shape == (20, 40)
+    assert (facing_east[:8] == 255).all() and (facing_east[-8:] == 0).all()
+    assert (rotate_to_tile(img, 270, 40, 20)[:8] == 0).all()
+
+    tile = process_tile(np.dstack([img] * 3), None, TileProcessingSettings(save_img=True), 90, (40, 20))
+    assert tile.img_shape == (20, 40) and np.array_equal(tile.img[..., 0], facing_east)
+
+
+def test_fast_keypoints_and_overviews():
+    res = process_tile(_img, None, TileProcessingSettings(save_img=False, compute_fast=True, overview_factors=(2, 4)))
+    assert isinstance(res.fast_keypoints, np.ndarray)
+    assert sorted(res.overviews) == [2, 4]
+    assert decode_image(res.overviews[2]).shape == (24, 32, 3)
+    assert decode_image(res.overviews[4]).shape == (12, 16, 3)
+
+
+async def _fetched(results):
+    for i, res in enumerate(results):
+        yield GridTile(i, (Coordinates(50, 30),) * 5), res
+
+
+async def _process_all(results, executor, queue_size=2, stats=None):
+    settings = TileProcessingSettings(save_img=True, compute_fast=True)
+    return [item async for item in process_tiles(_fetched(results), executor, settings, queue_size, stats)]
+
+
+@pytest.mark.anyio
+async def test_process_pool_keeps_grid_order():
+    imgs = [np.random.default_rng(i).integers(0, 255, (32, 32, 3), dtype=np.uint8) for i in range(8)]
+    stats = StageStats()
+    with create_processing_pool(2) as pool:
+        processed = await _process_all([GetTileResult(img_bytes=encode_image(img, 'png')) for img in imgs],
+                                       pool, stats=stats)
+
+    assert [grid_tile.index for grid_tile, _ in processed] == list(range(8))
+    assert all(np.array_equal(tile.img, img) for (_, tile), img in zip(processed, imgs))
+    assert stats.tiles == 8
+
+
+def test_blank_tiles_have_no_fast_keypoints():
+    res = process_tile(np.full((32, 32, 3), 128, np.uint8), None, TileProcessingSettings(save_img=False, compute_fast=True))
+    assert res.error is None and len(res.fast_keypoints) == 0
+
+
+@pytest.mark.anyio
+async def test_processing_errors_stop_processing_with_a_full_queue():
+    def failing_job():
+        raise ValueError('broken tile')
+
+    async def jobs():
+        for i in range(10):
+            yield i, failing_job if i == 1 else (lambda: process_tile(_img, None, TileProcessingSettings(save_img=False)))
+
+    async def consume(executor):
+        return [item async for item in run_processing_jobs(jobs(), executor, 2)]
+
+    with ThreadPoolExecutor(2) as threads, pytest.raises(ValueError, match='broken tile'):
+        await asyncio.wait_for(consume(threads), timeout=10)
+
+
+@pytest.mark.anyio
+async def test_provider_errors_stop_processing():
+    results = [GetTileResult(img=_img), GetTileResult(error='quota exceeded', status=429), GetTileResult(img=_img)]
+    with ThreadPoolExecutor(2) as threads, pytest.raises(MapProviderException, match='quota'):
+        await _process_all(results, threads)
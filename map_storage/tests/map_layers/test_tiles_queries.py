@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from sqlalchemy import select, func
+
+from map_storage.features.map_layers.application.commands.delete_map_layer_tiles import \
+    DeleteMapLayerTilesHandler, DeleteMapLayerTilesCommand
+from map_storage.features.map_layers.application.queries.tiles_queries import ListTilesInRectangleQueryHandler, \
+    ListTilesInRectangleQuery
+from map_storage.features.map_layers.models.map_tile import MapTile, MapTilePayload, TileSURFFeatures
+from map_storage.features.map_layers.models.map_tile_overview import MapTileOverview
+from map_storage.features.map_layers.models.map_tile_tombstone import MapTileTombstone
+from map_storage.features.shared.keypoints import KEYPOINT_DTYPE
+from tests.helpers import create_layer, create_tile, create_overviews
+
+pytestmark = pytest.mark.anyio
+
+
+def _query(layer_id: int, **selected) -> ListTilesInRectangleQuery:
+    return ListTilesInRectangleQuery(
+        layers_ids=[layer_id], offset=0, limit=100,
+        start={'latitude': 49.9, 'longitude': 29.9}, end={'latitude': 50.1, 'longitude': 30.1},
+        **{'select_img': False, 'select_surf': False, 'select_fast': False, **selected})
+
+
+async def _create_tiles(session_maker, count: int):
+    async with session_maker(expire_on_commit=False) as db:
+        layer = create_layer(has_surf_features=True, has_fast_features=True)
+        db.add(layer)
+        await db.flush()
+        rng = np.random.default_rng(0)
+        tiles = []
+        for i in range(count):
+            tile = create_tile(layer.id, i)
+            tile.surf_features = TileSURFFeatures(np.zeros(5, KEYPOINT_DTYPE),
+                                                  rng.random((5, 64), dtype=np.float32))
+            tile.fast_keypoints = rng.random((7, 2), dtype=np.float32)
+            tile.overviews = create_overviews(tile.img, [2])
+            tiles.append(tile)
+        db.add_all(tiles)
+        await db.commit()
+        return layer.id, tiles
+
+
+async def test_payloads_are_fetched_only_when_selected(session_maker):
+    layer_id, tiles = await _create_tiles(session_maker, 3)
+
+    async with session_maker() as db:
+        handler = ListTilesInRectangleQueryHandler(db)
+        coordinates_only = await handler(_query(layer_id))
+        everything = await handler(_query(layer_id, select_img=True, select_surf=True, select_fast=True))
+
+    assert len(coordinates_only) == len(everything) == 3
+    assert all(t.img is None and t.surf_descriptors is None and t.fast_keypoints is None for t in coordinates_only)
+    for tile, res in zip(tiles, everything):
+        assert res.latitude == tile.center_lat and res.img_shape == tile.img_shape
+        assert np.array_equal(res.img, tile.img)
+        assert np.array_equal(res.surf_descriptors, tile.surf_features.descriptors)
+        assert np.array_equal(res.surf_keypoints, tile.surf_features.keypoints)
+        assert np.array_equal(res.fast_keypoints, tile.fast_keypoints)
+
+
+async def test_deleted_tiles_leave_no_payloads(session_maker):
+    layer_id, tiles = await _create_tiles(session_maker, 3)
+
+    async with session_maker() as db:
+        res = await DeleteMapLayerTilesHandler(db)(
+            DeleteMapLayerTilesCommand(map_layer_id=layer_id, tiles_ids=[tiles[0].id, tiles[2].id]))
+
+    async with session_maker() as db:
+        counts = [await db.scalar(select(func.count()).select_from(entity))
+                  for entity in (MapTile, MapTilePayload, MapTileOverview)]
+        payload_tiles = (await db.scalars(select(MapTilePayload.tile_id))).all()
+        tombstones = (await db.scalars(select(MapTileTombstone.tile_id).order_by(MapTileTombstone.tile_id))).all()
+
+    assert res.deleted_tiles == 2
+    assert counts == [1, 1, 1] and payload_tiles == [tiles[1].id]
+    assert tombstones == [tiles[0].id, tiles[2].id]
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from map_storage.features.map_layers.data.tiles_store import insert_tiles, raw_tiles_select, tiles_records, \
+    tiles_payloads, tile_payload, tile_overviews, select_overviews
+from map_storage.features.map_layers.models.map_tile import MapTile
+from tests.helpers import create_layer, create_tile, create_overviews
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_inserted_tiles_keep_rows_payloads_and_overviews(create_database):
+    source = await create_database('source')
+    target = await create_database('target')
+
+    async with source(expire_on_commit=False) as db:
+        layer = create_layer(has_fast_features=True)
+        db.add(layer)
+        await db.flush()
+        tiles = [create_tile(layer.id, i, tile_z=17 if i % 2 else None, tile_x=i, tile_y=i) for i in range(5)]
+        for i, tile in enumerate(tiles):
+            tile.fast_keypoints = np.arange(i * 2, dtype=np.float32).reshape(-1, 2)
+            tile.overviews = create_overviews(tile.img, [2, 4][:i % 3])
+        db.add_all(tiles)
+        await db.commit()
+        expected_payloads = [tile_payload(t) for t in tiles]
+        expected_overviews = [tile_overviews(t) for t in tiles]
+        rows = (await db.execute(raw_tiles_select(MapTile.map_layer_id == layer.id).order_by(MapTile.id))).all()
+
+    async with target(expire_on_commit=False) as db:
+        target_layer = create_layer()
+        db.add(target_layer)
+        await db.flush()
+        ids = await insert_tiles(db, target_layer.id, 3, tiles_records(rows), tiles_payloads(rows),
+                                 expected_overviews)
+        await db.commit()
+
+    async with target() as db:
+        copied = (await db.execute(
+            raw_tiles_select().add_columns(MapTile.source_id, MapTile.version, MapTile.map_layer_id)
+            .order_by(MapTile.id))).all()
+        overviews = await select_overviews(db, ids)
+    tiles, ids, copied, expected_payloads, expected_overviews, overviews, target_layer_id = tiles, ids, copied, expected_payloads, expected_overviews, overviews, target_layer.id
+
+    assert ids == [row.id for row in copied]
+    assert [row.source_id for row in copied] == [t.id for t in tiles]
+    assert all(row.version == 3 and row.map_layer_id == target_layer_id for row in copied)
+    assert [(row.tile_z, row.tile_x, row.tile_y) for row in copied] == \
+        [(t.tile_z, t.tile_x, t.tile_y) if t.tile_z is not None else (None, None, None) for t in tiles]
+    assert [row.center_lat for row in copied] == [t.center_lat for t in tiles]
+    assert tiles_payloads(copied) == expected_payloads
+    assert [overviews.get(tile_id, []) for tile_id in ids] == expected_overviews
@@ -0,0 +1,30 @@
+import pytest
+from sqlalchemy import select, func
+
+from map_storage.features.map_layers.application.commands.import_map_layer.tiles_writer import TilesBatchWriter
+from map_storage.features.map_layers.models.map_layer import MapLayer
+from map_storage.features.map_layers.models.map_tile import MapTile
+from tests.helpers import create_layer, create_tile
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_every_batch_is_a_layer_version_reserved_on_flush(session_maker):
+    async with session_maker(expire_on_commit=False) as db:
+        layer = create_layer()
+        db.add(layer)
+        await db.commit()
+        layer_id = layer.id
+
+        writer = TilesBatchWriter(db, batch_size=2)
+        await writer.add(create_tile(layer_id, 0))
+        # the layer row isn't touched until the batch is written
+        assert await db.scalar(select(MapLayer._version).where(MapLayer.id == layer_id)) == 0
+        for i in range(1, 5):
+            await writer.add(create_tile(layer_id, i))
+        await writer.flush()
+
+        versions = (await db.execute(
+            select(MapTile.version, func.count()).group_by(MapTile.version).order_by(MapTile.version))).all()
+        assert [tuple(v) for v in versions] == [(1, 2), (2, 2), (3, 1)]
+        assert await db.scalar(select(MapLayer._version).where(MapLayer.id == layer_id)) == 3
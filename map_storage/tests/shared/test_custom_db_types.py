@@ -0,0 +1,63 @@
+import io
+
+import numpy as np
+import pytest
+
+from map_storage.features.shared.custom_db_types import NumpyArray, SURFDescriptors, SURFKeyPoints, \
+    encode_array, decode_array
+from map_storage.features.shared.descriptors import compact_descriptors
+from map_storage.features.shared.keypoints import KEYPOINT_DTYPE, keypoints_from_array
+
+
+@pytest.mark.parametrize('array', [
+    np.arange(24, dtype=np.uint8).reshape(2, 3, 4),
+    np.linspace(0, 1, 10, dtype='>f8'),
+    np.zeros((0, 3), np.float32),
+    np.asfortranarray(np.arange(6, dtype=np.int16).reshape(2, 3)),
+    np.array(5, np.int64),
+])
+def test_array_round_trip(array):
+    decoded = decode_array(encode_array(array))
+    assert decoded.dtype == array.dtype and decoded.shape == array.shape
+    assert np.array_equal(decoded, array)
+    assert not decoded.flags.writeable
+
+
+def test_npy_rows_still_load_and_pickles_do_not():
+    array = np.arange(12, dtype=np.float32).reshape(3, 4)
+    stream = io.BytesIO()
+    np.save(stream, array)
+    assert np.array_equal(decode_array(stream.getvalue()), array)
+
+    stream = io.BytesIO()
+    np.save(stream, np.array([{}], dtype=object), allow_pickle=True)
+    with pytest.raises(ValueError):
+        decode_array(stream.getvalue())
+    with pytest.raises(ValueError):
+        encode_array(np.array([{}], dtype=object))
+    with pytest.raises(ValueError):
+        decode_array(b'not an array')
+
+
+def test_db_results_are_read_only_views():
+    img = np.zeros((4, 4, 3), np.uint8)
+    stored = NumpyArray().process_bind_param(img, None)
+    loaded = NumpyArray().process_result_value(stored, None)
+    assert not loaded.flags.writeable and not loaded.flags.owndata
+    with pytest.raises(ValueError):
+        loaded[0, 0] = 255
+
+    descriptors = SURFDescriptors()
+    for dtype in ('float32', 'uint8'):
+        stored = descriptors.process_bind_param(compact_descriptors(np.ones((2, 64), np.float32), dtype), None)
+        loaded = descriptors.process_result_value(stored, None)
+        assert not (loaded.values if dtype == 'uint8' else loaded).flags.writeable
+
+
+def test_keypoints_round_trip():
+    keypoints = np.zeros(3, KEYPOINT_DTYPE)
+    keypoints['size'] = (1, 2, 3)
+    keypoints_type = SURFKeyPoints()
+    loaded = keypoints_type.process_result_value(keypoints_type.process_bind_param(keypoints, None), None)
+    assert np.array_equal(loaded, keypoints) and not loaded.flags.writeable
+    assert [kp.size for kp in keypoints_from_array(loaded)] == [1, 2, 3]
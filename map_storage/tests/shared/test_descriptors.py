@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from map_storage.features.shared.custom_db_types import encode_descriptors, decode_descriptors
+from map_storage.features.shared.descriptors import DESCRIPTORS_DTYPES, QuantizedDescriptors, \
+    compact_descriptors, float32_descriptors
+
+
+@pytest.mark.parametrize('dtype, itemsize, max_error', [('float32', 4, 0), ('float16', 2, 5e-4), ('uint8', 1, 4e-3)])
+def test_stored_descriptors_round_trip(dtype, itemsize, max_error):
+    descriptors = np.random.default_rng(0).uniform(-0.5, 0.5, (50, 64)).astype(np.float32)
+
+    stored = compact_descriptors(descriptors, dtype)
+    assert stored.nbytes == descriptors.size * itemsize
+    decoded = decode_descriptors(encode_descriptors(stored))
+    assert type(decoded) is type(stored)
+
+    restored = float32_descriptors(decoded)
+    assert restored.dtype == np.float32 and restored.shape == descriptors.shape
+    assert np.abs(restored - descriptors).max() <= max_error
+
+
+def test_uint8_descriptors_of_zeros_and_empty_tiles():
+    zeros = compact_descriptors(np.zeros((3, 64), np.float32), 'uint8')
+    assert isinstance(zeros, QuantizedDescriptors)
+    assert not float32_descriptors(zeros).any()
+
+    empty = decode_descriptors(encode_descriptors(compact_descriptors(np.zeros((0, 64), np.float32), 'uint8')))
+    assert len(empty) == 0 and float32_descriptors(empty).shape == (0, 64)
+
+
+def test_unknown_dtype():
+    assert 'int4' not in DESCRIPTORS_DTYPES
+    with pytest.raises(ValueError):
+        compact_descriptors(np.zeros((1, 64), np.float32), 'int4')
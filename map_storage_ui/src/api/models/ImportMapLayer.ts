@@ -40,5 +40,16 @@ interface ImportMapLayerCommand {
   description?: string;
 }
 
+interface ImportJob {
+  id: string;
+  status: 'queued' | 'running' | 'completed' | 'failed' | 'cancelled';
+  map_layer_id?: number;
+  tiles_total: number;
+  tiles_done: number;
+  bytes_downloaded: number;
+  eta_seconds?: number;
+  error?: string;
+}
+
 export {ImportProfileType}
-export type {Coordinates, ImportMapLayerCommand, PolylineProfileArgs, RectangleProfileArgs, ImportActions, FASTAction}
+export type {Coordinates, ImportMapLayerCommand, PolylineProfileArgs, RectangleProfileArgs, ImportActions, FASTAction, ImportJob}
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import {ImportMapLayerCommand} from "../models/ImportMapLayer";
+import {ImportJob, ImportMapLayerCommand} from "../models/ImportMapLayer";
 
 const MAP_LAYERS_API_BASE_URL = process.env.NEXT_PUBLIC_HUB_API_URL + '/mapLayers';
 
@@ -13,7 +13,28 @@ class MapLayerService {
   }
 
   import(data: ImportMapLayerCommand){
-    return axios.post(MAP_LAYERS_API_BASE_URL + '/import', data);
+    return axios.post<ImportJob>(MAP_LAYERS_API_BASE_URL + '/import', data);
+  }
+
+  importJob(id: string) {
+    return axios.get<ImportJob>(MAP_LAYERS_API_BASE_URL + `/import/jobs/${id}`);
+  }
+
+  cancelImportJob(id: string) {
+    return axios.delete<ImportJob>(MAP_LAYERS_API_BASE_URL + `/import/jobs/${id}`);
+  }
+
+  async waitForImport(id: string, pollIntervalMs = 2000): Promise<ImportJob> {
+    for (;;) {
+      const job = (await this.importJob(id)).data;
+      if (job.status === 'completed') {
+        return job;
+      }
+      if (job.status === 'failed' || job.status === 'cancelled') {
+        throw new Error(job.error ?? `import ${job.status}`);
+      }
+      await new Promise(resolve => setTimeout(resolve, pollIntervalMs));
+    }
   }
 
   deleteMapLayer(id: number) {
@@ -138,10 +138,11 @@ const Map = () => {
       position: { horizontal: "right", vertical: "top" }
     });
     MapLayerService.import(requestBody!)
-      .then((response) => {
+      .then((response) => MapLayerService.waitForImport(response.data.id))
+      .then((job) => {
         router.push({
           pathname: '/map',
-          query: { mapLayerId: response.data.id },
+          query: { mapLayerId: job.map_layer_id },
         }).then(() => {
           showNotification({
             message: 'Map imported successfully!',